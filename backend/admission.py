@@ -0,0 +1,272 @@
+"""
+Admission control for API routes.
+
+Each route belongs to a class: "cheap" reads, "expensive" work (syncs, code
+search, /batch, bulk export, the login with its inline sync) or "exempt"
+(health checks, metrics, the long-lived /events stream). Cheap and expensive routes get
+separate pools, so a sync storm can only use up the expensive pool.
+
+A pool has a global and a per-user concurrency limit. Anonymous requests
+(the login) are keyed by client address: behind ADMISSION_TRUSTED_PROXY_HOPS
+proxies, the X-Forwarded-For entry the outermost one appended (entries further
+left are whatever the client sent). Users behind one NAT or proxy share an
+address, so they get ADMISSION_ANONYMOUS_PER_CLIENT instead of the per-user limit.
+A request over either limit waits in the pool's bounded FIFO queue for up to
+ADMISSION_QUEUE_TIMEOUT_SECONDS; when the queue is full (or the user already
+has as many requests queued as it may run) or the wait times out, it gets a
+429 with a Retry-After estimated from recent hold times. Waiters held back only
+by their own per-user limit do not hold up other users.
+
+Routes are classified by handler name (DEFAULT_ROUTE_CLASSES), and
+ADMISSION_ROUTES overrides individual handlers, e.g.
+ADMISSION_ROUTES='{"get_pull_request_diff": "expensive"}'.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi.responses import ORJSONResponse
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import settings
+from metrics import register_collector
+from tracing import tracer
+
+CHEAP, EXPENSIVE, EXEMPT = "cheap", "expensive", "exempt"
+
+# Handler name -> class; anything not listed is cheap
+DEFAULT_ROUTE_CLASSES: Dict[str, str] = {
+    "github_oauth": EXPENSIVE,
+    "sync_user_data": EXPENSIVE,
+    "sync_repositories": EXPENSIVE,
+    "sync_pull_requests": EXPENSIVE,
+    "sync_repositories_stream": EXPENSIVE,
+    "sync_pull_requests_stream": EXPENSIVE,
+    "sync_organizations": EXPENSIVE,
+    "search_repository_files": EXPENSIVE,
+    "batch": EXPENSIVE,
+    "export_data": EXPENSIVE,
+    "root": EXEMPT,
+    "health_check": EXEMPT,
+    "get_metrics": EXEMPT,
+    "get_traces": EXEMPT,
+    "get_trace": EXEMPT,
+    "subscribe_events": EXEMPT,
+}
+
+
+class Rejected(Exception):
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Too many concurrent {pool} requests")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class Pool:
+    WINDOW = 500
+
+    def __init__(
+        self, name: str, limit: int, per_user_limit: int, queue_size: int, queue_timeout: float,
+        anonymous_limit: Optional[int] = None
+    ):
+        self.name = name
+        self.limit = limit
+        self.per_user_limit = per_user_limit
+        self.anonymous_limit = per_user_limit if anonymous_limit is None else anonymous_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.active_by_user: Dict[str, int] = {}
+        self.queued_by_user: Dict[str, int] = {}
+        self.waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queue_waits: Deque[float] = deque(maxlen=self.WINDOW)
+        self.hold_times: Deque[float] = deque(maxlen=self.WINDOW)
+
+    def user_limit(self, user: str) -> int:
+        return self.anonymous_limit if user.startswith("addr:") else self.per_user_limit
+
+    def _has_room(self, user: str) -> bool:
+        return self.active < self.limit and self.active_by_user.get(user, 0) < self.user_limit(user)
+
+    def _grant(self, user: str):
+        self.active += 1
+        self.active_by_user[user] = self.active_by_user.get(user, 0) + 1
+        self.admitted += 1
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the recent average hold time"""
+        average = sum(self.hold_times) / len(self.hold_times) if self.hold_times else 1.0
+        return max(1, min(60, math.ceil(average * (len(self.waiters) + 1) / self.limit)))
+
+    async def acquire(self, user: str) -> float:
+        """Wait for a slot and return the time spent queued; raises Rejected"""
+        # Queued users only go first when they could run now; one at its own limit does not block others
+        if self._has_room(user) and not any(self._has_room(waiting_user) for waiting_user, _ in self.waiters):
+            self._grant(user)
+            self.queue_waits.append(0.0)
+            return 0.0
+        if len(self.waiters) >= self.queue_size or self.queued_by_user.get(user, 0) >= self.user_limit(user):
+            self.rejected += 1
+            raise Rejected(self.name, self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (user, future)
+        self.waiters.append(waiter)
+        self.queued_by_user[user] = self.queued_by_user.get(user, 0) + 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended: hand the slot on
+                self.release(user, 0.0)
+            else:
+                future.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            self.rejected += 1
+            raise Rejected(self.name, self.retry_after())
+        finally:
+            self.queued_by_user[user] -= 1
+            if not self.queued_by_user[user]:
+                del self.queued_by_user[user]
+        waited = time.perf_counter() - started
+        self.queue_waits.append(waited)
+        return waited
+
+    def release(self, user: str, held: float):
+        self.hold_times.append(held)
+        self.active -= 1
+        self.active_by_user[user] -= 1
+        if not self.active_by_user[user]:
+            del self.active_by_user[user]
+        # Wake the first waiter that has room, skipping users at their own limit
+        for waiter in self.waiters:
+            waiting_user, future = waiter
+            if self._has_room(waiting_user):
+                self.waiters.remove(waiter)
+                self._grant(waiting_user)
+                future.set_result(None)
+                break
+
+    def _quantile(self, q: float) -> Optional[float]:
+        if not self.queue_waits:
+            return None
+        ordered = sorted(self.queue_waits)
+        return round(ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000, 1)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limit": self.limit,
+            "per_user_limit": self.per_user_limit,
+            "anonymous_limit": self.anonymous_limit,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait_p50_ms": self._quantile(0.5),
+            "queue_wait_p95_ms": self._quantile(0.95),
+            "queue_wait_max_ms": self._quantile(1.0),
+        }
+
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = settings.admission_enabled
+        self.route_classes = {**DEFAULT_ROUTE_CLASSES, **settings.admission_routes}
+        self.pools = {
+            CHEAP: Pool(
+                CHEAP, settings.admission_cheap_concurrency, settings.admission_cheap_per_user,
+                settings.admission_cheap_queue, settings.admission_queue_timeout_seconds,
+                settings.admission_anonymous_per_client
+            ),
+            EXPENSIVE: Pool(
+                EXPENSIVE, settings.admission_expensive_concurrency, settings.admission_expensive_per_user,
+                settings.admission_expensive_queue, settings.admission_queue_timeout_seconds,
+                settings.admission_anonymous_per_client
+            ),
+        }
+
+    def route_class(self, scope: Scope) -> str:
+        """Class of the route a request will be dispatched to"""
+        for route in scope["app"].router.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                endpoint = child_scope.get("endpoint")
+                return self.route_classes.get(getattr(endpoint, "__name__", ""), CHEAP)
+        return CHEAP
+
+    @staticmethod
+    def user_key(scope: Scope) -> str:
+        """The authenticated username, or the client address for anonymous requests"""
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], settings.secret_key, algorithms=[settings.algorithm])
+                if payload.get("sub"):
+                    return f"user:{payload['sub']}"
+            except JWTError:
+                pass
+        # Behind the hosting proxies every client shares their address. Each proxy appends the
+        # address it saw, so only the entry the outermost trusted one added can't be forged
+        hops = settings.admission_trusted_proxy_hops
+        forwarded_for = [entry.strip() for entry in headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+        if hops and forwarded_for:
+            return f"addr:{forwarded_for[-min(hops, len(forwarded_for))]}"
+        client = scope.get("client")
+        return f"addr:{client[0]}" if client else "addr:unknown"
+
+    def stats(self) -> Dict[str, object]:
+        return {"enabled": self.enabled, **{name: pool.stats() for name, pool in self.pools.items()}}
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not admission.enabled:
+            await self.app(scope, receive, send)
+            return
+        route_class = admission.route_class(scope)
+        if route_class == EXEMPT:
+            await self.app(scope, receive, send)
+            return
+
+        pool = admission.pools[route_class]
+        user = admission.user_key(scope)
+        try:
+            with tracer.span("admission", pool=route_class):
+                await pool.acquire(user)
+        except Rejected as e:
+            response = ORJSONResponse(
+                {"detail": str(e)},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release(user, time.perf_counter() - started)
+
+
+# Global admission controller instance
+admission = AdmissionController()
+register_collector("admission", admission.stats)
@@ -1,20 +1,20 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.orm import Session, make_transient_to_detached
+from cache import cache
+from database import get_db, SessionLocal
 from models import User
 from schemas import TokenData
+from scheduler import scheduler
 from config import settings
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from tracing import tracer
 
 # JWT token scheme
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -43,6 +43,7 @@ def verify_token(token: str, credentials_exception):
         raise credentials_exception
 
 
+@tracer.traced("auth.get_current_user")
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -57,12 +58,34 @@ def get_current_user(
     token = credentials.credentials
     token_data = verify_token(token, credentials_exception)
     
+    # Only the id and username are cached, never the GitHub token. A cached user is
+    # attached to the request's session without a query; its other columns load on first access
+    cache_key = user_cache_key(token_data.username)
+    cached_user = cache.get(cache_key)
+    if cached_user is not None:
+        scheduler.record_activity(cached_user["id"])
+        user = User(**cached_user)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
+    cache.set(cache_key, {"id": user.id, "username": user.username}, ttl=settings.user_cache_ttl)
+    scheduler.record_activity(user.id)
     return user
 
 
+def user_cache_key(username: str) -> str:
+    """Cache key of the user lookup done by get_current_user"""
+    return f"user:{username}"
+
+
+def invalidate_user(username: str):
+    """Drop the cached lookup for a user after it changes"""
+    cache.delete(user_cache_key(username))
+
+
 def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
@@ -76,3 +99,27 @@ def get_current_user_optional(
     except HTTPException:
         return None
 
+
+
+def get_current_user_for_stream(
+    access_token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """Authenticate a long-lived stream from the Bearer header or ?access_token=
+    
+    EventSource cannot send headers, hence the query parameter. The DB session is
+    closed before returning so an open stream does not hold a pooled connection:
+    only the user's id and username are guaranteed to be loaded.
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db = SessionLocal()
+    try:
+        return get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+    finally:
+        db.close()
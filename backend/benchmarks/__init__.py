@@ -0,0 +1,22 @@
+"""
+Micro-benchmarks for the GitHub Zen backend.
+
+Run from the backend directory, e.g. `python -m benchmarks.bench_list_serialization`.
+Each script works on a throwaway database and never touches GitHub.
+"""
+
+import os
+import sys
+
+
+def bootstrap(database_url: str = "sqlite://", **overrides: str):
+    """Set the settings a benchmark needs before backend modules are imported"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("GITHUB_CLIENT_ID", "benchmark")
+    os.environ.setdefault("GITHUB_CLIENT_SECRET", "benchmark")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    for key, value in overrides.items():
+        os.environ[key.upper()] = value
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
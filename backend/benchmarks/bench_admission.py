@@ -0,0 +1,125 @@
+"""
+Cheap read latency during a sync storm, with and without admission control.
+
+Logs in a set of users against the fake GitHub API, then has every user hammer
+POST /pull-requests/sync while one probe keeps timing GET /repositories.
+Each mode runs in a fresh interpreter against the in-process app.
+
+    python -m benchmarks.bench_admission --users 20 --storm 40 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+
+async def storm(users: int, storm_size: int, seconds: float) -> dict:
+    import httpx
+
+    from loadtest.fake_github import code_for
+    from main import app
+
+    await app.router.startup()
+    async with httpx.AsyncClient(app=app, base_url="http://github-zen", timeout=120) as client:
+        headers = []
+        for index in range(users):
+            response = await client.post("/auth/github", json={"code": code_for(f"user{index}")})
+            headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+        async def probe(duration: float) -> list:
+            latencies = []
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/repositories", headers=headers[0])
+                latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+            return latencies
+
+        idle = await probe(2.0)
+
+        results = {"syncs": 0, "rejected": 0}
+        deadline = time.perf_counter() + seconds
+
+        async def syncer(index: int):
+            while time.perf_counter() < deadline:
+                response = await client.post("/pull-requests/sync", headers=headers[index % users])
+                if response.status_code == 429:
+                    results["rejected"] += 1
+                    await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+                else:
+                    results["syncs"] += 1
+
+        tasks = [asyncio.ensure_future(syncer(i)) for i in range(storm_size)]
+        busy = await probe(seconds)
+        await asyncio.gather(*tasks)
+    await app.router.shutdown()
+    return {
+        **results,
+        "idle_p50_ms": percentile(idle, 0.5),
+        "storm_p50_ms": percentile(busy, 0.5),
+        "storm_p95_ms": percentile(busy, 0.95),
+        "storm_max_ms": percentile(busy, 1.0),
+    }
+
+
+def run_child(mode: str, args, github_url: str, database_url: str) -> dict:
+    env = {
+        **os.environ,
+        "GITHUB_API_URL": github_url,
+        "GITHUB_OAUTH_URL": github_url,
+        "DATABASE_URL": database_url,
+        "ADMISSION_ENABLED": "true" if mode == "admission" else "false",
+        "GITHUB_CLIENT_ID": "benchmark",
+        "GITHUB_CLIENT_SECRET": "benchmark",
+        "SECRET_KEY": "benchmark-secret",
+    }
+    command = [
+        sys.executable, "-m", "benchmarks.bench_admission", "--child",
+        "--users", str(args.users), "--storm", str(args.storm), "--seconds", str(args.seconds),
+    ]
+    output = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--storm", type=int, default=40, help="Concurrent sync loops")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--latency", default="fixed:0.02", help="Fake GitHub latency profile")
+    parser.add_argument("--port", type=int, default=9032)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(storm(args.users, args.storm, args.seconds))))
+        return
+
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer, LatencyProfile
+
+    config = FakeGitHubConfig(users=args.users, repos_per_user=20, latency=LatencyProfile.parse(args.latency))
+    with FakeGitHubServer(config, port=args.port) as github, tempfile.TemporaryDirectory() as tmp:
+        print(f"{'mode':<10} {'syncs':>6} {'429s':>6} {'idle p50':>9} {'storm p50':>10} {'storm p95':>10} {'storm max':>10}")
+        for mode in ("none", "admission"):
+            row = run_child(mode, args, github.url, f"sqlite:///{os.path.join(tmp, mode + '.db')}")
+            print(f"{mode:<10} {row['syncs']:>6} {row['rejected']:>6} {row['idle_p50_ms']:>9.1f} "
+                  f"{row['storm_p50_ms']:>10.1f} {row['storm_p95_ms']:>10.1f} {row['storm_max_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Compare database engine profiles under concurrent sync writes and list reads.
+
+Writer threads upsert pull requests one commit per row, as
+PullRequestService.sync_user_pull_requests does; reader threads run the
+/pull-requests list query. Reports throughput, read p95 and lock errors.
+
+    python -m benchmarks.bench_engine_profiles --profiles default,sqlite-wal --seconds 10
+    python -m benchmarks.bench_engine_profiles --url postgresql://... --profiles default,postgres-pooled
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks import bootstrap
+
+bootstrap("sqlite://")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import build_engine  # noqa: E402
+from models import Base, PullRequest, User  # noqa: E402
+from services import PullRequestService  # noqa: E402
+
+
+def prepare(engine, rows: int) -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(github_id=1, username="bench", github_access_token="x")
+    db.add(user)
+    now = datetime(2024, 1, 1)
+    db.bulk_insert_mappings(PullRequest, [
+        {
+            "github_id": i, "number": i, "title": f"Change {i}", "body": "Benchmark body " * 10,
+            "state": "open", "repo_name": "repo", "repo_full_name": "bench/repo",
+            "author_username": "bench", "created_at": now, "updated_at": now, "synced_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def run_profile(url: str, profile: str, rows: int, writers: int, readers: int, seconds: float) -> dict:
+    engine = build_engine(url, profile)
+    user_id = prepare(engine, rows)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    results = {"writes": 0, "reads": 0, "errors": 0, "read_latencies": []}
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        db = Session()
+        while time.perf_counter() < deadline:
+            try:
+                pr = PullRequestService.get_pull_request_by_github_id(db, rng.randrange(rows))
+                pr.title = f"Change {rng.random()}"
+                pr.synced_at = datetime.utcnow()
+                db.commit()
+                with lock:
+                    results["writes"] += 1
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    results["errors"] += 1
+        db.close()
+
+    def reader():
+        db = Session()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                PullRequestService.get_pull_request_rows_by_user(db, user_id)
+                db.rollback()
+                with lock:
+                    results["reads"] += 1
+                    results["read_latencies"].append(time.perf_counter() - start)
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    results["errors"] += 1
+        db.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    latencies = sorted(results["read_latencies"])
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+    return {
+        "profile": profile,
+        "writes_per_s": results["writes"] / seconds,
+        "reads_per_s": results["reads"] / seconds,
+        "read_p95_ms": p95 * 1000,
+        "errors": results["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--profiles", default="default,sqlite-wal")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'profile':<18} {'writes/s':>10} {'reads/s':>10} {'read p95 ms':>12} {'errors':>8}")
+        for profile in args.profiles.split(","):
+            url = args.url or f"sqlite:///{os.path.join(tmp, profile + '.db')}"
+            row = run_profile(url, profile, args.rows, args.writers, args.readers, args.seconds)
+            print(f"{row['profile']:<18} {row['writes_per_s']:>10.1f} {row['reads_per_s']:>10.1f} "
+                  f"{row['read_p95_ms']:>12.1f} {row['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
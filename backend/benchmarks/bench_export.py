@@ -0,0 +1,113 @@
+"""
+Rows per second and peak memory of the bulk export against the JSON list path.
+
+Seeds one user's pull requests, then reads them all through:
+
+    json     PullRequestService.get_pull_request_rows_by_user -> orjson (what /pull-requests does)
+    ndjson   export.stream_export, NDJSON
+    arrow    export.stream_export, Arrow IPC stream
+    parquet  export.stream_export, Parquet
+    arrow-3  export.stream_export, Arrow with only id, state and updated_at
+
+Each path is timed once as is and once under tracemalloc for the peak of
+Python allocations.
+
+    python -m benchmarks.bench_export --rows 200000 --batch-size 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks import bootstrap
+
+_tmp = tempfile.TemporaryDirectory()
+bootstrap(f"sqlite:///{os.path.join(_tmp.name, 'export.db')}")
+
+import orjson  # noqa: E402
+
+import export  # noqa: E402
+from database import SessionLocal, create_tables  # noqa: E402
+from models import PullRequest, User  # noqa: E402
+from services import PullRequestService  # noqa: E402
+
+
+def seed(rows: int) -> int:
+    create_tables()
+    db = SessionLocal()
+    user = User(github_id=1, username="bench", github_access_token="x")
+    db.add(user)
+    now = datetime(2024, 1, 1)
+    for start in range(0, rows, 50000):
+        db.bulk_insert_mappings(PullRequest, [
+            {
+                "github_id": i, "number": i, "title": f"Change {i} to the widget parser", "body": "Benchmark body " * 20,
+                "state": "open", "html_url": f"https://github.com/bench/repo/pull/{i}", "repo_name": f"repo-{i % 50}",
+                "repo_full_name": f"bench/repo-{i % 50}", "author_username": "bench",
+                "author_avatar_url": "https://avatars.example.com/u/1", "head_ref": f"feature/{i}",
+                "created_at": now, "updated_at": now + timedelta(minutes=i), "synced_at": now,
+            }
+            for i in range(start, min(start + 50000, rows))
+        ])
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def json_list(user_id: int, batch_size: int) -> int:
+    db = SessionLocal()
+    try:
+        return len(orjson.dumps(PullRequestService.get_pull_request_rows_by_user(db, user_id, "open")))
+    finally:
+        db.close()
+
+
+def exporter(format: str, columns=None):
+    def run(user_id: int, batch_size: int) -> int:
+        names = export.resolve_columns("pull_requests", format, columns)
+        chunks = export.stream_export(
+            SessionLocal, "pull_requests", format, names, user_id, "bench", batch_size=batch_size
+        )
+        return sum(len(chunk) for chunk in chunks)
+    return run
+
+
+PATHS = {
+    "json": json_list,
+    "ndjson": exporter("ndjson"),
+    "arrow": exporter("arrow"),
+    "parquet": exporter("parquet"),
+    "arrow-3": exporter("arrow", "id,state,updated_at"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    if not export.pyarrow_available():
+        for name in ("arrow", "parquet", "arrow-3"):
+            del PATHS[name]
+        print("pyarrow is not installed: only json and ndjson are measured")
+    user_id = seed(args.rows)
+
+    print(f"{'path':<8} {'seconds':>8} {'rows/s':>10} {'MB out':>8} {'traced peak MB':>15}")
+    for name, path in PATHS.items():
+        start = time.perf_counter()
+        size = path(user_id, args.batch_size)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        path(user_id, args.batch_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<8} {seconds:>8.2f} {args.rows / seconds:>10.0f} {size / 2 ** 20:>8.1f} {peak / 2 ** 20:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
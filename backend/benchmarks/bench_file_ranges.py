@@ -0,0 +1,83 @@
+"""
+Line-range reads of a large file through the blob store against splitting the whole file.
+
+Writes a synthetic log of `--mb` megabytes into a BlobStore in 64 KB chunks
+(as a streamed blob arrives), then reads `--reads` random windows of
+`--window` lines two ways:
+
+    split   decode the whole file and slice splitlines() (what serving the full content costs)
+    index   BlobStore.read_lines: two offset lookups and one seek
+
+    python -m benchmarks.bench_file_ranges --mb 200 --window 200 --reads 200
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import bootstrap
+
+bootstrap()
+
+from blobs import BlobStore  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def synthetic_log(megabytes: int):
+    """About 64 KB chunks of log lines, `megabytes` MB in total"""
+    chunk = "".join(f"{i:>9} GET /api/items/{i % 7919} 200 in {i % 997:>3} ms\n" for i in range(CHUNK // 48)).encode()
+    for _ in range(megabytes * 2 ** 20 // len(chunk) + 1):
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=200, help="File size in MB")
+    parser.add_argument("--window", type=int, default=200, help="Lines per read")
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = BlobStore(directory, max_bytes=2 ** 40)
+        start = time.perf_counter()
+        writer = store.writer("bench")
+        for chunk in synthetic_log(args.mb):
+            writer.write(chunk)
+        writer.commit()
+        index_seconds = time.perf_counter() - start
+        total_lines, size = store.describe("bench")
+        print(f"{size / 2 ** 20:.0f} MB, {total_lines} lines: stored and indexed in {index_seconds:.2f}s "
+              f"({size / 2 ** 20 / index_seconds:.0f} MB/s)")
+
+        rng = random.Random(1)
+        starts = [rng.randint(1, total_lines - args.window + 1) for _ in range(args.reads)]
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        for first in starts[:5]:
+            with open(store.path("bench"), "rb") as blob:
+                lines = blob.read().decode().splitlines(keepends=True)
+            "".join(lines[first - 1:first - 1 + args.window])
+            del lines
+        split_ms = (time.perf_counter() - start) / 5 * 1000
+        split_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        for first in starts:
+            store.read_lines("bench", first, first + args.window - 1).decode()
+        index_ms = (time.perf_counter() - start) / args.reads * 1000
+        index_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{'path':<6} {'ms/read':>9} {'traced peak MB':>15}")
+        print(f"{'split':<6} {split_ms:>9.1f} {split_peak / 2 ** 20:>15.1f}")
+        print(f"{'index':<6} {index_ms:>9.3f} {index_peak / 2 ** 20:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
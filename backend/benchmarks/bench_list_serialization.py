@@ -0,0 +1,105 @@
+"""
+CPU time of the /pull-requests and /repositories list paths per 10k rows.
+
+before: ORM hydration -> response_model (orm_mode) validation -> jsonable_encoder -> json
+after:  column projection -> plain dicts -> orjson
+
+    python -m benchmarks.bench_list_serialization --rows 10000 --repeat 5
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import bootstrap
+
+bootstrap("sqlite://")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+from database import SessionLocal, create_tables  # noqa: E402
+from models import PullRequest, Repository, User  # noqa: E402
+from schemas import PullRequestResponse, RepositoryResponse  # noqa: E402
+from services import PullRequestService, RepositoryService  # noqa: E402
+
+
+def seed(db, rows: int) -> User:
+    user = User(github_id=1, username="bench", github_access_token="x")
+    db.add(user)
+    now = datetime(2024, 1, 1)
+    db.bulk_insert_mappings(Repository, [
+        {
+            "github_id": i, "name": f"repo-{i}", "full_name": f"bench/repo-{i}",
+            "description": "Benchmark repository " * 4, "html_url": f"https://github.com/bench/repo-{i}",
+            "language": "Python", "stargazers_count": i % 500, "forks_count": i % 50, "private": False,
+            "owner_username": "bench", "owner_avatar_url": "https://avatars.example.com/u/1",
+            "updated_at": now + timedelta(minutes=i), "created_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.bulk_insert_mappings(PullRequest, [
+        {
+            "github_id": i, "number": i, "title": f"Change {i}", "body": "Benchmark body " * 20,
+            "state": "open", "html_url": f"https://github.com/bench/repo/pull/{i}", "repo_name": "repo",
+            "repo_full_name": "bench/repo", "author_username": "bench",
+            "author_avatar_url": "https://avatars.example.com/u/1", "head_ref": f"feature/{i}",
+            "created_at": now, "updated_at": now + timedelta(minutes=i), "synced_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return user
+
+
+def orm_path(db, user, orm_query, response_model) -> bytes:
+    objects = orm_query(db, user.id)
+    validated = [response_model.from_orm(obj) for obj in objects]
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(db, user, rows_query) -> bytes:
+    return ORJSONResponse(rows_query(db, user.id)).body
+
+
+def measure(fn, repeat: int) -> float:
+    """Best-of-N CPU seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    user = seed(db, args.rows)
+    scale = 10000 / args.rows
+
+    cases = [
+        ("/repositories",
+         lambda: orm_path(db, user, RepositoryService.get_repositories_by_user, RepositoryResponse),
+         lambda: fast_path(db, user, RepositoryService.get_repository_rows_by_user)),
+        ("/pull-requests",
+         lambda: orm_path(db, user, PullRequestService.get_pull_requests_by_user, PullRequestResponse),
+         lambda: fast_path(db, user, PullRequestService.get_pull_request_rows_by_user)),
+    ]
+    print(f"{'endpoint':<16} {'before ms/10k':>14} {'after ms/10k':>14} {'speedup':>8}")
+    for name, before, after in cases:
+        db.expire_all()
+        before_s = measure(before, args.repeat) * scale
+        db.expire_all()
+        after_s = measure(after, args.repeat) * scale
+        print(f"{name:<16} {before_s * 1000:>14.1f} {after_s * 1000:>14.1f} {before_s / after_s:>7.1f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Throughput of the owner-partitioned sync against a large synthetic organization.
+
+Runs org_sync.OwnerSync against the fake GitHub API for one user in one
+organization, once per concurrency / page batch setting, each on a fresh
+database, and reports repositories and pull requests synced per second. A
+last `resync` row syncs the final database again, when only pull requests
+updated since the first run are fetched.
+
+    python -m benchmarks.bench_org_sync --repos 5000 --prs 3 --latency fixed:0.02
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+
+from benchmarks import bootstrap
+
+_tmp = tempfile.TemporaryDirectory()
+bootstrap(f"sqlite:///{os.path.join(_tmp.name, 'org_sync.db')}")
+
+from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer, LatencyProfile, token_for  # noqa: E402
+
+MODES = [(1, 1), (4, 4), (8, 4), (16, 4)]
+
+
+async def run(github_url: str, concurrency: int, page_batch: int, fresh: bool = True) -> dict:
+    from config import settings
+    from database import SessionLocal, create_tables, engine
+    from github_client import GitHubClient
+    from models import Base, User
+    from org_sync import OwnerSync
+
+    if fresh:
+        create_tables()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+            connection.exec_driver_sql("DELETE FROM pull_request_fts")
+            connection.exec_driver_sql("DELETE FROM comment_fts")
+    db = SessionLocal()
+    if fresh:
+        db.add(User(github_id=1000, username="user0", github_access_token=token_for("user0")))
+        db.commit()
+    user = db.query(User).filter(User.username == "user0").one()
+    settings.github_api_url = github_url
+    async with GitHubClient(user.github_access_token) as github_client:
+        sync = OwnerSync(db, user, github_client)
+        sync.concurrency, sync.page_batch = concurrency, page_batch
+        result = await sync.run(["org0"])
+    db.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", type=int, default=5000, help="Repositories in the organization")
+    parser.add_argument("--prs", type=int, default=3, help="Pull requests per repository")
+    parser.add_argument("--latency", default="fixed:0.02", help="Fake GitHub latency profile")
+    parser.add_argument("--port", type=int, default=9033)
+    args = parser.parse_args()
+
+    config = FakeGitHubConfig(
+        users=1, repos_per_user=1, orgs=1, repos_per_org=args.repos, prs_per_repo=args.prs,
+        rate_limit=10 ** 6, latency=LatencyProfile.parse(args.latency),
+    )
+    with FakeGitHubServer(config, port=args.port) as github:
+        print(f"{'concurrency':>11} {'batch':>6} {'repos':>6} {'PRs':>7} {'calls':>6} {'seconds':>8} "
+              f"{'repos/s':>8} {'PRs/s':>8}")
+        for concurrency, page_batch, fresh in [mode + (True,) for mode in MODES] + [MODES[-1] + (False,)]:
+            result = asyncio.run(run(github.url, concurrency, page_batch, fresh))
+            seconds = result["seconds"]
+            label = concurrency if fresh else "resync"
+            print(f"{label:>11} {page_batch:>6} {result['repositories']:>6} {result['pull_requests']:>7} "
+                  f"{result['github_calls']:>6} {seconds:>8.1f} {result['repositories'] / seconds:>8.1f} "
+                  f"{result['pull_requests'] / seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
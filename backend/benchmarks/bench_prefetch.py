@@ -0,0 +1,94 @@
+"""
+First-click latency after login, with and without the prefetch warm-up.
+
+Logs a user in against the fake GitHub API (which triggers the sync and, when
+enabled, the prefetch run), waits `--think` seconds, then opens each of the
+user's most recently updated repositories the way the UI does: root
+contents, README and open pull requests. A different user is used per mode
+so the two never share cache entries.
+
+    python -m benchmarks.bench_prefetch --repos 5 --latency fixed:0.1 --think 1
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLICKS = {
+    "contents": "/repositories/{name}/contents",
+    "readme": "/repositories/{name}/file?path=README.md",
+    "pulls": "/repositories/{name}/pull-requests?state=open",
+}
+
+
+async def first_clicks(client, login: str, repos: int, think: float) -> dict:
+    from loadtest.fake_github import code_for
+    from prefetch import prefetcher
+
+    start = time.perf_counter()
+    response = await client.post("/auth/github", json={"code": code_for(login)})
+    login_seconds = time.perf_counter() - start
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await asyncio.sleep(think)
+
+    repositories = (await client.get("/repositories", headers=headers)).json()
+    recent = sorted(repositories, key=lambda repo: repo["updated_at"], reverse=True)[:repos]
+    latencies = {kind: [] for kind in CLICKS}
+    for repo in recent:
+        for kind, url in CLICKS.items():
+            start = time.perf_counter()
+            response = await client.get(url.format(name=repo["name"]), headers=headers)
+            response.raise_for_status()
+            latencies[kind].append(time.perf_counter() - start)
+    await asyncio.gather(*(run.task for run in list(prefetcher.runs.values())), return_exceptions=True)
+    return {"login": login_seconds, **latencies}
+
+
+async def run(args) -> list:
+    import httpx
+
+    from main import app
+    from prefetch import prefetcher
+
+    await app.router.startup()
+    rows = []
+    async with httpx.AsyncClient(app=app, base_url="http://github-zen", timeout=120) as client:
+        for index, enabled in enumerate((False, True)):
+            prefetcher.enabled = enabled
+            result = await first_clicks(client, f"user{index}", args.repos, args.think)
+            rows.append(("prefetch" if enabled else "cold", result))
+    await app.router.shutdown()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", type=int, default=5, help="Repositories opened after login")
+    parser.add_argument("--think", type=float, default=1.0, help="Seconds between login and the first click")
+    parser.add_argument("--latency", default="fixed:0.1", help="Fake GitHub latency profile")
+    parser.add_argument("--port", type=int, default=9034)
+    args = parser.parse_args()
+
+    from loadtest.driver import configure_in_process_backend
+    from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer, LatencyProfile
+
+    config = FakeGitHubConfig(users=2, repos_per_user=20, latency=LatencyProfile.parse(args.latency))
+    with FakeGitHubServer(config, port=args.port) as github, tempfile.TemporaryDirectory() as tmp:
+        configure_in_process_backend(github.url, f"sqlite:///{os.path.join(tmp, 'prefetch.db')}")
+        rows = asyncio.run(run(args))
+
+        from prefetch import prefetcher
+        print(f"{'mode':<9} {'login s':>8} " + " ".join(f"{kind + ' ms':>12}" for kind in CLICKS))
+        for mode, result in rows:
+            means = [sum(result[kind]) / len(result[kind]) * 1000 for kind in CLICKS]
+            print(f"{mode:<9} {result['login']:>8.2f} " + " ".join(f"{mean:>12.1f}" for mean in means))
+        stats = prefetcher.stats()
+        print(f"prefetch: {stats['requests']} requests, {stats['bytes']} bytes, hit rate {stats['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Effect of archiving old closed pull requests on the hot list queries.
+
+Seeds a user with mostly closed, old pull requests (and a few comments each),
+times the /pull-requests list, its ETag fingerprint and a search, then runs
+retention.archive_closed_pull_requests and retention.compact and times them
+again.
+
+    python -m benchmarks.bench_retention --prs 50000 --open 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import bootstrap
+
+_tmp = tempfile.TemporaryDirectory()
+DATABASE_PATH = os.path.join(_tmp.name, "retention.db")
+bootstrap(f"sqlite:///{DATABASE_PATH}")
+
+import search  # noqa: E402
+from database import SessionLocal, create_tables, engine  # noqa: E402
+from models import Comment, PullRequest, User  # noqa: E402
+from retention import archive_closed_pull_requests, compact  # noqa: E402
+from services import PullRequestService  # noqa: E402
+
+
+def prepare(prs: int, open_prs: int, comments_per_pr: int) -> int:
+    create_tables()
+    db = SessionLocal()
+    user = User(github_id=1, username="bench", github_access_token="x")
+    db.add(user)
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(PullRequest, [
+        {
+            "github_id": i, "number": i, "title": f"Change {i} to the widget parser", "body": "Benchmark body " * 10,
+            "state": "open" if i < open_prs else "closed", "repo_name": f"repo-{i % 20}",
+            "repo_full_name": f"bench/repo-{i % 20}", "author_username": "bench",
+            "created_at": now - timedelta(days=2 * 365), "synced_at": now,
+            # Open PRs are recent; closed ones are spread over the last three years
+            "updated_at": now - timedelta(days=0 if i < open_prs else i % (3 * 365)),
+        }
+        for i in range(prs)
+    ])
+    db.bulk_insert_mappings(Comment, [
+        {
+            "github_id": i * comments_per_pr + j, "pull_request_id": i, "repo_full_name": f"bench/repo-{i % 20}",
+            "body": "Looks good to me " * 5, "author_username": "reviewer", "created_at": now, "updated_at": now,
+        }
+        for i in range(prs) for j in range(comments_per_pr)
+    ])
+    db.commit()
+    user_id = user.id
+    db.close()
+    # Index the seeded rows like the sync path does
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM pull_request_fts")
+        connection.exec_driver_sql("DELETE FROM comment_fts")
+    search.ensure_schema(engine)
+    return user_id
+
+
+def timed(fn, repeat: int) -> float:
+    """Median milliseconds of `repeat` calls"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def measure(user_id: int, repeat: int) -> dict:
+    db = SessionLocal()
+    queries = {
+        "open list": lambda: PullRequestService.get_pull_request_rows_by_user(db, user_id, "open"),
+        "closed list": lambda: PullRequestService.get_pull_request_rows_by_user(db, user_id, "closed"),
+        "fingerprint": lambda: PullRequestService.get_pull_request_list_fingerprint(db, user_id, "closed"),
+        "search": lambda: search.search_pull_requests(db, "bench", "widget pars"),
+    }
+    results = {name: timed(query, repeat) for name, query in queries.items()}
+    db.close()
+    results["db MB"] = os.path.getsize(DATABASE_PATH) / 2 ** 20
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prs", type=int, default=50000)
+    parser.add_argument("--open", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=3, help="Comments per pull request")
+    parser.add_argument("--days", type=int, default=365, help="Archive closed PRs not updated for this long")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    user_id = prepare(args.prs, args.open, args.comments)
+    before = measure(user_id, args.repeat)
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    archived = archive_closed_pull_requests(db, args.days)
+    db.close()
+    archive_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    compact(engine, vacuum=args.vacuum)
+    compact_seconds = time.perf_counter() - start
+    after = measure(user_id, args.repeat)
+
+    print(f"archived {archived['pull_requests']} PRs and {archived['comments']} comments in {archive_seconds:.1f}s, "
+          f"compacted in {compact_seconds:.1f}s")
+    print(f"{'query':<12} {'before':>10} {'after':>10}")
+    for name in before:
+        unit = "" if name == "db MB" else " ms"
+        print(f"{name:<12} {before[name]:>10.1f} {after[name]:>10.1f}{unit}")
+
+
+if __name__ == "__main__":
+    main()
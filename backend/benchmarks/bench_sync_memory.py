@@ -0,0 +1,137 @@
+"""
+Memory used by a pull request sync of 5k PRs, full vs slim GitHub records.
+
+full: response.json() per page -> GitHubPullRequest with the whole user/base/head
+      objects (and their embedded repos), full pages kept in the response cache
+slim: the page is streamed and each PR is reduced to the mapped fields as soon
+      as it is parsed (GitHubClient.get_pull_requests)
+
+Each mode runs in a fresh interpreter against the fake GitHub API, once for
+peak RSS and once under tracemalloc for the peak of Python allocations.
+
+    python -m benchmarks.bench_sync_memory --prs 5000
+    python -m benchmarks.bench_sync_memory --prs 5000 --parse-only
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = 100
+REPO = "user0/repo-0"
+
+
+async def sync(mode: str, parse_only: bool) -> int:
+    import httpx
+
+    from cache import cache
+    from database import SessionLocal, create_tables
+    from github_client import GitHubClient
+    from loadtest.fake_github import token_for
+    from schemas import GitHubPullRequest
+    from services import PullRequestService
+
+    create_tables()
+    db = SessionLocal()
+    github_client = GitHubClient(token_for("user0"))
+    synced = 0
+    async with httpx.AsyncClient() as http, github_client:
+        page = 1
+        while True:
+            if mode == "slim":
+                prs = await github_client.get_pull_requests(REPO, "all", page=page, per_page=PAGE_SIZE)
+            else:
+                url = f"{github_client.base_url}/repos/{REPO}/pulls"
+                params = {"state": "all", "page": page, "per_page": PAGE_SIZE}
+                response = await http.get(url, headers=github_client.headers, params=params)
+                data = response.json()
+                cache.set(github_client._cache_key(url, params), {"data": data, "etag": None, "fetched_at": 0})
+                prs = [GitHubPullRequest(**pr) for pr in data]
+            if not parse_only:
+                for pr in prs:
+                    PullRequestService.upsert_from_github(db, pr)
+            synced += len(prs)
+            if len(prs) < PAGE_SIZE:
+                break
+            page += 1
+    db.close()
+    return synced
+
+
+def child(mode: str, trace: bool, parse_only: bool):
+    """Run one sync in this process and print its measurements as JSON"""
+    import resource
+    import tracemalloc
+
+    if trace:
+        tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    synced = asyncio.run(sync(mode, parse_only))
+    result = {
+        "mode": mode,
+        "synced": synced,
+        "seconds": time.perf_counter() - start,
+        "retained_blocks": sys.getallocatedblocks() - blocks_before,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if trace:
+        result["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    print(json.dumps(result))
+
+
+def run_child(mode: str, trace: bool, parse_only: bool, github_url: str, database_url: str) -> dict:
+    env = {
+        **os.environ,
+        "GITHUB_API_URL": github_url,
+        "DATABASE_URL": database_url,
+        "CACHE_MAX_ENTRIES": "100000",
+        "GITHUB_CLIENT_ID": "benchmark",
+        "GITHUB_CLIENT_SECRET": "benchmark",
+        "SECRET_KEY": "benchmark-secret",
+    }
+    args = [sys.executable, "-m", "benchmarks.bench_sync_memory", "--child", mode]
+    args += ["--trace"] if trace else []
+    args += ["--parse-only"] if parse_only else []
+    output = subprocess.run(args, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prs", type=int, default=5000)
+    parser.add_argument("--modes", default="full,slim")
+    parser.add_argument("--parse-only", action="store_true", help="Skip the database upserts")
+    parser.add_argument("--port", type=int, default=9031)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.trace, args.parse_only)
+        return
+
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer
+
+    config = FakeGitHubConfig(users=1, repos_per_user=1, prs_per_repo=args.prs)
+    with FakeGitHubServer(config, port=args.port) as github, tempfile.TemporaryDirectory() as tmp:
+        print(f"{'mode':<6} {'PRs':>6} {'seconds':>8} {'peak RSS MB':>12} {'traced peak MB':>15} {'retained blocks':>16}")
+        for mode in args.modes.split(","):
+            urls = [f"sqlite:///{os.path.join(tmp, f'{mode}-{i}.db')}" for i in range(2)]
+            plain = run_child(mode, False, args.parse_only, github.url, urls[0])
+            traced = run_child(mode, True, args.parse_only, github.url, urls[1])
+            print(f"{mode:<6} {plain['synced']:>6} {plain['seconds']:>8.1f} {plain['peak_rss_mb']:>12.1f} "
+                  f"{traced['traced_peak_mb']:>15.1f} {plain['retained_blocks']:>16}")
+
+
+if __name__ == "__main__":
+    main()
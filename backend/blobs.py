@@ -0,0 +1,242 @@
+"""
+File content and line-offset indexes cached on disk by blob SHA.
+
+A blob never changes, so once stored it is only evicted to stay under
+FILE_BLOB_CACHE_MAX_BYTES (least recently read first). Each blob is kept as
+two files in FILE_BLOB_CACHE_DIR:
+
+- `{sha}`: the raw bytes
+- `{sha}.lines`: the byte offset at which every line starts, as unsigned
+  64-bit integers
+
+The index is built in the same pass that writes the bytes, so a line range is
+then read with two 8-byte index lookups and one seek into the blob, however
+large the file: neither the blob nor its index is loaded into memory.
+
+Readers hold a blob with `pinned`, which keeps it from being evicted until they
+are done. Its file I/O runs in the threadpool, off the event loop.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from itertools import accumulate
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from metrics import register_collector
+
+OFFSET_SIZE = array("Q").itemsize
+
+
+class BlobWriter:
+    """Writes a blob and its line index as chunks arrive; `commit` makes both visible"""
+
+    def __init__(self, store: "BlobStore", sha: str):
+        self.store = store
+        self.sha = sha
+        self.size = 0
+        self.lines = 0
+        self.line_start = True  # whether the next byte starts a line
+        self.blob = open(store.path(sha) + ".tmp", "wb")
+        self.index = open(store.path(sha) + ".lines.tmp", "wb")
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        # Offsets after each newline, starting from this chunk's own; split and accumulate
+        # run in C, about twice as fast as a find() loop
+        offsets = array("Q", accumulate((len(line) + 1 for line in chunk.split(b"\n")[:-1]), initial=self.size))
+        if not self.line_start:
+            offsets.pop(0)
+        self.line_start = chunk.endswith(b"\n")
+        if self.line_start:
+            offsets.pop()  # the end of the chunk; whether a line starts there depends on the next one
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        offsets.tofile(self.index)
+        self.blob.write(chunk)
+        self.size += len(chunk)
+        self.lines += len(offsets)
+
+    def commit(self):
+        self.blob.close()
+        self.index.close()
+        path = self.store.path(self.sha)
+        # Index first: a blob file without its index is never treated as stored
+        os.replace(path + ".lines.tmp", path + ".lines")
+        os.replace(path + ".tmp", path)
+        self.store._added(self.sha, self.size + self.lines * OFFSET_SIZE)
+
+    def abort(self):
+        for handle in (self.blob, self.index):
+            handle.close()
+            try:
+                os.remove(handle.name)
+            except FileNotFoundError:
+                pass
+
+
+class BlobStore:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # SHA -> bytes on disk (blob plus index), least recently read first; loaded on first use
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._loading: Dict[str, asyncio.Lock] = {}
+        self._pins: Dict[str, int] = {}  # SHA -> readers holding it, never evicted
+        self._lock = threading.RLock()  # entries and pins are shared with the threadpool
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.range_reads = 0
+
+    def path(self, sha: str) -> str:
+        return os.path.join(self.directory, sha)
+
+    def _load(self) -> "OrderedDict[str, int]":
+        with self._lock:
+            if self._entries is None:
+                os.makedirs(self.directory, exist_ok=True)
+                found = []
+                for name in os.listdir(self.directory):
+                    if name.endswith(".tmp"):
+                        os.remove(os.path.join(self.directory, name))
+                    elif not name.endswith(".lines") and os.path.exists(self.path(name) + ".lines"):
+                        blob, index = os.stat(self.path(name)), os.stat(self.path(name) + ".lines")
+                        found.append((blob.st_mtime, name, blob.st_size + index.st_size))
+                self._entries = OrderedDict((name, size) for _, name, size in sorted(found))
+            return self._entries
+
+    def _added(self, sha: str, size: int):
+        with self._lock:
+            entries = self._load()
+            entries[sha] = size
+            entries.move_to_end(sha)
+            total = sum(entries.values())
+            for evicted in list(entries):
+                if total <= self.max_bytes:
+                    break
+                if evicted == sha or self._pins.get(evicted):
+                    continue
+                evicted_size = entries.pop(evicted)
+                for name in (evicted, evicted + ".lines"):
+                    try:
+                        os.remove(self.path(name))
+                    except FileNotFoundError:
+                        pass
+                total -= evicted_size
+                self.evictions += 1
+
+    def contains(self, sha: str) -> bool:
+        return sha in self._load()
+
+    def writer(self, sha: str) -> BlobWriter:
+        self._load()
+        return BlobWriter(self, sha)
+
+    def put(self, sha: str, content: bytes):
+        writer = self.writer(sha)
+        try:
+            writer.write(content)
+            writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+
+    async def ensure(self, sha: str, fetch: Callable[[], AsyncIterator[bytes]]):
+        """Store a blob unless it already is, streaming it from `fetch` once however many ask"""
+        if self._entries is None:
+            await run_in_threadpool(self._load)
+        if self.contains(sha):
+            self.hits += 1
+            return
+        lock = self._loading.setdefault(sha, asyncio.Lock())
+        async with lock:
+            if self.contains(sha):
+                self.hits += 1
+                return
+            self.misses += 1
+            writer = await run_in_threadpool(self.writer, sha)
+            try:
+                async for chunk in fetch():
+                    await run_in_threadpool(writer.write, chunk)
+                await run_in_threadpool(writer.commit)
+            except BaseException:
+                writer.abort()
+                raise
+            finally:
+                self._loading.pop(sha, None)
+
+    @asynccontextmanager
+    async def pinned(self, sha: str, fetch: Callable[[], AsyncIterator[bytes]]):
+        """ensure() a blob and keep it from being evicted until the block exits"""
+        with self._lock:
+            self._pins[sha] = self._pins.get(sha, 0) + 1
+        try:
+            await self.ensure(sha, fetch)
+            yield
+        finally:
+            with self._lock:
+                self._pins[sha] -= 1
+                if not self._pins[sha]:
+                    del self._pins[sha]
+
+    def describe(self, sha: str) -> Tuple[int, int]:
+        """(total lines, size in bytes) of a stored blob"""
+        path = self.path(sha)
+        return os.path.getsize(path + ".lines") // OFFSET_SIZE, os.path.getsize(path)
+
+    def _offset(self, index, line: int) -> int:
+        """Byte offset at which a 0-based line starts"""
+        index.seek(line * OFFSET_SIZE)
+        offsets = array("Q")
+        offsets.frombytes(index.read(OFFSET_SIZE))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        return offsets[0]
+
+    def read_lines(self, sha: str, start: int, end: int) -> bytes:
+        """Bytes of lines start..end (1-based, inclusive, already within the blob)"""
+        entries = self._load()
+        path = self.path(sha)
+        with self._lock:
+            if sha in entries:
+                entries.move_to_end(sha)
+                os.utime(path)  # keeps the read order across restarts
+        total, size = self.describe(sha)
+        self.range_reads += 1
+        with open(path + ".lines", "rb") as index:
+            begin = self._offset(index, start - 1)
+            finish = self._offset(index, end) if end < total else size
+        with open(path, "rb") as blob:
+            blob.seek(begin)
+            return blob.read(finish - begin)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._load()
+        lookups = self.hits + self.misses
+        with self._lock:
+            blobs, size = len(entries), sum(entries.values())
+        return {
+            "blobs": blobs,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "pinned": len(self._pins),
+            "range_reads": self.range_reads,
+        }
+
+
+# Global blob store
+blob_store = BlobStore(settings.file_blob_cache_dir, settings.file_blob_cache_max_bytes)
+register_collector("blobs", blob_store.stats)
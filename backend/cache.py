@@ -0,0 +1,244 @@
+"""
+Key/value cache with pluggable backends.
+
+- LRUCache: in-process, fastest, one copy per worker
+- SQLiteCache: a WAL-mode SQLite file shared by every worker on the host
+
+Both backends have the same semantics: values expire `ttl` seconds after they
+are set, `delete` / `delete_prefix` invalidate immediately, and `stats()`
+reports hit/miss/eviction counters for this process.
+"""
+
+import abc
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import settings
+from metrics import register_collector
+
+
+class CacheMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "deletes": self.deletes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CacheBackend(abc.ABC):
+    name = "base"
+
+    def __init__(self, max_entries: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.metrics = CacheMetrics()
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        """Absolute expiry for a ttl, None when the value should not be stored"""
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl > 0 else None
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    def delete_prefix(self, prefix: str):
+        ...
+
+    @abc.abstractmethod
+    def clear(self):
+        ...
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "entries": len(self), "max_entries": self.max_entries, **self.metrics.as_dict()}
+
+
+class LRUCache(CacheBackend):
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 60):
+        super().__init__(max_entries, default_ttl)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.metrics.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.metrics.expirations += 1
+                self.metrics.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.metrics.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = self._expiry(ttl)
+        if expires_at is None:
+            return
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self.metrics.sets += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.metrics.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.metrics.deletes += 1
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+                self.metrics.deletes += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """Cache stored in a WAL-mode SQLite file so every worker process shares it"""
+
+    name = "sqlite"
+
+    # Expired rows are purged, and the size bound enforced, every this many sets
+    PURGE_EVERY = 200
+
+    def __init__(self, path: str, max_entries: int = 10000, default_ttl: float = 60):
+        super().__init__(max_entries, default_ttl)
+        self.path = path
+        self._local = threading.local()
+        self._sets_since_purge = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.metrics.misses += 1
+            return None
+        if row[1] <= time.time():
+            self._conn().execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, time.time()))
+            self.metrics.expirations += 1
+            self.metrics.misses += 1
+            return None
+        self.metrics.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = self._expiry(ttl)
+        if expires_at is None:
+            return
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+        self.metrics.sets += 1
+        self._sets_since_purge += 1
+        if self._sets_since_purge >= self.PURGE_EVERY:
+            self._sets_since_purge = 0
+            self._purge()
+
+    def _purge(self):
+        conn = self._conn()
+        expired = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        self.metrics.expirations += max(expired, 0)
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            # Entries closest to expiry go first
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)",
+                (overflow,),
+            )
+            self.metrics.evictions += overflow
+
+    def delete(self, key: str):
+        if self._conn().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount:
+            self.metrics.deletes += 1
+
+    def delete_prefix(self, prefix: str):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        deleted = self._conn().execute(
+            "DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+        ).rowcount
+        self.metrics.deletes += max(deleted, 0)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def create_cache(backend: str = None) -> CacheBackend:
+    """Build the cache backend selected in settings"""
+    backend = backend or settings.cache_backend
+    if backend == "memory":
+        return LRUCache(settings.cache_max_entries, settings.cache_default_ttl)
+    if backend == "sqlite":
+        return SQLiteCache(settings.cache_path, settings.cache_max_entries, settings.cache_default_ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+# Global cache instance
+cache = create_cache()
+register_collector("cache", cache.stats)
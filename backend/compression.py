@@ -0,0 +1,97 @@
+"""
+Response compression with gzip or brotli negotiation.
+
+Only complete, single-message bodies of at least `minimum_size` bytes are
+compressed. Streaming responses (NDJSON sync, SSE events) pass through
+untouched so each event still reaches the client as soon as it is sent.
+Brotli is used when the optional `brotli` package is installed and the
+client prefers it; otherwise gzip.
+"""
+
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q-values"""
+    preferences = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        preferences[name.strip().lower()] = q
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(supported, key=lambda encoding: preferences.get(encoding, preferences.get("*", 0.0)))
+    return best if preferences.get(best, preferences.get("*", 0.0)) > 0 else None
+
+
+class CompressionMiddleware:
+    # Already compressed or streamed event formats
+    SKIP_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "image/", "application/zip")
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            passthrough = True  # only the first body message is considered
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or start_message["status"] in (204, 304)
+                or content_type.startswith(self.SKIP_CONTENT_TYPES)
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,5 +1,32 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Dict, Optional
+
+
+# Named database engine profiles, selected with DATABASE_PROFILE.
+# SQLite-only keys are ignored on other dialects and vice versa.
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # SQLAlchemy defaults (rollback journal on SQLite, default pool elsewhere)
+    "default": {},
+    # WAL lets readers proceed while a sync is writing; NORMAL sync is durable in WAL mode
+    "sqlite-wal": {
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # negative means KiB
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+    },
+    "postgres-pooled": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_recycle": 1800,
+        "pool_timeout": 10,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 15000,
+    },
+}
 
 
 class Settings(BaseSettings):
@@ -8,6 +35,10 @@ class Settings(BaseSettings):
     github_client_secret: str
     github_redirect_uri: str = "https://your-vercel-app.vercel.app/auth/callback"  # Update with your Vercel URL
     
+    # GitHub endpoints (override to point at a local stand-in API, e.g. loadtest.fake_github)
+    github_api_url: str = "https://api.github.com"
+    github_oauth_url: str = "https://github.com"
+    
     # JWT Configuration
     secret_key: str
     algorithm: str = "HS256"
@@ -15,12 +46,112 @@ class Settings(BaseSettings):
     
     # Database Configuration
     database_url: str = "sqlite:///./github_zen.db"  # Will be overridden by Render's DATABASE_URL
+    database_profile: str = "default"  # One of ENGINE_PROFILES
+    database_read_url: Optional[str] = None  # Read replica for list endpoints
+    
+    # Cache Configuration
+    cache_backend: str = "memory"  # memory (per worker) or sqlite (shared by all workers on the host)
+    cache_path: str = "./github_zen_cache.db"
+    cache_max_entries: int = 10000
+    cache_default_ttl: int = 60
+    user_cache_ttl: int = 60
+    repository_access_cache_ttl: int = 300  # Access to repositories no sync has seen, checked with GitHub
+    
+    # Live events (/events)
+    events_buffer_size: int = 100  # Per-connection buffer before the oldest events are dropped
+    events_heartbeat_seconds: int = 15
+    
+    # Background sync scheduler (enable on a single worker)
+    sync_scheduler_enabled: bool = False
+    sync_min_interval_seconds: int = 300
+    sync_max_interval_seconds: int = 6 * 3600
+    sync_jitter: float = 0.1  # +/- fraction applied to every interval
+    sync_max_concurrency: int = 4
+    sync_rate_reserve: int = 500  # Requests per token left for interactive use
+    
+    # Sync across all owners a user can access (org_sync.py)
+    org_sync_concurrency: int = 8  # Repositories whose pull requests sync at once
+    org_sync_page_batch: int = 4  # Repository list pages fetched at once
+    org_sync_overlap_seconds: int = 60  # Pull requests updated this long before the last sync are fetched again
+    
+    # GitHub upstream resilience (per-endpoint timeouts live in resilience.POLICIES)
+    github_hedging_enabled: bool = False
+    github_retry_backoff_seconds: float = 0.2
+    github_breaker_threshold: int = 5
+    github_breaker_cooldown_seconds: float = 30
+    
+    # Retention: closed PRs untouched for this many days move to the archive tables
+    retention_enabled: bool = False
+    retention_closed_pr_days: int = 365
+    retention_interval_hours: float = 24
+    retention_batch_size: int = 500
+    retention_vacuum: bool = False
+    
+    # Members of a repository share its cached GitHub responses (contents, pull request lists);
+    # a private repository's cache is only shared while a sync this recent confirmed access
+    repository_cache_sharing: bool = True
+    repository_membership_max_age_seconds: int = 6 * 3600
+    
+    # Cache warm-up after a repository sync (see prefetch.py)
+    prefetch_enabled: bool = True
+    prefetch_repositories: int = 5  # Most recently updated repositories warmed per run
+    prefetch_max_requests: int = 20
+    prefetch_max_bytes: int = 512 * 1024  # File content (READMEs) fetched per run
+    prefetch_rate_floor: int = 1000  # Remaining requests kept for the user's own traffic
+    
+    # Bulk export (see export.py): rows per record batch / Parquet row group
+    export_batch_size: int = 10000
+    
+    # /batch endpoint
+    batch_max_operations: int = 50
+    batch_concurrency: int = 8
+    
+    # Comments are served from the database; older than this triggers a background refresh
+    comments_fresh_seconds: int = 30
+    # Incremental refreshes cannot see deletions, so do a full one at least this often
+    comments_full_refresh_seconds: int = 3600
+    
+    # Pull request files/diffs are cached by (base SHA, head SHA) and never go stale
+    diff_cache_ttl: int = 7 * 24 * 3600
+    diff_cache_max_bytes: int = 5 * 1024 * 1024  # Raw diffs over this are not cached, nor file listings' patches
+    
+    # Line-range file reads (see blobs.py): content and line offsets cached on disk by blob SHA
+    file_blob_cache_dir: str = "./github_zen_blobs"
+    file_blob_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    file_max_range_lines: int = 5000  # Most lines one request returns
+    
+    # Admission control (see admission.py); limits are per worker
+    admission_enabled: bool = True
+    admission_cheap_concurrency: int = 64
+    admission_cheap_per_user: int = 16
+    admission_cheap_queue: int = 256
+    admission_expensive_concurrency: int = 4
+    admission_expensive_per_user: int = 1
+    admission_expensive_queue: int = 16
+    admission_queue_timeout_seconds: float = 5.0
+    # Per-client limit for anonymous requests (logins); many users can share one address
+    admission_anonymous_per_client: int = 16
+    # Proxies in front of the app that append to X-Forwarded-For; 0 ignores the header
+    admission_trusted_proxy_hops: int = 1
+    admission_routes: Dict[str, str] = {}  # Handler name -> cheap/expensive/exempt overrides
+    
+    # Request tracing (/debug/traces); a traceparent header with the sampled flag always traces
+    trace_sample_rate: float = 0.01
+    trace_buffer_size: int = 200  # Finished traces kept in memory
+    trace_max_spans: int = 1000  # Per trace; further spans are counted as dropped
+    trace_export_path: Optional[str] = None  # Append finished traces here as JSON lines
+    
+    # Responses smaller than this are sent uncompressed
+    compression_minimum_size: int = 1024
     
     # CORS Configuration
     frontend_url: str = "https://your-vercel-app.vercel.app"  # Update with your Vercel URL
     
     # Environment
     environment: str = "development"
+    # Scale-to-zero mode: skip schema checks when the stored version matches and
+    # import slow dependencies after the server is already accepting requests
+    fast_startup: bool = False
     
     class Config:
         env_file = ".env"
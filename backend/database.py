@@ -1,16 +1,72 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from config import settings
+from sqlalchemy.orm import Session, sessionmaker
+from config import settings, ENGINE_PROFILES
+from tracing import instrument_engine
+
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_recycle", "pool_timeout", "pool_pre_ping")
+
+
+def build_engine(database_url: str, profile_name: str = "default", read_only: bool = False):
+    """Create an engine configured from a named profile in config.ENGINE_PROFILES"""
+    if profile_name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile: {profile_name}")
+    profile = ENGINE_PROFILES[profile_name]
+    is_sqlite = database_url.startswith("sqlite")
+    
+    engine_args = {}
+    connect_args = {}
+    if is_sqlite:
+        connect_args["check_same_thread"] = False
+    else:
+        engine_args = {option: profile[option] for option in POOL_OPTIONS if option in profile}
+        options = []
+        if "statement_timeout_ms" in profile:
+            options.append(f"-c statement_timeout={profile['statement_timeout_ms']}")
+        if read_only:
+            options.append("-c default_transaction_read_only=on")
+        if options and database_url.startswith("postgres"):
+            connect_args["options"] = " ".join(options)
+    
+    engine = create_engine(database_url, connect_args=connect_args, **engine_args)
+    
+    pragmas = dict(profile.get("sqlite_pragmas", {})) if is_sqlite else {}
+    if is_sqlite and read_only:
+        pragmas["query_only"] = "ON"
+    if pragmas:
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    
+    instrument_engine(engine)
+    return engine
+
+
+class ReadOnlySession(Session):
+    """Session for replica reads; flushing writes is a programming error"""
+    
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError("Attempted to write through a read-only session")
+        super().flush(objects)
+
 
 # Create database engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
+engine = build_engine(settings.database_url, settings.database_profile)
+
+# Reads for list endpoints go to the replica when one is configured
+read_engine = (
+    build_engine(settings.database_read_url, settings.database_profile, read_only=True)
+    if settings.database_read_url else engine
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=ReadOnlySession)
 
 # Create Base class
 Base = declarative_base()
@@ -25,8 +81,63 @@ def get_db():
         db.close()
 
 
-def create_tables():
-    """Create all tables in the database"""
-    from models import Base
-    Base.metadata.create_all(bind=engine)
+def get_read_db():
+    """Dependency to get a read-only session, served by the read replica if configured"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
+
+def get_schema_version():
+    """Schema version stamped by the last create_tables(), None if there is none"""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT version FROM schema_version WHERE id = 1")).scalar()
+    except DBAPIError:
+        return None
+
+
+def add_missing_columns(metadata):
+    """Add columns and indexes that models gained since their table was created"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def create_tables(force: bool = True) -> bool:
+    """Create all tables in the database
+    
+    With force=False the check is skipped when the stored schema version matches
+    models.SCHEMA_VERSION. Returns whether the schema was (re)checked.
+    """
+    from models import Base, SchemaVersion, SCHEMA_VERSION
+    if not force and get_schema_version() == SCHEMA_VERSION:
+        return False
+    
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(Base.metadata)
+    
+    from search import ensure_schema
+    ensure_schema(engine)
+    from services import backfill_repository_members
+    backfill_repository_members(engine)
+    
+    db = SessionLocal()
+    try:
+        db.merge(SchemaVersion(id=1, version=SCHEMA_VERSION))
+        db.commit()
+    finally:
+        db.close()
+    return True
@@ -0,0 +1,138 @@
+"""
+In-process change feed for connected clients.
+
+Services publish change events for the users they concern; each open /events
+connection holds a Subscription with a bounded buffer. A client that falls
+behind loses its oldest events and is sent a `resync` event instead, so one
+slow connection never holds memory or blocks publishers.
+"""
+
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from config import settings
+from metrics import register_collector
+
+
+class Subscription:
+    def __init__(self, username: str, max_buffer: int, loop: asyncio.AbstractEventLoop):
+        self.username = username
+        self.loop = loop
+        self.queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=max_buffer)
+        self.dropped = 0
+        self.needs_resync = False
+
+    def offer(self, event: tuple):
+        """Queue an event, dropping the oldest one when the buffer is full"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+            self.needs_resync = True
+        self.queue.put_nowait(event)
+
+
+class EventBus:
+    def __init__(self, max_buffer: int = 100):
+        self.max_buffer = max_buffer
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, username: str) -> Subscription:
+        subscription = Subscription(username, self.max_buffer, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(username, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.username)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.username]
+
+    def has_subscribers(self, usernames: Iterable[str]) -> bool:
+        return any(username in self._subscriptions for username in usernames)
+
+    def publish(self, usernames: Iterable[str], event_type: str, data: Dict[str, Any]):
+        """Fan an event out to every connection of the given users; safe from any thread"""
+        usernames = set(u for u in usernames if u)
+        with self._lock:
+            targets: List[Subscription] = [
+                s for username in usernames for s in self._subscriptions.get(username, ())
+            ]
+        if not targets:
+            return
+        event = (next(self._ids), event_type, data)
+        self.published += 1
+        for subscription in targets:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is subscription.loop:
+                self._deliver(subscription, event)
+            else:
+                subscription.loop.call_soon_threadsafe(self._deliver, subscription, event)
+
+    def _deliver(self, subscription: Subscription, event: tuple):
+        dropped_before = subscription.dropped
+        subscription.offer(event)
+        self.delivered += 1
+        self.dropped += subscription.dropped - dropped_before
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            connections = sum(len(s) for s in self._subscriptions.values())
+            users = len(self._subscriptions)
+        return {
+            "connections": connections,
+            "users": users,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+def encode_sse(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    message = b""
+    if event_id is not None:
+        message += b"id: " + str(event_id).encode() + b"\n"
+    return message + b"event: " + event_type.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def sse_stream(subscription: Subscription, request, heartbeat_seconds: float):
+    """Serve a subscription as Server-Sent Events until the client disconnects"""
+    try:
+        yield b"retry: 5000\n\n"
+        while not await request.is_disconnected():
+            if subscription.needs_resync:
+                # Events were dropped for this connection; the client should refetch
+                subscription.needs_resync = False
+                yield encode_sse("resync", {"dropped": subscription.dropped})
+            try:
+                event_id, event_type, data = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+            yield encode_sse(event_type, data, event_id)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+# Global event bus instance
+bus = EventBus(settings.events_buffer_size)
+register_collector("events", bus.stats)
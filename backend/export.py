@@ -0,0 +1,259 @@
+"""
+Bulk export of synced rows in a columnar format.
+
+GET /export/{table} streams the repositories, pull_requests or comments of a
+user (or of one of their organizations) as an Arrow IPC stream, Parquet or
+NDJSON. Only the requested columns are selected, and rows are read through a
+server-side cursor EXPORT_BATCH_SIZE at a time: each batch becomes one Arrow
+record batch (or Parquet row group) and is sent before the next one is read,
+so memory stays flat however many rows there are.
+
+Arrow and Parquet need the optional `pyarrow` package, imported on the first
+such export; NDJSON, the default, does not.
+"""
+
+import importlib.util
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import orjson
+from sqlalchemy import Boolean, DateTime, Integer, select
+from sqlalchemy.orm import Session
+
+from metrics import register_collector
+from services import (
+    REPOSITORY_LIST_COLUMNS, PULL_REQUEST_LIST_COLUMNS, COMMENT_LIST_COLUMNS,
+    ARCHIVED_PULL_REQUEST_LIST_COLUMNS, ARCHIVED_COMMENT_LIST_COLUMNS, member_repository_names
+)
+
+
+
+def _pyarrow():
+    """Import pyarrow on first use, None when it is not installed
+    
+    It is an optional dependency and slow to import, so it stays out of the cold start.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:  # optional dependency
+        return None
+    return pyarrow
+
+
+def pyarrow_available() -> bool:
+    """Whether pyarrow is installed, without importing it"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "ndjson": "application/x-ndjson",
+}
+EXTENSIONS = {"arrow": "arrows", "parquet": "parquet", "ndjson": "ndjson"}
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+# Table -> (hot columns, archive columns or None)
+TABLES = {
+    "repositories": (REPOSITORY_LIST_COLUMNS, None),
+    "pull_requests": (PULL_REQUEST_LIST_COLUMNS, ARCHIVED_PULL_REQUEST_LIST_COLUMNS),
+    "comments": (COMMENT_LIST_COLUMNS, ARCHIVED_COMMENT_LIST_COLUMNS),
+}
+
+
+def _owned_by(table_columns, login: str):
+    return table_columns.repo_full_name.startswith(f"{login}/", autoescape=True)
+
+
+# Rows of a table that belong to an export: the user's own (their repositories, the pull
+# requests they authored, comments in their repositories) or, for an organization, those
+# of its repositories the user is a member of; other members may have synced more
+SCOPES: Dict[str, Callable[[Any, int, str, Optional[str]], Any]] = {
+    "repositories": lambda table_columns, user_id, username, owner: (
+        table_columns.full_name.in_(member_repository_names(user_id, owner)) if owner
+        else table_columns.owner_username == username
+    ),
+    "pull_requests": lambda table_columns, user_id, username, owner: (
+        table_columns.repo_full_name.in_(member_repository_names(user_id, owner)) if owner
+        else table_columns.author_username == username
+    ),
+    "comments": lambda table_columns, user_id, username, owner: (
+        table_columns.repo_full_name.in_(member_repository_names(user_id, owner)) if owner
+        else _owned_by(table_columns, username)
+    ),
+}
+
+
+def resolve_columns(table: str, format: str, columns: Optional[str] = None) -> List[str]:
+    """Validate an export request and return the column names to select; raises ValueError"""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}; expected one of {', '.join(TABLES)}")
+    if format not in MEDIA_TYPES:
+        raise ValueError(f"Unknown format: {format}; expected one of {', '.join(MEDIA_TYPES)}")
+    available = [column.key for column in TABLES[table][0]]
+    if not columns:
+        return available
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}; expected some of {', '.join(available)}")
+    return list(dict.fromkeys(names))
+
+
+def arrow_schema(table: str, names: List[str]) -> "pyarrow.Schema":
+    pyarrow = _pyarrow()
+    model = TABLES[table][0][0].class_
+    fields = []
+    for name in names:
+        column_type = getattr(model, name).type
+        if isinstance(column_type, Boolean):
+            arrow_type = pyarrow.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pyarrow.int64()
+        elif isinstance(column_type, DateTime):
+            # Stored in UTC; SQLite hands them back naive
+            arrow_type = pyarrow.timestamp("us", tz="UTC" if column_type.timezone else None)
+        else:
+            arrow_type = pyarrow.string()
+        fields.append(pyarrow.field(name, arrow_type))
+    return pyarrow.schema(fields)
+
+
+def iter_batches(
+    db: Session, table: str, names: List[str], user_id: int, username: str, owner: Optional[str] = None,
+    include_archived: bool = False, batch_size: int = 10000
+) -> Iterator[list]:
+    """Lists of at most batch_size rows, read with a server-side cursor, archive rows last"""
+    hot_columns, archive_columns = TABLES[table]
+    sources = [hot_columns] + ([archive_columns] if include_archived and archive_columns else [])
+    for columns in sources:
+        model = columns[0].class_
+        table_columns = model.__table__.c
+        # A Core select skips the ORM result machinery, which would also buffer every row
+        query = select(*(table_columns[name] for name in names)).where(
+            SCOPES[table](table_columns, user_id, username, owner)
+        ).order_by(table_columns.id)
+        result = db.connection().execution_options(stream_results=True).execute(query)
+        yield from result.partitions(batch_size)
+
+
+class _Sink:
+    """Write-only file object handing out what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _record_batch(rows: list, schema: "pyarrow.Schema") -> "pyarrow.RecordBatch":
+    pyarrow = _pyarrow()
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+        schema=schema
+    )
+
+
+def encode_arrow(batches: Iterator[list], schema: "pyarrow.Schema") -> Iterator[bytes]:
+    pyarrow = _pyarrow()
+    sink = _Sink()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def encode_parquet(batches: Iterator[list], schema: "pyarrow.Schema") -> Iterator[bytes]:
+    pyarrow = _pyarrow()
+    sink = _Sink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows, schema), row_group_size=len(rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def encode_ndjson(batches: Iterator[list], schema=None) -> Iterator[bytes]:
+    for rows in batches:
+        yield b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+ENCODERS = {"arrow": encode_arrow, "parquet": encode_parquet, "ndjson": encode_ndjson}
+
+
+def stream_export(
+    session_factory: Callable[[], Session], table: str, format: str, names: List[str], user_id: int, username: str,
+    owner: Optional[str] = None, include_archived: bool = False, batch_size: int = 10000
+) -> Iterator[bytes]:
+    """Encoded export chunks, with a session of its own so it can outlive the request handler
+
+    A plain generator: StreamingResponse runs each step in the threadpool.
+    """
+    started = time.perf_counter()
+    counted = {"rows": 0, "bytes": 0}
+
+    def counting(batches):
+        for rows in batches:
+            counted["rows"] += len(rows)
+            yield rows
+
+    db = session_factory()
+    try:
+        schema = arrow_schema(table, names) if format in COLUMNAR_FORMATS else None
+        batches = iter_batches(db, table, names, user_id, username, owner, include_archived, batch_size)
+        for chunk in ENCODERS[format](counting(batches), schema):
+            if chunk:
+                counted["bytes"] += len(chunk)
+                yield chunk
+    finally:
+        db.close()
+        stats.record(format, counted["rows"], counted["bytes"], time.perf_counter() - started)
+
+
+class ExportStats:
+    def __init__(self):
+        self.exports: Dict[str, int] = {}
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def record(self, format: str, rows: int, size: int, seconds: float):
+        self.exports[format] = self.exports.get(format, 0) + 1
+        self.rows += rows
+        self.bytes += size
+        self.seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pyarrow": pyarrow_available(),
+            "exports": dict(self.exports),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "rows_per_second": round(self.rows / self.seconds) if self.seconds else None,
+        }
+
+
+# Global export statistics
+stats = ExportStats()
+register_collector("export", stats.snapshot)
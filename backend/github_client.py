@@ -1,49 +1,437 @@
-import httpx
-from typing import List, Optional, Dict, Any
+import codecs
+import functools
+import hashlib
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, AsyncIterator, Callable, List, Optional, Dict, Any
+from urllib.parse import urlencode
+from cache import cache
 from config import settings
+from metrics import register_collector
+from resilience import CircuitOpenError, upstream
+from tracing import current_traceparent
 from schemas import GitHubRepository, GitHubPullRequest, GitHubComment
 
+if TYPE_CHECKING:
+    import httpx
+
+
+def _httpx():
+    """Import httpx on first use; it is one of the slowest imports at startup"""
+    import httpx
+    return httpx
+
+
+async def _propagate_trace(request: "httpx.Request"):
+    traceparent = current_traceparent()
+    if traceparent is not None:
+        request.headers["traceparent"] = traceparent
+
+
+@functools.lru_cache(maxsize=None)
+def _ssl_context():
+    """One SSL context for every client: loading the CA bundle costs ~20ms per client"""
+    return _httpx().create_ssl_context()
+
+
+def _new_client() -> "httpx.AsyncClient":
+    """HTTP client for GitHub API calls; per-call budgets are enforced by resilience.upstream"""
+    httpx = _httpx()
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(60.0, connect=5.0), event_hooks={"request": [_propagate_trace]},
+        verify=_ssl_context()
+    )
+
+
+def preload():
+    """Import what the first GitHub call needs, off the request path"""
+    _ssl_context()
+
+
+class RateLimit:
+    """Last rate-limit headers GitHub sent for a token"""
+    
+    def __init__(self, limit: int, remaining: int, reset: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.observed_at = time.time()
+
+
+# Latest known rate limit per token scope (see GitHubClient.cache_scope)
+rate_limits: Dict[str, RateLimit] = {}
+
+# Cache key scope of responses shared by every member of a repository
+SHARED_SCOPE = "shared"
+# Reads of shared repository responses, by outcome
+shared_cache_reads = {"fresh": 0, "revalidated": 0, "fetched": 0}
+
+# Set to a list by background warm-up (see prefetch.py): the cache key of every GET it
+# sends to GitHub is appended, and its reads are not reported to the listeners below
+background_reads: ContextVar[Optional[List[str]]] = ContextVar("background_reads", default=None)
+# Called with (token scope, cache key, cached copy still fresh) on every other cached GET
+interactive_read_listeners: List[Callable[[str, str, bool], None]] = []
+
+
+def token_scope(access_token: str) -> str:
+    """Short non-reversible identifier of a token, used for cache keys and rate tracking"""
+    return hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+
+def get_rate_limit(access_token: str) -> Optional[RateLimit]:
+    """Last observed core rate limit for a token, None if unknown or already reset"""
+    rate_limit = rate_limits.get(token_scope(access_token))
+    if rate_limit is None or rate_limit.reset <= time.time():
+        return None
+    return rate_limit
+
+
+# Slim records: only the fields services.py and main.py map, so a synced page does not
+# keep GitHub's embedded owner/repo objects alive (or in the response cache).
+
+def slim_user(user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return {"login": user["login"], "avatar_url": user.get("avatar_url")} if user else user
+
+
+def slim_repository(repo: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": repo["id"], "name": repo["name"], "full_name": repo["full_name"],
+        "description": repo.get("description"), "html_url": repo["html_url"],
+        "language": repo.get("language"), "stargazers_count": repo["stargazers_count"],
+        "forks_count": repo["forks_count"], "private": repo["private"],
+        "updated_at": repo["updated_at"], "owner": slim_user(repo["owner"]),
+        "permissions": repo.get("permissions"),
+    }
+
+
+def slim_pull_request(pr: Dict[str, Any]) -> Dict[str, Any]:
+    base_repo = pr["base"].get("repo") or {}
+    return {
+        "id": pr["id"], "number": pr["number"], "title": pr["title"], "body": pr.get("body"),
+        "state": pr["state"], "html_url": pr["html_url"],
+        "created_at": pr["created_at"], "updated_at": pr["updated_at"],
+        "user": slim_user(pr["user"]),
+        "base": {
+            "ref": pr["base"]["ref"], "sha": pr["base"]["sha"],
+            "repo": {"name": base_repo.get("name"), "full_name": base_repo.get("full_name")},
+        },
+        "head": {"ref": pr["head"]["ref"], "sha": pr["head"]["sha"]},
+    }
+
+
+def slim_comment(comment: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": comment["id"], "body": comment["body"], "html_url": comment["html_url"],
+        "created_at": comment["created_at"], "updated_at": comment["updated_at"],
+        "user": slim_user(comment["user"]),
+    }
+
+
+# Characters that open or close a value, and the ones that matter inside a string
+_STRUCTURAL = re.compile(r'[\[\]{}",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield the elements of a top-level JSON array as its bytes arrive
+
+    Each element is scanned once for its end (a `,` or `]` outside strings and
+    nested values), carrying the nesting depth across chunks, and decoded once
+    complete: linear in the size of the array however it is split.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, started = "", 0, False
+    scan, depth, in_string = 0, 0, False  # how far the element at `pos` has been scanned
+    async for chunk in chunks:
+        buffer = buffer[pos:] + text.decode(chunk)
+        scan -= pos
+        pos = 0
+        while True:
+            if scan == pos:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                scan = pos
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos = scan = pos + 1
+                continue
+            if scan == pos and buffer[pos] == "]":
+                return
+            end = None
+            while end is None:
+                if in_string:
+                    match = _STRING_SPECIAL.search(buffer, scan)
+                    if match is None:
+                        scan = len(buffer)
+                        break
+                    if match.group() == "\\":
+                        if match.end() >= len(buffer):
+                            scan = match.start()  # the escaped character is in the next chunk
+                            break
+                        scan = match.end() + 1
+                        continue
+                    in_string, scan = False, match.end()
+                    continue
+                match = _STRUCTURAL.search(buffer, scan)
+                if match is None:
+                    scan = len(buffer)
+                    break
+                char, scan = match.group(), match.end()
+                if char == '"':
+                    in_string = True
+                elif char in "[{":
+                    depth += 1
+                elif depth:
+                    if char in "]}":
+                        depth -= 1
+                elif char in ",]":
+                    end = match.start()
+            if end is None:
+                break  # the element continues in the next chunk
+            item, item_end = decoder.raw_decode(buffer, pos)
+            if buffer[item_end:end].strip():
+                raise ValueError("Malformed JSON array")
+            pos = scan = end
+            yield item
+    raise ValueError("Truncated JSON array")
+
 
 class GitHubClient:
+    # Seconds a cached GET response is served without asking GitHub. Past that it is
+    # revalidated with If-None-Match; a 304 does not count against the rate limit.
+    CACHE_TTLS = {
+        "user": 60,
+        "repos": 0,
+        "pulls": 30,
+        "comments": 15,
+        "contents": 120,
+        "search": 60,
+    }
+    # How long a response is kept around for ETag revalidation
+    ETAG_RETENTION = 3600
+    
     def __init__(self, access_token: str):
         self.access_token = access_token
-        self.base_url = "https://api.github.com"
+        self.base_url = settings.github_api_url.rstrip("/")
         self.headers = {
             "Authorization": f"token {access_token}",
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "GitHub-Zen-App"
         }
+        # Cache entries are scoped to the token so users never see each other's data,
+        # except under /repos/{owner}/{repo}/ for repositories added to shared_repositories
+        self.cache_scope = token_scope(access_token)
+        self.shared_repositories: set = set()
+        self._shared_client: Optional["httpx.AsyncClient"] = None
+    
+    async def __aenter__(self) -> "GitHubClient":
+        """Reuse one connection pool for every call made inside `async with`"""
+        self._shared_client = _new_client()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self._shared_client.aclose()
+        self._shared_client = None
+    
+    @asynccontextmanager
+    async def _session(self):
+        if self._shared_client is not None:
+            yield self._shared_client
+        else:
+            async with _new_client() as client:
+                yield client
+    
+    def _record_rate_limit(self, response: "httpx.Response"):
+        headers = response.headers
+        if "x-ratelimit-remaining" not in headers or headers.get("x-ratelimit-resource", "core") != "core":
+            return
+        rate_limits[self.cache_scope] = RateLimit(
+            int(headers.get("x-ratelimit-limit", 0)),
+            int(headers["x-ratelimit-remaining"]),
+            float(headers.get("x-ratelimit-reset", 0))
+        )
+    
+    def share_repository_cache(self, repo_full_name: str):
+        """Read and write a repository's cached responses in the scope shared by its members
+        
+        Only for repositories the user is known to be able to read (see
+        RepositoryService.can_share_cache). The repository object itself stays
+        token-scoped: it carries the token owner's permissions.
+        """
+        self.shared_repositories.add(repo_full_name)
+    
+    def _scope_for(self, path: str) -> str:
+        if self.shared_repositories and path.startswith("/repos/"):
+            parts = path.split("/", 5)
+            if len(parts) > 4 and f"{parts[2]}/{parts[3]}" in self.shared_repositories:
+                return SHARED_SCOPE
+        return self.cache_scope
+    
+    def _cache_key(self, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return f"gh:{self._scope_for(path)}:{path}?{urlencode(sorted((params or {}).items()))}"
+    
+    def invalidate(self, path: str):
+        """Drop cached responses for an API path (any query string), shared ones included"""
+        cache.delete_prefix(f"gh:{self.cache_scope}:{path}?")
+        if path.startswith("/repos/"):
+            cache.delete_prefix(f"gh:{SHARED_SCOPE}:{path}?")
+    
+    async def _get_json(
+        self,
+        client: "httpx.AsyncClient",
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        ttl: float = 0,
+        endpoint: str = "default",
+        slim: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    ) -> Any:
+        """GET a JSON resource through the response cache, revalidating with ETags
+        
+        With `slim`, the body is streamed: each array element (or the single
+        object) is reduced by `slim` as soon as it is parsed, and only the slim
+        records are returned and cached. While the endpoint class's circuit
+        breaker is open, a cached copy of any age is served instead of failing.
+        """
+        key = self._cache_key(url, params)
+        entry = cache.get(key)
+        fresh = entry is not None and time.time() - entry["fetched_at"] < ttl
+        background = background_reads.get()
+        if background is None:
+            for listener in interactive_read_listeners:
+                listener(self.cache_scope, key, fresh)
+        if key.startswith(f"gh:{SHARED_SCOPE}:"):
+            shared_cache_reads["fresh" if fresh else "revalidated" if entry is not None else "fetched"] += 1
+        if fresh:
+            return entry["data"]
+        if background is not None:
+            background.append(key)
+        
+        headers = self.headers
+        if entry is not None and entry["etag"]:
+            headers = {**self.headers, "If-None-Match": entry["etag"]}
+        try:
+            response = await upstream.call(endpoint, lambda: client.send(
+                client.build_request("GET", url, headers=headers, params=params), stream=slim is not None
+            ))
+        except CircuitOpenError:
+            if entry is not None:
+                return entry["data"]
+            raise
+        self._record_rate_limit(response)
+        
+        try:
+            if response.status_code == 304 and entry is not None:
+                data = entry["data"]
+            else:
+                response.raise_for_status()
+                data = response.json() if slim is None else await self._read_slim(response, slim)
+        finally:
+            await response.aclose()
+        
+        etag = response.headers.get("etag") or (entry["etag"] if entry is not None else None)
+        if etag or ttl > 0:
+            cache.set(
+                key,
+                {"data": data, "etag": etag, "fetched_at": time.time()},
+                ttl=max(ttl, self.ETAG_RETENTION) if etag else ttl
+            )
+        return data
+    
+    @staticmethod
+    async def _read_slim(response: "httpx.Response", slim: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Any:
+        """Parse a streamed JSON array element by element, or a single object, through `slim`"""
+        chunks = response.aiter_bytes()
+        first = b""
+        async for chunk in chunks:
+            first += chunk
+            if first.strip():
+                break
+        if first.lstrip()[:1] != b"[":
+            async for chunk in chunks:
+                first += chunk
+            return slim(json.loads(first))
+        
+        async def body():
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        return [slim(item) async for item in iter_json_array(body())]
     
     async def get_user_info(self) -> Dict[str, Any]:
         """Get authenticated user information"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/user",
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+        async with self._session() as client:
+            return await self._get_json(client, f"{self.base_url}/user", ttl=self.CACHE_TTLS["user"], endpoint="user")
     
     async def get_user_repositories(
         self, 
         page: int = 1, 
         per_page: int = 100,
-        sort: str = "updated"
+        sort: str = "updated",
+        affiliation: Optional[str] = None
     ) -> List[GitHubRepository]:
-        """Get user's repositories"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        """Get user's repositories (by default every affiliation, organization repositories included)"""
+        params = {
+            "page": page,
+            "per_page": per_page,
+            "sort": sort,
+            "direction": "desc"
+        }
+        if affiliation:
+            params["affiliation"] = affiliation
+        async with self._session() as client:
+            repos_data = await self._get_json(
+                client,
                 f"{self.base_url}/user/repos",
-                headers=self.headers,
+                params=params,
+                ttl=self.CACHE_TTLS["repos"],
+                endpoint="repos",
+                slim=slim_repository
+            )
+            return [GitHubRepository(**repo) for repo in repos_data]
+    
+    async def get_user_organizations(self, page: int = 1, per_page: int = 100) -> List[Dict[str, Any]]:
+        """Get the organizations the user is a member of"""
+        async with self._session() as client:
+            return await self._get_json(
+                client,
+                f"{self.base_url}/user/orgs",
+                params={"page": page, "per_page": per_page},
+                ttl=self.CACHE_TTLS["repos"],
+                endpoint="repos",
+                slim=slim_user
+            )
+    
+    async def get_organization_repositories(
+        self,
+        org: str,
+        page: int = 1,
+        per_page: int = 100,
+        sort: str = "updated"
+    ) -> List[GitHubRepository]:
+        """Get an organization's repositories visible to the user"""
+        async with self._session() as client:
+            repos_data = await self._get_json(
+                client,
+                f"{self.base_url}/orgs/{org}/repos",
                 params={
                     "page": page,
                     "per_page": per_page,
                     "sort": sort,
                     "direction": "desc"
-                }
+                },
+                ttl=self.CACHE_TTLS["repos"],
+                endpoint="repos",
+                slim=slim_repository
             )
-            response.raise_for_status()
-            repos_data = response.json()
             return [GitHubRepository(**repo) for repo in repos_data]
     
     async def get_pull_requests(
@@ -54,22 +442,73 @@ class GitHubClient:
         per_page: int = 100
     ) -> List[GitHubPullRequest]:
         """Get pull requests for a repository"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        async with self._session() as client:
+            prs_data = await self._get_json(
+                client,
                 f"{self.base_url}/repos/{repo_full_name}/pulls",
-                headers=self.headers,
                 params={
                     "state": state,
                     "page": page,
                     "per_page": per_page,
                     "sort": "updated",
                     "direction": "desc"
-                }
+                },
+                ttl=self.CACHE_TTLS["pulls"],
+                endpoint="pulls",
+                slim=slim_pull_request
             )
-            response.raise_for_status()
-            prs_data = response.json()
             return [GitHubPullRequest(**pr) for pr in prs_data]
     
+    async def get_pull_request(self, repo_full_name: str, pr_number: int) -> Dict[str, Any]:
+        """Get a single pull request, including its base and head SHAs"""
+        async with self._session() as client:
+            return await self._get_json(
+                client,
+                f"{self.base_url}/repos/{repo_full_name}/pulls/{pr_number}",
+                ttl=self.CACHE_TTLS["pulls"],
+                endpoint="pulls",
+                slim=slim_pull_request
+            )
+    
+    async def iter_pull_request_files(
+        self,
+        repo_full_name: str,
+        pr_number: int,
+        per_page: int = 100
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield a pull request's changed files page by page
+        
+        Pages bypass the response cache: callers cache the whole listing by commit SHAs.
+        """
+        async with self._session() as client:
+            page = 1
+            while True:
+                response = await upstream.call("files", lambda: client.get(
+                    f"{self.base_url}/repos/{repo_full_name}/pulls/{pr_number}/files",
+                    headers=self.headers,
+                    params={"page": page, "per_page": per_page}
+                ))
+                self._record_rate_limit(response)
+                response.raise_for_status()
+                files = response.json()
+                yield files
+                if len(files) < per_page:
+                    break
+                page += 1
+    
+    async def stream_pull_request_diff(self, repo_full_name: str, pr_number: int) -> AsyncIterator[bytes]:
+        """Stream a pull request as a unified diff"""
+        async with self._session() as client, upstream.guard("diff"):
+            async with client.stream(
+                "GET",
+                f"{self.base_url}/repos/{repo_full_name}/pulls/{pr_number}",
+                headers={**self.headers, "Accept": "application/vnd.github.v3.diff"}
+            ) as response:
+                self._record_rate_limit(response)
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+    
     async def get_user_pull_requests(
         self,
         state: str = "open",
@@ -77,28 +516,26 @@ class GitHubClient:
         per_page: int = 100
     ) -> List[GitHubPullRequest]:
         """Get all pull requests across user's repositories"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        async with self._session() as client:
+            search_data = await self._get_json(
+                client,
                 f"{self.base_url}/search/issues",
-                headers=self.headers,
                 params={
                     "q": f"is:pr is:{state} author:@me",
                     "page": page,
                     "per_page": per_page,
                     "sort": "updated",
                     "order": "desc"
-                }
+                },
+                endpoint="search"
             )
-            response.raise_for_status()
-            search_data = response.json()
             prs = []
             
             for issue in search_data.get("items", []):
-                # Get full PR details
-                pr_url = issue["pull_request"]["url"]
-                pr_response = await client.get(pr_url, headers=self.headers)
-                pr_response.raise_for_status()
-                pr_data = pr_response.json()
+                # Get full PR details (revalidated, so unchanged PRs cost a 304)
+                pr_data = await self._get_json(
+                    client, issue["pull_request"]["url"], endpoint="pulls", slim=slim_pull_request
+                )
                 prs.append(GitHubPullRequest(**pr_data))
             
             return prs
@@ -109,16 +546,46 @@ class GitHubClient:
         pr_number: int
     ) -> List[GitHubComment]:
         """Get comments for a specific pull request"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        async with self._session() as client:
+            comments_data = await self._get_json(
+                client,
                 f"{self.base_url}/repos/{repo_full_name}/issues/{pr_number}/comments",
-                headers=self.headers,
-                params={"sort": "created", "direction": "desc"}
+                params={"sort": "created", "direction": "desc"},
+                ttl=self.CACHE_TTLS["comments"],
+                endpoint="comments",
+                slim=slim_comment
             )
-            response.raise_for_status()
-            comments_data = response.json()
             return [GitHubComment(**comment) for comment in comments_data]
     
+    async def iter_pull_request_comments(
+        self,
+        repo_full_name: str,
+        pr_number: int,
+        since: Optional[str] = None,
+        per_page: int = 100
+    ) -> AsyncIterator[List[GitHubComment]]:
+        """Yield all comments of a pull request page by page, oldest first
+        
+        With `since` (ISO 8601) only comments updated at or after that time are returned.
+        """
+        async with self._session() as client:
+            page = 1
+            while True:
+                params = {"page": page, "per_page": per_page}
+                if since:
+                    params["since"] = since
+                comments_data = await self._get_json(
+                    client,
+                    f"{self.base_url}/repos/{repo_full_name}/issues/{pr_number}/comments",
+                    params=params,
+                    endpoint="comments",
+                    slim=slim_comment
+                )
+                yield [GitHubComment(**comment) for comment in comments_data]
+                if len(comments_data) < per_page:
+                    break
+                page += 1
+    
     async def create_pull_request_comment(
         self,
         repo_full_name: str,
@@ -126,73 +593,102 @@ class GitHubClient:
         body: str
     ) -> GitHubComment:
         """Create a comment on a pull request"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
+        async with self._session() as client:
+            response = await upstream.call("write", lambda: client.post(
                 f"{self.base_url}/repos/{repo_full_name}/issues/{pr_number}/comments",
                 headers=self.headers,
                 json={"body": body}
-            )
+            ))
+            self._record_rate_limit(response)
             response.raise_for_status()
             comment_data = response.json()
+            self.invalidate(f"/repos/{repo_full_name}/issues/{pr_number}/comments")
             return GitHubComment(**comment_data)
     
     async def get_repository(self, repo_full_name: str) -> GitHubRepository:
         """Get a specific repository"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        async with self._session() as client:
+            repo_data = await self._get_json(
+                client,
                 f"{self.base_url}/repos/{repo_full_name}",
-                headers=self.headers
+                ttl=self.CACHE_TTLS["repos"],
+                endpoint="repos",
+                slim=slim_repository
             )
-            response.raise_for_status()
-            repo_data = response.json()
             return GitHubRepository(**repo_data)
     
     async def get_repository_contents(self, repo_full_name: str, path: str = "") -> List[Dict[str, Any]]:
         """Get repository contents at a specific path"""
-        async with httpx.AsyncClient() as client:
+        async with self._session() as client:
             url = f"{self.base_url}/repos/{repo_full_name}/contents/{path}" if path else f"{self.base_url}/repos/{repo_full_name}/contents"
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+            return await self._get_json(client, url, ttl=self.CACHE_TTLS["contents"], endpoint="contents")
     
     
-    async def get_file_content(self, repo_full_name: str, path: str) -> str:
-        """Get the content of a specific file"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+    async def get_file(self, repo_full_name: str, path: str) -> Dict[str, Any]:
+        """Get a file's decoded content along with its blob SHA and size
+        
+        Files over 1 MB come back without content (`truncated`); read those
+        with stream_blob.
+        """
+        async with self._session() as client:
+            file_data = await self._get_json(
+                client,
                 f"{self.base_url}/repos/{repo_full_name}/contents/{path}",
-                headers=self.headers
+                ttl=self.CACHE_TTLS["contents"],
+                endpoint="contents"
             )
-            response.raise_for_status()
-            file_data = response.json()
             
+            content = file_data.get("content") or ""
             if file_data.get("encoding") == "base64":
                 import base64
-                return base64.b64decode(file_data["content"]).decode("utf-8")
-            return file_data["content"]
+                content = base64.b64decode(content).decode("utf-8")
+            return {
+                "content": content,
+                "sha": file_data.get("sha"),
+                "size": file_data.get("size", len(content.encode())),
+                "truncated": file_data.get("encoding") == "none",
+            }
+    
+    async def stream_blob(self, repo_full_name: str, sha: str) -> AsyncIterator[bytes]:
+        """Stream a blob's raw bytes (up to GitHub's 100 MB API limit)"""
+        async with self._session() as client, upstream.guard("blobs"):
+            async with client.stream(
+                "GET",
+                f"{self.base_url}/repos/{repo_full_name}/git/blobs/{sha}",
+                headers={**self.headers, "Accept": "application/vnd.github.raw"}
+            ) as response:
+                self._record_rate_limit(response)
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+    
+    async def get_file_content(self, repo_full_name: str, path: str) -> str:
+        """Get the content of a specific file"""
+        return (await self.get_file(repo_full_name, path))["content"]
     
     async def search_repository_files(self, repo_full_name: str, query: str) -> List[Dict[str, Any]]:
         """Search for files in a repository"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        async with self._session() as client:
+            search_data = await self._get_json(
+                client,
                 f"{self.base_url}/search/code",
-                headers=self.headers,
                 params={
                     "q": f"{query} repo:{repo_full_name}",
                     "per_page": 100
-                }
+                },
+                ttl=self.CACHE_TTLS["search"],
+                endpoint="search"
             )
-            response.raise_for_status()
-            return response.json().get("items", [])
+            return search_data.get("items", [])
 
 
 class GitHubOAuth:
     @staticmethod
     async def exchange_code_for_token(code: str) -> Dict[str, Any]:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
+        async with _httpx().AsyncClient() as client:
             response = await client.post(
-                "https://github.com/login/oauth/access_token",
+                f"{settings.github_oauth_url.rstrip('/')}/login/oauth/access_token",
                 data={
                     "client_id": settings.github_client_id,
                     "client_secret": settings.github_client_secret,
@@ -216,5 +712,8 @@ class GitHubOAuth:
             params["state"] = state
             
         query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        return f"https://github.com/login/oauth/authorize?{query_string}"
+        return f"{settings.github_oauth_url.rstrip('/')}/login/oauth/authorize?{query_string}"
+
 
+# Shared repository cache reads
+register_collector("shared_cache", lambda: dict(shared_cache_reads))
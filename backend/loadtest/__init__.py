@@ -0,0 +1,6 @@
+"""
+Load-testing tools for the GitHub Zen backend.
+
+fake_github  - local stand-in for the GitHub REST and OAuth endpoints
+driver       - replays mixed user sessions against backend.main:app
+"""
@@ -0,0 +1,232 @@
+"""
+Load driver that replays mixed user sessions against the GitHub Zen API.
+
+By default the backend runs in-process (backend.main:app over an ASGI transport)
+against a fake GitHub API started on a local port, using a throwaway SQLite
+database. Pass --target to drive an already running server instead; that server
+must be configured with GITHUB_API_URL / GITHUB_OAUTH_URL pointing at the fake.
+
+    cd backend
+    python -m loadtest.driver --sessions 200 --concurrency 20 --latency lognormal:0.03,0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer, LatencyProfile, code_for
+
+
+SESSION_KINDS = ("browse", "sync", "comments")
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def record(self, seconds: float, ok: bool):
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class LoadDriver:
+    def __init__(self, client: httpx.AsyncClient, users: int, mix: Dict[str, float], seed: int = 1):
+        self.client = client
+        self.users = users
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, RouteStats] = {}
+
+    async def call(self, route: str, method: str, url: str, token: Optional[str] = None, **kwargs) -> Optional[httpx.Response]:
+        """Issue one request and record it under its route template"""
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.stats.setdefault(f"{method} {route}", RouteStats()).record(time.perf_counter() - start, ok)
+        return response if ok else None
+
+    async def login(self, login: str) -> Optional[str]:
+        response = await self.call("/auth/github", "POST", "/auth/github", json={"code": code_for(login)})
+        return response.json()["access_token"] if response is not None else None
+
+    async def browse(self, token: str):
+        response = await self.call("/repositories", "GET", "/repositories", token)
+        repos = response.json() if response is not None else []
+        for repo in self.rng.sample(repos, min(len(repos), 2)):
+            name = repo["name"]
+            listing = await self.call("/repositories/{repo_name}/contents", "GET",
+                                      f"/repositories/{name}/contents", token)
+            entries = listing.json() if listing is not None else []
+            dirs = [e for e in entries if e["type"] == "dir"]
+            files = [e for e in entries if e["type"] == "file"]
+            if dirs:
+                await self.call("/repositories/{repo_name}/contents", "GET",
+                                f"/repositories/{name}/contents", token, params={"path": self.rng.choice(dirs)["path"]})
+            for entry in self.rng.sample(files, min(len(files), 2)):
+                await self.call("/repositories/{repo_name}/file", "GET",
+                                f"/repositories/{name}/file", token, params={"path": entry["path"]})
+
+    async def sync(self, token: str):
+        await self.call("/repositories/sync", "POST", "/repositories/sync", token)
+        await self.call("/pull-requests/sync", "POST", "/pull-requests/sync", token)
+
+    async def comments(self, token: str):
+        response = await self.call("/pull-requests", "GET", "/pull-requests", token)
+        pulls = response.json() if response is not None else []
+        for pull in self.rng.sample(pulls, min(len(pulls), 3)):
+            await self.call("/pull-requests/{pr_number}/comments", "GET",
+                            f"/pull-requests/{pull['number']}/comments", token,
+                            params={"repo_name": pull["repo_name"]})
+
+    async def session(self):
+        login = f"user{self.rng.randrange(self.users)}"
+        token = await self.login(login)
+        if token is None:
+            return
+        kinds = list(self.mix)
+        for _ in range(self.rng.randint(1, 3)):
+            kind = self.rng.choices(kinds, weights=[self.mix[k] for k in kinds])[0]
+            await getattr(self, kind)(token)
+
+    async def run(self, sessions: int, concurrency: int) -> float:
+        """Run sessions with bounded concurrency, return wall time in seconds"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded():
+            async with semaphore:
+                await self.session()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded() for _ in range(sessions)))
+        return time.perf_counter() - start
+
+    def report(self, wall_seconds: float) -> List[dict]:
+        rows = []
+        for route, stats in sorted(self.stats.items()):
+            values = sorted(stats.latencies)
+            rows.append({
+                "route": route,
+                "count": len(values),
+                "errors": stats.errors,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+            })
+        return rows
+
+
+def print_report(rows: List[dict], wall_seconds: float):
+    header = f"{'route':<48} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['route']:<48} {row['count']:>7} {row['errors']:>7} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['rps']:>9}")
+    total = sum(row["count"] for row in rows)
+    print(f"\n{total} requests in {wall_seconds:.2f}s ({total / wall_seconds:.1f} req/s)")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in SESSION_KINDS:
+            raise ValueError(f"Unknown session kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def configure_in_process_backend(github_url: str, database_url: str):
+    """Point the backend settings at the fake API before backend modules are imported"""
+    os.environ["GITHUB_API_URL"] = github_url
+    os.environ["GITHUB_OAUTH_URL"] = github_url
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("GITHUB_CLIENT_ID", "loadtest")
+    os.environ.setdefault("GITHUB_CLIENT_SECRET", "loadtest")
+    os.environ.setdefault("SECRET_KEY", "loadtest-secret")
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+
+
+async def drive(args) -> List[dict]:
+    mix = parse_mix(args.mix)
+    if args.target:
+        async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout) as client:
+            driver = LoadDriver(client, args.users, mix, args.seed)
+            wall = await driver.run(args.sessions, args.concurrency)
+    else:
+        from main import app
+
+        await app.router.startup()
+        try:
+            async with httpx.AsyncClient(app=app, base_url="http://github-zen", timeout=args.timeout) as client:
+                driver = LoadDriver(client, args.users, mix, args.seed)
+                wall = await driver.run(args.sessions, args.concurrency)
+        finally:
+            await app.router.shutdown()
+
+    rows = driver.report(wall)
+    print_report(rows, wall)
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay mixed user sessions against GitHub Zen")
+    parser.add_argument("--target", help="Base URL of a running backend (default: in-process app)")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--repos-per-user", type=int, default=30)
+    parser.add_argument("--mix", default="browse=5,comments=3,sync=1", help="Session kind weights")
+    parser.add_argument("--latency", default="lognormal:0.03,0.5", help="Fake GitHub latency profile")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake GitHub calls that fail")
+    parser.add_argument("--github-port", type=int, default=9000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    config = FakeGitHubConfig(
+        users=args.users,
+        repos_per_user=args.repos_per_user,
+        latency=LatencyProfile.parse(args.latency),
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    with FakeGitHubServer(config, port=args.github_port) as github, tempfile.TemporaryDirectory() as tmp:
+        if not args.target:
+            configure_in_process_backend(github.url, f"sqlite:///{os.path.join(tmp, 'loadtest.db')}")
+        rows = asyncio.run(drive(args))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,634 @@
+"""
+Local fake of the GitHub API endpoints used by GitHubClient and GitHubOAuth.
+
+The data set is generated deterministically from FakeGitHubConfig, so two runs
+with the same config see the same users, repositories, pull requests and files.
+Point the backend at it with GITHUB_API_URL / GITHUB_OAUTH_URL.
+
+    uvicorn loadtest.fake_github:app --port 9000
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response
+
+
+EPOCH = datetime(2024, 1, 1)
+
+
+@dataclass
+class LatencyProfile:
+    """Per-request latency in seconds: fixed, uniform(low, high) or lognormal(median, sigma)"""
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        """Parse 'fixed:0.05', 'uniform:0.02,0.2' or 'lognormal:0.05,0.6'"""
+        kind, _, args = spec.partition(":")
+        values = [float(v) for v in args.split(",") if v]
+        return cls(kind, *values)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            # a is the median, b the shape parameter
+            return self.a * rng.lognormvariate(0.0, self.b) if self.a else 0.0
+        return self.a
+
+
+@dataclass
+class FakeGitHubConfig:
+    users: int = 50
+    repos_per_user: int = 30
+    orgs: int = 0  # Organizations org0..orgN-1; every user is a member of all of them
+    repos_per_org: int = 100
+    prs_per_repo: int = 4
+    comments_per_pr: int = 6
+    files_per_pr: int = 8
+    files_per_dir: int = 12
+    file_lines: int = 200
+    large_file_lines: int = 0  # With > 0, each repository root also has large.log, served like GitHub's files over 1 MB
+    latency: LatencyProfile = field(default_factory=LatencyProfile)
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (500, 502, 503)
+    error_paths: Tuple[str, ...] = ()  # path prefixes eligible for errors, empty means all
+    rate_limit: int = 5000
+    rate_window_seconds: int = 3600
+    seed: int = 1
+
+
+def _login(index: int) -> str:
+    return f"user{index}"
+
+
+def token_for(login: str) -> str:
+    """Access token the fake OAuth exchange issues for a login"""
+    return f"gho_fake_{login}"
+
+
+def code_for(login: str) -> str:
+    """OAuth code that exchanges to the token of a login"""
+    return f"code-{login}"
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _sha(*parts: Any) -> str:
+    return hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class FakeGitHubState:
+    """Deterministic data set plus the mutable bits (posted comments, rate counters)"""
+
+    def __init__(self, config: FakeGitHubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.posted_comments: Dict[Tuple[str, int], List[dict]] = {}
+        self.rate_used: Dict[str, int] = {}
+        self.rate_reset = int(time.time()) + config.rate_window_seconds
+        self.next_comment_id = 10 ** 12
+        self.blobs: Dict[str, Tuple[str, str]] = {}  # blob SHA -> (repo full name, path)
+        self.large_files: Dict[str, bytes] = {}
+
+    # Users
+
+    def user_index(self, login: str) -> Optional[int]:
+        if not login.startswith("user"):
+            return None
+        try:
+            index = int(login[4:])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.config.users else None
+
+    def org_index(self, login: str) -> Optional[int]:
+        if not login.startswith("org"):
+            return None
+        try:
+            index = int(login[3:])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.config.orgs else None
+
+    def owner_index(self, login: str) -> Optional[int]:
+        """Users first, then organizations"""
+        index = self.user_index(login)
+        if index is not None:
+            return index
+        index = self.org_index(login)
+        return self.config.users + index if index is not None else None
+
+    def repo_count(self, login: str) -> int:
+        return self.config.repos_per_org if self.org_index(login) is not None else self.config.repos_per_user
+
+    def login_for_token(self, token: str) -> Optional[str]:
+        if not token.startswith("gho_fake_"):
+            return None
+        login = token[len("gho_fake_"):]
+        return login if self.user_index(login) is not None else None
+
+    def user(self, login: str) -> dict:
+        index = self.user_index(login)
+        return {
+            "id": 1000 + index,
+            "login": login,
+            "email": f"{login}@example.com",
+            "name": f"User {index}",
+            "avatar_url": f"https://avatars.example.com/u/{1000 + index}",
+            "bio": None,
+            "public_repos": self.config.repos_per_user,
+            "followers": index % 17,
+            "following": index % 5,
+        }
+
+    def owner(self, login: str) -> dict:
+        index = self.owner_index(login)
+        return {"login": login, "id": 1000 + index, "avatar_url": f"https://avatars.example.com/u/{1000 + index}"}
+
+    def author(self, login: str, seed: int) -> dict:
+        """Author of a pull request or comment: the owner, or a member for organization repositories"""
+        if self.org_index(login) is None:
+            return self.owner(login)
+        return self.owner(_login(seed % self.config.users))
+
+    # Repositories
+
+    def repo_id(self, login: str, repo_index: int) -> int:
+        return (self.owner_index(login) + 1) * 100000 + repo_index
+
+    def repo(self, login: str, repo_index: int, base_url: str, viewer: Optional[str] = None) -> dict:
+        repo_id = self.repo_id(login, repo_index)
+        name = f"repo-{repo_index}"
+        full_name = f"{login}/{name}"
+        return {
+            "id": repo_id,
+            "name": name,
+            "full_name": full_name,
+            "description": f"Synthetic repository {repo_index} of {login}",
+            "html_url": f"https://github.com/{full_name}",
+            "url": f"{base_url}repos/{full_name}",
+            "language": ("Python", "TypeScript", "Go", "Rust", None)[repo_index % 5],
+            "stargazers_count": (repo_id * 7) % 500,
+            "forks_count": (repo_id * 3) % 50,
+            "private": repo_index % 4 == 0,
+            "updated_at": _iso(EPOCH + timedelta(hours=repo_id % 10000)),
+            "owner": self.owner(login),
+            # Users administer their own repositories and push to those of their organizations
+            "permissions": {"admin": viewer in (None, login), "push": True, "pull": True},
+        }
+
+    def repo_index(self, owner: str, name: str) -> Optional[int]:
+        if self.owner_index(owner) is None or not name.startswith("repo-"):
+            return None
+        try:
+            index = int(name[5:])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.repo_count(owner) else None
+
+    # Pull requests
+
+    def pull(self, login: str, repo_index: int, number: int, base_url: str) -> dict:
+        repo = self.repo(login, repo_index, base_url)
+        pr_id = repo["id"] * 1000 + number
+        created = EPOCH + timedelta(hours=pr_id % 5000)
+        return {
+            "id": pr_id,
+            "number": number,
+            "title": f"Change {number} in {repo['name']}",
+            "body": "Synthetic pull request body. " * 8,
+            "state": "open" if number % 3 else "closed",
+            "html_url": f"{repo['html_url']}/pull/{number}",
+            "url": f"{base_url}repos/{repo['full_name']}/pulls/{number}",
+            "created_at": _iso(created),
+            "updated_at": _iso(created + timedelta(hours=number)),
+            "user": self.author(login, pr_id),
+            "labels": [],
+            "base": {"ref": "main", "sha": _sha(pr_id, "base"), "repo": repo},
+            "head": {"ref": f"feature/{number}", "sha": _sha(pr_id, "head"), "repo": repo},
+        }
+
+    def pull_files(self, login: str, repo_index: int, number: int) -> List[dict]:
+        """Changed files of a pull request, each with a unified-diff patch"""
+        full_name = f"{login}/repo-{repo_index}"
+        files = []
+        for i in range(self.config.files_per_pr * number):
+            filename = f"src/module{i}.py"
+            added = [f"+line {j} of {filename} in #{number}" for j in range(5 + i % 7)]
+            patch = f"@@ -1,2 +1,{len(added) + 2} @@\n context\n-old line\n" + "\n".join(added)
+            files.append({
+                "sha": _sha(full_name, number, filename),
+                "filename": filename,
+                "status": "modified" if i % 4 else "added",
+                "additions": len(added),
+                "deletions": 1,
+                "changes": len(added) + 1,
+                "blob_url": f"https://github.com/{full_name}/blob/{_sha(full_name, number)}/{filename}",
+                "patch": patch,
+            })
+        return files
+
+    def pull_diff(self, login: str, repo_index: int, number: int) -> str:
+        return "".join(
+            f"diff --git a/{f['filename']} b/{f['filename']}\n"
+            f"--- a/{f['filename']}\n+++ b/{f['filename']}\n{f['patch']}\n"
+            for f in self.pull_files(login, repo_index, number)
+        )
+
+    # Comments
+
+    def comments(self, login: str, repo_index: int, number: int) -> List[dict]:
+        full_name = f"{login}/repo-{repo_index}"
+        pr_id = self.repo_id(login, repo_index) * 1000 + number
+        result = []
+        for i in range(self.config.comments_per_pr):
+            created = EPOCH + timedelta(hours=pr_id % 5000, minutes=10 * i)
+            result.append({
+                "id": pr_id * 100 + i,
+                "body": f"Comment {i} on #{number}",
+                "html_url": f"https://github.com/{full_name}/pull/{number}#issuecomment-{pr_id * 100 + i}",
+                "created_at": _iso(created),
+                "updated_at": _iso(created),
+                "user": self.author(login, pr_id + i),
+            })
+        with self.lock:
+            result.extend(self.posted_comments.get((full_name, number), []))
+        return result
+
+    def post_comment(self, login: str, full_name: str, number: int, body: str) -> dict:
+        with self.lock:
+            self.next_comment_id += 1
+            comment_id = self.next_comment_id
+            now = _iso(datetime.utcnow())
+            comment = {
+                "id": comment_id,
+                "body": body,
+                "html_url": f"https://github.com/{full_name}/pull/{number}#issuecomment-{comment_id}",
+                "created_at": now,
+                "updated_at": now,
+                "user": self.owner(login),
+            }
+            self.posted_comments.setdefault((full_name, number), []).append(comment)
+        return comment
+
+    # Contents
+
+    def contents(self, full_name: str, path: str) -> Optional[Any]:
+        """Directory listing (list) or file object (dict) for a path"""
+        depth = len([p for p in path.split("/") if p])
+        name = path.rsplit("/", 1)[-1]
+        if not path or (name.startswith("dir") and depth < 3):
+            entries = [{"name": "README.md", "type": "file"}]
+            entries += [{"name": f"dir{i}", "type": "dir"} for i in range(2)] if depth < 2 else []
+            entries += [{"name": f"file{i}.py", "type": "file"} for i in range(self.config.files_per_dir)]
+            entries += [{"name": "large.log", "type": "file"}] if depth == 0 and self.config.large_file_lines else []
+            listing = []
+            for entry in entries:
+                entry_path = f"{path}/{entry['name']}" if path else entry["name"]
+                listing.append({
+                    "name": entry["name"],
+                    "path": entry_path,
+                    "sha": _sha(full_name, entry_path),
+                    "size": 0 if entry["type"] == "dir" else self.file_size(full_name, entry_path),
+                    "type": entry["type"],
+                    "html_url": f"https://github.com/{full_name}/blob/main/{entry_path}",
+                })
+            return listing
+        if name == "large.log" and depth == 1 and self.config.large_file_lines:
+            self.blobs[_sha(full_name, path)] = (full_name, path)
+            return {
+                "name": name,
+                "path": path,
+                "sha": _sha(full_name, path),
+                "size": self.file_size(full_name, path),
+                "type": "file",
+                "encoding": "none",
+                "content": "",
+            }
+        if name == "README.md" or (name.startswith("file") and name.endswith(".py")):
+            content = self.file_text(full_name, path).encode()
+            self.blobs[_sha(full_name, path)] = (full_name, path)
+            return {
+                "name": name,
+                "path": path,
+                "sha": _sha(full_name, path),
+                "size": len(content),
+                "type": "file",
+                "encoding": "base64",
+                "content": base64.encodebytes(content).decode(),
+            }
+        return None
+
+    def file_text(self, full_name: str, path: str) -> str:
+        return "".join(f"# {full_name}/{path} line {i}\n" for i in range(self.config.file_lines))
+
+    def file_bytes(self, full_name: str, path: str) -> bytes:
+        if path == "large.log":
+            with self.lock:
+                if full_name not in self.large_files:
+                    self.large_files[full_name] = "".join(
+                        f"{i:>9} {full_name} request served in {i % 997} ms\n" for i in range(self.config.large_file_lines)
+                    ).encode()
+                return self.large_files[full_name]
+        return self.file_text(full_name, path).encode()
+
+    def file_size(self, full_name: str, path: str) -> int:
+        return len(self.file_bytes(full_name, path))
+
+    # Rate limiting
+
+    def consume_rate(self, token: str) -> Tuple[int, int]:
+        """Count one request against the token, return (used, remaining)"""
+        with self.lock:
+            now = int(time.time())
+            if now >= self.rate_reset:
+                self.rate_used.clear()
+                self.rate_reset = now + self.config.rate_window_seconds
+            used = self.rate_used.get(token, 0) + 1
+            self.rate_used[token] = used
+        return used, max(self.config.rate_limit - used, 0)
+
+
+def _paginate(request: Request, items: List[Any]) -> Tuple[List[Any], Dict[str, str]]:
+    page = max(int(request.query_params.get("page", 1)), 1)
+    per_page = min(max(int(request.query_params.get("per_page", 30)), 1), 100)
+    last = max((len(items) + per_page - 1) // per_page, 1)
+    links = []
+    for rel, target in (("next", page + 1), ("last", last)):
+        if target <= last and (rel != "next" or page < last):
+            links.append(f'<{request.url.include_query_params(page=target)}>; rel="{rel}"')
+    headers = {"Link": ", ".join(links)} if links else {}
+    return items[(page - 1) * per_page:page * per_page], headers
+
+
+def create_app(config: Optional[FakeGitHubConfig] = None) -> FastAPI:
+    """Build the fake GitHub ASGI app for a config"""
+    state = FakeGitHubState(config or FakeGitHubConfig())
+    fake = FastAPI(title="Fake GitHub API")
+    fake.state.github = state
+
+    def respond(request: Request, payload: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+        all_headers = {"ETag": etag, **(headers or {})}
+        if request.method == "GET" and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=all_headers)
+        return Response(body, status_code=status_code, media_type="application/json", headers=all_headers)
+
+    def error(status_code: int, message: str, headers: Optional[Dict[str, str]] = None):
+        return Response(json.dumps({"message": message}), status_code=status_code,
+                        media_type="application/json", headers=headers)
+
+    @fake.middleware("http")
+    async def github_behaviour(request: Request, call_next):
+        cfg = state.config
+        delay = cfg.latency.sample(state.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if cfg.error_rate and state.rng.random() < cfg.error_rate:
+            if not cfg.error_paths or any(request.url.path.startswith(p) for p in cfg.error_paths):
+                return error(state.rng.choice(cfg.error_statuses), "Injected failure")
+
+        if request.url.path.startswith("/login/oauth"):
+            return await call_next(request)
+
+        token = request.headers.get("authorization", "").replace("token ", "").replace("Bearer ", "")
+        login = state.login_for_token(token)
+        if login is None:
+            return error(401, "Bad credentials")
+        request.state.login = login
+
+        used, remaining = state.consume_rate(token)
+        rate_headers = {
+            "X-RateLimit-Limit": str(cfg.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Used": str(used),
+            "X-RateLimit-Reset": str(state.rate_reset),
+            "X-RateLimit-Resource": "search" if request.url.path.startswith("/search") else "core",
+        }
+        if used > cfg.rate_limit:
+            return error(403, "API rate limit exceeded", rate_headers)
+
+        response = await call_next(request)
+        if response.status_code == 304:
+            # Conditional hits are free on GitHub
+            with state.lock:
+                state.rate_used[token] -= 1
+            rate_headers["X-RateLimit-Remaining"] = str(remaining + 1)
+            rate_headers["X-RateLimit-Used"] = str(used - 1)
+        response.headers.update(rate_headers)
+        return response
+
+    @fake.post("/login/oauth/access_token")
+    async def access_token(request: Request):
+        form = await request.form()
+        code = form.get("code", "")
+        login = code[len("code-"):] if code.startswith("code-") else ""
+        if state.user_index(login) is None:
+            return respond(request, {"error": "bad_verification_code"})
+        return respond(request, {"access_token": token_for(login), "token_type": "bearer", "scope": "repo,user:email"})
+
+    @fake.get("/user")
+    async def get_user(request: Request):
+        return respond(request, state.user(request.state.login))
+
+    @fake.get("/user/repos")
+    async def list_repos(request: Request):
+        login = request.state.login
+        base_url = str(request.base_url)
+        repos = [state.repo(login, i, base_url) for i in range(state.config.repos_per_user)]
+        # GitHub's default affiliation includes the repositories of the user's organizations
+        affiliation = request.query_params.get("affiliation", "owner,collaborator,organization_member")
+        if "organization_member" in affiliation:
+            repos += [
+                state.repo(f"org{org}", i, base_url, viewer=login)
+                for org in range(state.config.orgs) for i in range(state.config.repos_per_org)
+            ]
+        repos.sort(key=lambda r: r["updated_at"], reverse=True)
+        page, headers = _paginate(request, repos)
+        return respond(request, page, headers=headers)
+
+    @fake.get("/user/orgs")
+    async def list_orgs(request: Request):
+        orgs = [{"login": f"org{i}", **state.owner(f"org{i}")} for i in range(state.config.orgs)]
+        page, headers = _paginate(request, orgs)
+        return respond(request, page, headers=headers)
+
+    @fake.get("/orgs/{org}/repos")
+    async def list_org_repos(org: str, request: Request):
+        if state.org_index(org) is None:
+            return error(404, "Not Found")
+        base_url = str(request.base_url)
+        repos = [state.repo(org, i, base_url, viewer=request.state.login) for i in range(state.config.repos_per_org)]
+        repos.sort(key=lambda r: r["updated_at"], reverse=True)
+        page, headers = _paginate(request, repos)
+        return respond(request, page, headers=headers)
+
+    @fake.get("/repos/{owner}/{repo}")
+    async def get_repo(owner: str, repo: str, request: Request):
+        index = state.repo_index(owner, repo)
+        if index is None:
+            return error(404, "Not Found")
+        return respond(request, state.repo(owner, index, str(request.base_url), viewer=request.state.login))
+
+    @fake.get("/repos/{owner}/{repo}/pulls")
+    async def list_pulls(owner: str, repo: str, request: Request):
+        index = state.repo_index(owner, repo)
+        if index is None:
+            return error(404, "Not Found")
+        wanted = request.query_params.get("state", "open")
+        base_url = str(request.base_url)
+        pulls = [state.pull(owner, index, n, base_url) for n in range(1, state.config.prs_per_repo + 1)]
+        pulls = [p for p in pulls if wanted == "all" or p["state"] == wanted]
+        pulls.sort(key=lambda p: p["updated_at"], reverse=True)
+        page, headers = _paginate(request, pulls)
+        return respond(request, page, headers=headers)
+
+    @fake.get("/repos/{owner}/{repo}/pulls/{number}")
+    async def get_pull(owner: str, repo: str, number: int, request: Request):
+        index = state.repo_index(owner, repo)
+        if index is None or not 1 <= number <= state.config.prs_per_repo:
+            return error(404, "Not Found")
+        if "diff" in request.headers.get("accept", ""):
+            return Response(state.pull_diff(owner, index, number), media_type="text/plain")
+        return respond(request, state.pull(owner, index, number, str(request.base_url)))
+
+    @fake.get("/repos/{owner}/{repo}/pulls/{number}/files")
+    async def list_pull_files(owner: str, repo: str, number: int, request: Request):
+        index = state.repo_index(owner, repo)
+        if index is None or not 1 <= number <= state.config.prs_per_repo:
+            return error(404, "Not Found")
+        page, headers = _paginate(request, state.pull_files(owner, index, number))
+        return respond(request, page, headers=headers)
+
+    @fake.get("/search/issues")
+    async def search_issues(request: Request):
+        login = request.state.login
+        query = request.query_params.get("q", "")
+        wanted = "closed" if "is:closed" in query else "open"
+        base_url = str(request.base_url)
+        items = []
+        for repo_index in range(state.config.repos_per_user):
+            for number in range(1, state.config.prs_per_repo + 1):
+                pull = state.pull(login, repo_index, number, base_url)
+                if pull["state"] == wanted:
+                    items.append({
+                        "id": pull["id"],
+                        "number": number,
+                        "title": pull["title"],
+                        "updated_at": pull["updated_at"],
+                        "pull_request": {"url": pull["url"]},
+                    })
+        items.sort(key=lambda i: i["updated_at"], reverse=True)
+        page, headers = _paginate(request, items)
+        return respond(request, {"total_count": len(items), "incomplete_results": False, "items": page}, headers=headers)
+
+    @fake.get("/repos/{owner}/{repo}/issues/{number}/comments")
+    async def list_comments(owner: str, repo: str, number: int, request: Request):
+        index = state.repo_index(owner, repo)
+        if index is None:
+            return error(404, "Not Found")
+        comments = state.comments(owner, index, number)
+        since = request.query_params.get("since")
+        if since:
+            comments = [c for c in comments if c["updated_at"] >= since]
+        page, headers = _paginate(request, comments)
+        return respond(request, page, headers=headers)
+
+    @fake.post("/repos/{owner}/{repo}/issues/{number}/comments")
+    async def create_comment(owner: str, repo: str, number: int, request: Request):
+        if state.repo_index(owner, repo) is None:
+            return error(404, "Not Found")
+        payload = await request.json()
+        comment = state.post_comment(request.state.login, f"{owner}/{repo}", number, payload.get("body", ""))
+        return respond(request, comment, status_code=201)
+
+    @fake.get("/repos/{owner}/{repo}/contents")
+    @fake.get("/repos/{owner}/{repo}/contents/{path:path}")
+    async def get_contents(owner: str, repo: str, request: Request, path: str = ""):
+        if state.repo_index(owner, repo) is None:
+            return error(404, "Not Found")
+        contents = state.contents(f"{owner}/{repo}", path.strip("/"))
+        if contents is None:
+            return error(404, "Not Found")
+        return respond(request, contents)
+
+    @fake.get("/repos/{owner}/{repo}/git/blobs/{sha}")
+    async def get_blob(owner: str, repo: str, sha: str, request: Request):
+        blob = state.blobs.get(sha)
+        if state.repo_index(owner, repo) is None or blob is None or blob[0] != f"{owner}/{repo}":
+            return error(404, "Not Found")
+        content = state.file_bytes(*blob)
+        if "raw" in request.headers.get("accept", ""):
+            return Response(content, media_type="application/vnd.github.raw")
+        return respond(request, {
+            "sha": sha, "size": len(content), "encoding": "base64", "content": base64.encodebytes(content).decode()
+        })
+
+    @fake.get("/search/code")
+    async def search_code(request: Request):
+        query = request.query_params.get("q", "")
+        term, _, repo_part = query.partition(" repo:")
+        listing = state.contents(repo_part, "") or []
+        items = [
+            {"name": e["name"], "path": e["path"], "sha": e["sha"], "html_url": e["html_url"]}
+            for e in listing if e["type"] == "file" and term.lower() in e["name"].lower()
+        ]
+        return respond(request, {"total_count": len(items), "incomplete_results": False, "items": items})
+
+    return fake
+
+
+class FakeGitHubServer:
+    """Runs the fake API under uvicorn on a background thread"""
+
+    def __init__(self, config: Optional[FakeGitHubConfig] = None, host: str = "127.0.0.1", port: int = 9000):
+        import uvicorn
+
+        self.app = create_app(config)
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 10.0) -> "FakeGitHubServer":
+        """Start serving, raising if uvicorn exits or is not up within `timeout` seconds"""
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Fake GitHub server failed to start on {self.url}")
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Fake GitHub server did not start on {self.url} within {timeout}s")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Default instance for `uvicorn loadtest.fake_github:app`
+app = create_app()
@@ -1,20 +1,39 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import orjson
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from datetime import timedelta
 
-from database import get_db, create_tables
+from database import get_db, get_read_db, create_tables, ReadSessionLocal
 from config import settings
+from admission import AdmissionMiddleware
+from compression import CompressionMiddleware
+from conditional import weak_etag, etag_matches, not_modified, with_etag
+from metrics import collect as collect_metrics
 from models import User
 from schemas import (
-    Token, GitHubOAuthRequest, CommentCreateRequest,
-    UserResponse, RepositoryResponse, PullRequestResponse, CommentResponse
+    Token, GitHubOAuthRequest, CommentCreateRequest, BatchRequest, BatchOperation,
+    UserResponse, RepositoryResponse, PullRequestResponse, CommentResponse, UserSummaryResponse,
+    PullRequestSearchResult
+)
+from auth import create_access_token, get_current_user, get_current_user_for_stream
+from cache import cache
+from events import bus, sse_stream
+import export
+from scheduler import scheduler
+from org_sync import sync_owners, sync_owners_in_background
+from prefetch import prefetcher
+from retention import retention_job
+from tracing import TracedJSONResponse, TracingMiddleware, tracer
+from github_client import GitHubOAuth, GitHubClient, preload as preload_github_client
+from services import (
+    UserService, RepositoryService, PullRequestService, CommentService, SummaryService, DiffService, FileService,
+    REPOSITORY_LIST_COLUMNS, PULL_REQUEST_LIST_COLUMNS
 )
-from auth import create_access_token, get_current_user
-from github_client import GitHubOAuth, GitHubClient
-from services import UserService, RepositoryService, PullRequestService, CommentService
 
 # Create FastAPI app
 app = FastAPI(
@@ -23,6 +42,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control sits inside CORS so that 429 responses still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -36,12 +58,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Trace-Id", "Retry-After"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+app.add_middleware(TracingMiddleware)
 
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    create_tables(force=not settings.fast_startup)
+    if settings.fast_startup:
+        # Finish slow imports in the background instead of before the first request
+        asyncio.get_running_loop().run_in_executor(None, preload_github_client)
+    if settings.sync_scheduler_enabled:
+        scheduler.start()
+    if settings.retention_enabled:
+        retention_job.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    await retention_job.stop()
+    await prefetcher.stop()
 
 
 @app.get("/")
@@ -56,6 +95,29 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Process-local metrics (cache hit rates, ...) for this worker"""
+    return collect_metrics()
+
+
+@app.get("/debug/traces")
+async def get_traces(limit: int = Query(50, ge=1, le=500), min_duration_ms: float = 0):
+    """Latest sampled request traces in this worker, newest first"""
+    if settings.environment == "production":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return tracer.recent(limit, min_duration_ms)
+
+
+@app.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """All spans of one buffered trace"""
+    trace = tracer.get(trace_id) if settings.environment != "production" else None
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return trace
+
+
 # Authentication endpoints
 @app.post("/auth/github", response_model=Token)
 async def github_oauth(request: GitHubOAuthRequest, db: Session = Depends(get_db)):
@@ -79,9 +141,11 @@ async def github_oauth(request: GitHubOAuthRequest, db: Session = Depends(get_db
         try:
             await RepositoryService.sync_user_repositories(db, user)
             await PullRequestService.sync_user_pull_requests(db, user)
+            prefetcher.schedule(db, user)
         except Exception as sync_error:
             # Log sync error but don't fail the login
             print(f"Auto-sync warning: {sync_error}")
+        scheduler.record_activity(user.id)
         
         # Create JWT token
         access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
@@ -112,6 +176,20 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+@app.get("/user/summary", response_model=UserSummaryResponse, response_class=TracedJSONResponse)
+async def get_user_summary(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Dashboard aggregates (PRs by state, languages, stars, forks, recent repos)"""
+    summary = SummaryService.get_summary(db, current_user.username)
+    etag = weak_etag("summary", summary.username, summary.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(TracedJSONResponse(SummaryService.summary_to_dict(summary)), etag)
+
+
 @app.post("/user/sync")
 async def sync_user_data(
     current_user: User = Depends(get_current_user),
@@ -122,8 +200,9 @@ async def sync_user_data(
         # Sync user info
         user = await UserService.sync_user_from_github(db, current_user.github_access_token)
         
-        # Sync repositories
+        # Sync repositories, then warm the caches for the most recently updated ones
         await RepositoryService.sync_user_repositories(db, user)
+        prefetcher.schedule(db, user)
         
         return {"message": "User data synced successfully"}
     
@@ -142,6 +221,7 @@ async def sync_repositories(
     """Sync repositories from GitHub"""
     try:
         synced_repos = await RepositoryService.sync_user_repositories(db, current_user)
+        prefetcher.schedule(db, current_user)
         return {"message": f"Synced {len(synced_repos)} repositories"}
     
     except Exception as e:
@@ -168,66 +248,354 @@ async def sync_pull_requests(
         )
 
 
+# Organization endpoints
+async def get_organization_logins(github_client: GitHubClient) -> List[str]:
+    logins = []
+    page = 1
+    while True:
+        orgs = await github_client.get_user_organizations(page=page)
+        logins += [org["login"] for org in orgs]
+        if len(orgs) < 100:
+            return logins
+        page += 1
+
+
+@app.get("/organizations")
+async def get_user_organizations(current_user: User = Depends(get_current_user)):
+    """Get the organizations the user is a member of"""
+    try:
+        github_client = GitHubClient(current_user.github_access_token)
+        return [{"login": login} for login in await get_organization_logins(github_client)]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch organizations: {str(e)}"
+        )
+
+
+@app.post("/organizations/sync")
+async def sync_organizations(
+    background_tasks: BackgroundTasks,
+    owners: Optional[str] = None,
+    background: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sync repositories and pull requests of every owner the user can access
+    
+    `owners` (comma-separated logins: the user and/or their organizations) limits
+    the sync. With `background`, the sync runs after the response is sent.
+    """
+    owner_list = [owner.strip() for owner in owners.split(",") if owner.strip()] if owners else None
+    try:
+        if owner_list:
+            github_client = GitHubClient(current_user.github_access_token)
+            allowed = {current_user.username, *await get_organization_logins(github_client)}
+            unknown = [owner for owner in owner_list if owner not in allowed]
+            if unknown:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown owners: {', '.join(unknown)}")
+        if background:
+            background_tasks.add_task(sync_owners_in_background, current_user.id, owner_list)
+            return TracedJSONResponse({"message": "Sync started"}, status_code=status.HTTP_202_ACCEPTED)
+        return await sync_owners(db, current_user, owner_list)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Organization sync failed: {str(e)}"
+        )
+
+
+@app.get("/export/{table}")
+async def export_data(
+    table: str,
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    owner: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream a table of synced rows (repositories, pull_requests or comments) for bulk analysis
+    
+    `format` is ndjson (the default), or arrow (IPC stream) and parquet when pyarrow
+    is installed; `columns` is a comma-separated projection. Rows are the user's own or, with `owner`, those of the organization's
+    repositories the user is a member of.
+    """
+    try:
+        names = export.resolve_columns(table, format, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if format in export.COLUMNAR_FORMATS and not export.pyarrow_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"{format} export needs pyarrow installed; use format=ndjson"
+        )
+    try:
+        if owner and owner != current_user.username:
+            github_client = GitHubClient(current_user.github_access_token)
+            if owner not in await get_organization_logins(github_client):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown owner: {owner}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch organizations: {str(e)}"
+        )
+    
+    owner = owner if owner != current_user.username else None
+    filename = f"{owner or current_user.username}-{table}.{export.EXTENSIONS[format]}"
+    chunks = export.stream_export(
+        ReadSessionLocal, table, format, names, current_user.id, current_user.username, owner,
+        include_archived, settings.export_batch_size
+    )
+    return StreamingResponse(
+        chunks, media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# Streaming sync endpoints
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def encode_stream_event(event: str, data: dict, format: str) -> bytes:
+    """Encode one sync event as an NDJSON line or an SSE message"""
+    if format == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+    return orjson.dumps({"event": event, **data}) + b"\n"
+
+
+async def stream_sync(pages: AsyncIterator[List[dict]], item_event: str, format: str) -> AsyncIterator[bytes]:
+    """Emit each upserted row and a progress event per synced page, never holding more than one page"""
+    synced = 0
+    page_number = 0
+    try:
+        async for page in pages:
+            page_number += 1
+            for row in page:
+                yield encode_stream_event(item_event, {"data": row}, format)
+            synced += len(page)
+            yield encode_stream_event("progress", {"page": page_number, "synced": synced}, format)
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-band
+        yield encode_stream_event("error", {"detail": f"Sync failed: {str(e)}", "synced": synced}, format)
+        return
+    yield encode_stream_event("done", {"synced": synced}, format)
+
+
+def validate_stream_format(format: str) -> str:
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported stream format: {format}"
+        )
+    return format
+
+
+@app.post("/repositories/sync/stream")
+async def sync_repositories_stream(
+    format: str = "ndjson",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sync repositories from GitHub, streaming rows and progress as NDJSON or SSE"""
+    format = validate_stream_format(format)
+    pages = RepositoryService.iter_sync_user_repositories(db, current_user, REPOSITORY_LIST_COLUMNS)
+    return StreamingResponse(
+        stream_sync(pages, "repository", format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.post("/pull-requests/sync/stream")
+async def sync_pull_requests_stream(
+    format: str = "ndjson",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sync pull requests from GitHub, streaming rows and progress as NDJSON or SSE"""
+    format = validate_stream_format(format)
+    pages = PullRequestService.iter_sync_user_pull_requests(db, current_user, PULL_REQUEST_LIST_COLUMNS)
+    return StreamingResponse(
+        stream_sync(pages, "pull_request", format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+# Live change feed
+@app.get("/events")
+async def subscribe_events(
+    request: Request,
+    current_user: User = Depends(get_current_user_for_stream)
+):
+    """Server-Sent Events feed of pull request and comment changes for the current user"""
+    subscription = bus.subscribe(current_user.username)
+    return StreamingResponse(
+        sse_stream(subscription, request, settings.events_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Repository endpoints
-@app.get("/repositories", response_model=List[RepositoryResponse])
+# List endpoints return projected DB rows straight to orjson: the rows are trusted,
+# so the per-row response_model validation is skipped (response_model stays for the docs).
+@app.get("/repositories", response_model=List[RepositoryResponse], response_class=TracedJSONResponse)
 async def get_user_repositories(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get user's repositories"""
-    repositories = RepositoryService.get_repositories_by_user(db, current_user.id)
-    return repositories
+    etag = weak_etag("repositories", current_user.id, *RepositoryService.get_repository_list_fingerprint(db, current_user.id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    repositories = RepositoryService.get_repository_rows_by_user(db, current_user.id)
+    return with_etag(TracedJSONResponse(repositories), etag)
 
 
 
 
 # Pull Request endpoints
-@app.get("/pull-requests", response_model=List[PullRequestResponse])
+@app.get("/pull-requests", response_model=List[PullRequestResponse], response_class=TracedJSONResponse)
 async def get_user_pull_requests(
+    request: Request,
     state: str = "open",
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get user's pull requests"""
-    pull_requests = PullRequestService.get_pull_requests_by_user(db, current_user.id, state)
-    return pull_requests
-
-
+    """Get user's pull requests; include_archived adds closed PRs moved out by retention"""
+    etag = weak_etag(
+        "pull-requests", current_user.id, state, include_archived,
+        *PullRequestService.get_pull_request_list_fingerprint(db, current_user.id, state, include_archived)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    pull_requests = PullRequestService.get_pull_request_rows_by_user(db, current_user.id, state, include_archived)
+    return with_etag(TracedJSONResponse(pull_requests), etag)
+
+
+@app.get("/search/pull-requests", response_model=List[PullRequestSearchResult], response_class=TracedJSONResponse)
+async def search_pull_requests(
+    q: str = Query(..., min_length=1),
+    state: Optional[str] = None,
+    repo: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(30, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Full-text search over synced pull requests and comments, best match first
+    
+    `repo` is a repository name of the current user or an owner/name full name.
+    """
+    repo_full_name = None
+    if repo:
+        repo_full_name = repo if "/" in repo else f"{current_user.username}/{repo}"
+    results, total = PullRequestService.search_pull_requests(
+        db, current_user.username, q, state, repo_full_name, page, per_page
+    )
+    return TracedJSONResponse(results, headers={"X-Total-Count": str(total)})
+
+
+
+
+def github_pr_to_response(github_pr) -> PullRequestResponse:
+    """Convert a live GitHub pull request to the response format"""
+    pr_data = {
+        "github_id": github_pr.id,
+        "number": github_pr.number,
+        "title": github_pr.title,
+        "body": github_pr.body,
+        "state": github_pr.state,
+        "html_url": github_pr.html_url,
+        "repo_name": github_pr.base["repo"]["name"],
+        "repo_full_name": github_pr.base["repo"]["full_name"],
+        "author_username": github_pr.user["login"],
+        "author_avatar_url": github_pr.user.get("avatar_url"),
+        "head_ref": github_pr.head["ref"],
+        "created_at": github_pr.created_at,
+        "updated_at": github_pr.updated_at
+    }
+    return PullRequestResponse(**pr_data, id=github_pr.id, synced_at="2024-01-01T00:00:00Z")
+
+
+def github_comment_to_response(github_comment, pr_number: int) -> CommentResponse:
+    """Convert a live GitHub comment to the response format"""
+    comment_data = {
+        "github_id": github_comment.id,
+        "pull_request_id": pr_number,
+        "body": github_comment.body,
+        "author_username": github_comment.user["login"],
+        "author_avatar_url": github_comment.user.get("avatar_url"),
+        "html_url": github_comment.html_url,
+        "created_at": github_comment.created_at,
+        "updated_at": github_comment.updated_at
+    }
+    return CommentResponse(**comment_data, id=github_comment.id, synced_at="2024-01-01T00:00:00Z")
+
+
+# Repository endpoints take the repository owner as an optional `owner` query
+# parameter (an organization or another user); it defaults to the current user.
+def repository_full_name(current_user: User, repo_name: str, owner: Optional[str] = None) -> str:
+    return f"{owner or current_user.username}/{repo_name}"
+
+
+def repository_client(current_user: User, db: Session, repo_full_name: str) -> GitHubClient:
+    """GitHub client for one repository's endpoints; members share its cached responses"""
+    github_client = GitHubClient(current_user.github_access_token)
+    if RepositoryService.can_share_cache(db, current_user.id, repo_full_name):
+        github_client.share_repository_cache(repo_full_name)
+    return github_client
+
+
+async def ensure_repository_access(current_user: User, db: Session, repo_full_name: str):
+    """404 unless the user is a member of the repository, for data served from the database
+    
+    Repositories no sync has seen yet are checked with GitHub. The result is only cached
+    for REPOSITORY_ACCESS_CACHE_TTL: memberships come from the repository listings syncs
+    make, not from every repository a user can read.
+    """
+    if repo_full_name.split("/")[0] == current_user.username:
+        return
+    if RepositoryService.get_membership(db, current_user.id, repo_full_name) is not None:
+        return
+    cache_key = f"repository_access:{current_user.id}:{repo_full_name}"
+    if cache.get(cache_key):
+        return
+    try:
+        await GitHubClient(current_user.github_access_token).get_repository(repo_full_name)
+    except Exception as e:
+        if getattr(getattr(e, "response", None), "status_code", None) in (403, 404):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Repository not found")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to check repository access: {str(e)}"
+        )
+    cache.set(cache_key, True, ttl=settings.repository_access_cache_ttl)
 
 
 @app.get("/repositories/{repo_name}/pull-requests", response_model=List[PullRequestResponse])
 async def get_repository_pull_requests(
     repo_name: str,
     state: str = "open",
+    owner: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get pull requests for a specific repository"""
     try:
-        github_client = GitHubClient(current_user.github_access_token)
-        github_prs = await github_client.get_pull_requests(f"{current_user.username}/{repo_name}", state)
+        repo_full_name = repository_full_name(current_user, repo_name, owner)
+        github_client = repository_client(current_user, db, repo_full_name)
+        github_prs = await github_client.get_pull_requests(repo_full_name, state)
         
-        # Convert to response format
-        pull_requests = []
-        for github_pr in github_prs:
-            pr_data = {
-                "github_id": github_pr.id,
-                "number": github_pr.number,
-                "title": github_pr.title,
-                "body": github_pr.body,
-                "state": github_pr.state,
-                "html_url": github_pr.html_url,
-                "repo_name": github_pr.base["repo"]["name"],
-                "repo_full_name": github_pr.base["repo"]["full_name"],
-                "author_username": github_pr.user["login"],
-                "author_avatar_url": github_pr.user.get("avatar_url"),
-                "head_ref": github_pr.head["ref"],
-                "created_at": github_pr.created_at,
-                "updated_at": github_pr.updated_at
-            }
-            pull_requests.append(PullRequestResponse(**pr_data, id=github_pr.id, synced_at="2024-01-01T00:00:00Z"))
-        
-        return pull_requests
+        return [github_pr_to_response(github_pr) for github_pr in github_prs]
     
     except Exception as e:
         raise HTTPException(
@@ -236,44 +604,153 @@ async def get_repository_pull_requests(
         )
 
 
-# Comment endpoints
-@app.get("/pull-requests/{pr_number}/comments", response_model=List[CommentResponse])
-async def get_pull_request_comments(
+# Pull request files and diff endpoints
+# Responses are keyed by the PR's (base SHA, head SHA): cached listings never go stale
+# and the pair doubles as the ETag. Patches are left out of the file listing and
+# fetched one file at a time from .../files/patch.
+async def stream_json_array(pages: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    """Encode pages of items as one JSON array, sending each page as it arrives"""
+    yield b"["
+    first = True
+    async for page in pages:
+        for item in page:
+            yield (b"" if first else b",") + orjson.dumps(item)
+            first = False
+    yield b"]"
+
+
+async def get_pull_request_shas(github_client: GitHubClient, repo_full_name: str, pr_number: int) -> tuple:
+    try:
+        return await DiffService.get_shas(github_client, repo_full_name, pr_number)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch pull request: {str(e)}"
+        )
+
+
+def sha_headers(base_sha: str, head_sha: str, etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "X-Base-SHA": base_sha, "X-Head-SHA": head_sha}
+
+
+@app.get("/repositories/{repo_name}/pull-requests/{pr_number}/files")
+async def get_pull_request_files(
+    request: Request,
+    repo_name: str,
     pr_number: int,
+    owner: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """List the files changed by a pull request, without patches"""
+    github_client = GitHubClient(current_user.github_access_token)
+    repo_full_name = repository_full_name(current_user, repo_name, owner)
+    base_sha, head_sha = await get_pull_request_shas(github_client, repo_full_name, pr_number)
+    etag = weak_etag("files", repo_full_name, base_sha, head_sha)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    headers = sha_headers(base_sha, head_sha, etag)
+    cached = DiffService.get_cached_files(repo_full_name, base_sha, head_sha)
+    if cached is not None:
+        return TracedJSONResponse(cached["files"], headers=headers)
+    pages = DiffService.iter_files(github_client, repo_full_name, pr_number, base_sha, head_sha)
+    return StreamingResponse(stream_json_array(pages), media_type="application/json", headers=headers)
+
+
+@app.get("/repositories/{repo_name}/pull-requests/{pr_number}/files/patch")
+async def get_pull_request_file_patch(
+    request: Request,
     repo_name: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    pr_number: int,
+    path: str,
+    owner: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
 ):
-    """Get comments for a pull request"""
-    try:
-        github_client = GitHubClient(current_user.github_access_token)
-        github_comments = await github_client.get_pull_request_comments(
-            f"{current_user.username}/{repo_name}", 
-            pr_number
-        )
-        
-        # Convert to response format
-        comments = []
-        for github_comment in github_comments:
-            comment_data = {
-                "github_id": github_comment.id,
-                "pull_request_id": pr_number,
-                "body": github_comment.body,
-                "author_username": github_comment.user["login"],
-                "author_avatar_url": github_comment.user.get("avatar_url"),
-                "html_url": github_comment.html_url,
-                "created_at": github_comment.created_at,
-                "updated_at": github_comment.updated_at
-            }
-            comments.append(CommentResponse(**comment_data, id=github_comment.id, synced_at="2024-01-01T00:00:00Z"))
-        
-        return comments
+    """Get the patch of one file changed by a pull request"""
+    github_client = GitHubClient(current_user.github_access_token)
+    repo_full_name = repository_full_name(current_user, repo_name, owner)
+    base_sha, head_sha = await get_pull_request_shas(github_client, repo_full_name, pr_number)
+    etag = weak_etag("patch", repo_full_name, base_sha, head_sha, path)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
+    try:
+        patch = await DiffService.get_patch(github_client, repo_full_name, pr_number, base_sha, head_sha, path)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch comments: {str(e)}"
+            detail=f"Failed to fetch pull request files: {str(e)}"
         )
+    if patch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No patch for this file")
+    return TracedJSONResponse(
+        {"filename": path, "patch": patch},
+        headers=sha_headers(base_sha, head_sha, etag)
+    )
+
+
+@app.get("/repositories/{repo_name}/pull-requests/{pr_number}/diff")
+async def get_pull_request_diff(
+    request: Request,
+    repo_name: str,
+    pr_number: int,
+    owner: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get a pull request as a raw unified diff"""
+    github_client = GitHubClient(current_user.github_access_token)
+    repo_full_name = repository_full_name(current_user, repo_name, owner)
+    base_sha, head_sha = await get_pull_request_shas(github_client, repo_full_name, pr_number)
+    etag = weak_etag("diff", repo_full_name, base_sha, head_sha)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    headers = sha_headers(base_sha, head_sha, etag)
+    cached = DiffService.get_cached_diff(repo_full_name, base_sha, head_sha)
+    if cached is not None:
+        return Response(cached, media_type="text/x-diff", headers=headers)
+    chunks = DiffService.iter_diff(github_client, repo_full_name, pr_number, base_sha, head_sha)
+    return StreamingResponse(chunks, media_type="text/x-diff", headers=headers)
+
+
+# Comment endpoints
+# Comments are served from the comments table. The first request for a PR syncs it
+# inline; after that, requests older than COMMENTS_FRESH_SECONDS are answered from
+# the table right away and refreshed incrementally in the background.
+@app.get("/pull-requests/{pr_number}/comments", response_model=List[CommentResponse], response_class=TracedJSONResponse)
+async def get_pull_request_comments(
+    pr_number: int,
+    repo_name: str,
+    background_tasks: BackgroundTasks,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(30, ge=1, le=100),
+    include_archived: bool = False,
+    owner: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get comments for a pull request, newest first"""
+    repo_full_name = repository_full_name(current_user, repo_name, owner)
+    await ensure_repository_access(current_user, db, repo_full_name)
+    if include_archived and CommentService.is_archived(db, repo_full_name, pr_number):
+        # Archived PRs are closed and old, so their comments are served as archived
+        comments, total = CommentService.get_comment_rows(db, repo_full_name, pr_number, page, per_page, archived=True)
+        return TracedJSONResponse(comments, headers={"X-Total-Count": str(total)})
+    
+    sync_state = CommentService.get_sync_state(db, repo_full_name, pr_number)
+    if sync_state is None:
+        try:
+            await CommentService.sync_pull_request_comments(db, current_user, repo_full_name, pr_number)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to fetch comments: {str(e)}"
+            )
+    elif not CommentService.is_fresh(sync_state):
+        background_tasks.add_task(CommentService.refresh_in_background, current_user.id, repo_full_name, pr_number)
+    
+    comments, total = CommentService.get_comment_rows(db, repo_full_name, pr_number, page, per_page)
+    return TracedJSONResponse(comments, headers={"X-Total-Count": str(total)})
 
 
 @app.post("/pull-requests/{pr_number}/comments")
@@ -281,17 +758,25 @@ async def create_pull_request_comment(
     pr_number: int,
     repo_name: str,
     comment_request: CommentCreateRequest,
+    owner: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create a comment on a pull request"""
+    """Create a comment on a pull request
+    
+    The new comment is written through to the comments table (and search
+    index) and published as comment.created, so reading the comments back
+    is served locally instead of with another GitHub call.
+    """
     try:
+        repo_full_name = repository_full_name(current_user, repo_name, owner)
         github_client = GitHubClient(current_user.github_access_token)
         github_comment = await github_client.create_pull_request_comment(
-            f"{current_user.username}/{repo_name}",
+            repo_full_name,
             pr_number,
             comment_request.body
         )
+        CommentService.record_created(db, github_comment, repo_full_name, pr_number, current_user)
         
         return {
             "message": "Comment created successfully",
@@ -314,17 +799,24 @@ async def create_pull_request_comment(
 # Repository file endpoints
 @app.get("/repositories/{repo_name}/contents")
 async def get_repository_contents(
+    request: Request,
     repo_name: str,
     path: str = "",
+    owner: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get repository contents at a specific path"""
     try:
-        github_client = GitHubClient(current_user.github_access_token)
-        repo_full_name = f"{current_user.username}/{repo_name}"
+        repo_full_name = repository_full_name(current_user, repo_name, owner)
+        github_client = repository_client(current_user, db, repo_full_name)
         contents = await github_client.get_repository_contents(repo_full_name, path)
-        return contents
+        # Entry SHAs change whenever any listed file or subtree does
+        entries = contents if isinstance(contents, list) else [contents]
+        etag = weak_etag("contents", repo_full_name, path, *(entry.get("sha") for entry in entries))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return with_etag(TracedJSONResponse(contents), etag)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -334,17 +826,40 @@ async def get_repository_contents(
 
 @app.get("/repositories/{repo_name}/file")
 async def get_file_content(
+    request: Request,
     repo_name: str,
     path: str,
+    start_line: Optional[int] = Query(None, ge=1),
+    end_line: Optional[int] = Query(None, ge=1),
+    owner: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get the content of a specific file"""
+    """Get the content of a specific file, or of a range of its lines
+    
+    With start_line and/or end_line (1-based, inclusive) only that slice is
+    returned, at most FILE_MAX_RANGE_LINES lines, along with the file's
+    total_lines and size so the viewer can page through large files. Files
+    over 1 MB are always served this way, from the first line by default.
+    """
+    if start_line is not None and end_line is not None and end_line < start_line:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_line is before start_line")
     try:
-        github_client = GitHubClient(current_user.github_access_token)
-        repo_full_name = f"{current_user.username}/{repo_name}"
-        content = await github_client.get_file_content(repo_full_name, path)
-        return {"content": content, "path": path}
+        repo_full_name = repository_full_name(current_user, repo_name, owner)
+        github_client = repository_client(current_user, db, repo_full_name)
+        file = await github_client.get_file(repo_full_name, path)
+        etag = weak_etag("file", repo_full_name, path, file["sha"], start_line, end_line) if file["sha"] else None
+        if etag and etag_matches(request, etag):
+            return not_modified(etag)
+        if start_line is None and end_line is None and not file["truncated"]:
+            return with_etag(TracedJSONResponse({
+                "content": file["content"],
+                "path": path,
+                "total_lines": FileService.count_lines(file["content"]),
+                "size": file["size"],
+            }), etag)
+        lines = await FileService.read_lines(github_client, repo_full_name, file, start_line, end_line)
+        return with_etag(TracedJSONResponse({"path": path, **lines}), etag)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -356,13 +871,14 @@ async def get_file_content(
 async def search_repository_files(
     repo_name: str,
     query: str,
+    owner: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Search for files in a repository"""
     try:
         github_client = GitHubClient(current_user.github_access_token)
-        repo_full_name = f"{current_user.username}/{repo_name}"
+        repo_full_name = repository_full_name(current_user, repo_name, owner)
         results = await github_client.search_repository_files(repo_full_name, query)
         return results
     except Exception as e:
@@ -373,6 +889,65 @@ async def search_repository_files(
 
 
 
+# Batch endpoint
+async def run_batch_operation(github_client: GitHubClient, username: str, operation: BatchOperation):
+    """Run one /batch sub-request, mirroring the corresponding single endpoint"""
+    repo_full_name = f"{operation.owner or username}/{operation.repo_name}"
+    if operation.type == "contents":
+        return await github_client.get_repository_contents(repo_full_name, operation.path)
+    if operation.type == "file":
+        content = await github_client.get_file_content(repo_full_name, operation.path)
+        return {"content": content, "path": operation.path}
+    if operation.type == "pull_requests":
+        github_prs = await github_client.get_pull_requests(repo_full_name, operation.state)
+        return [github_pr_to_response(github_pr).dict() for github_pr in github_prs]
+    if operation.type == "comments":
+        if operation.pr_number is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="pr_number is required")
+        github_comments = await github_client.get_pull_request_comments(repo_full_name, operation.pr_number)
+        return [github_comment_to_response(c, operation.pr_number).dict() for c in github_comments]
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown operation type: {operation.type}")
+
+
+@app.post("/batch", response_class=TracedJSONResponse)
+async def batch(
+    batch_request: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Run several contents/file/pull request/comment reads in one authenticated request
+    
+    Sub-requests run concurrently over one GitHub connection pool; each result
+    carries its own status so one failure does not fail the batch.
+    """
+    operations = batch_request.requests
+    if len(operations) > settings.batch_max_operations:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.batch_max_operations} operations per batch"
+        )
+    
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    
+    async def run(operation: BatchOperation, github_client: GitHubClient) -> dict:
+        async with semaphore:
+            try:
+                data = await run_batch_operation(github_client, current_user.username, operation)
+                return {"id": operation.id, "status": 200, "data": data}
+            except HTTPException as e:
+                return {"id": operation.id, "status": e.status_code, "error": e.detail}
+            except Exception as e:
+                response = getattr(e, "response", None)
+                code = response.status_code if response is not None else status.HTTP_500_INTERNAL_SERVER_ERROR
+                return {"id": operation.id, "status": code, "error": str(e)}
+    
+    async with GitHubClient(current_user.github_access_token) as github_client:
+        for repo_full_name in {f"{operation.owner or current_user.username}/{operation.repo_name}" for operation in operations}:
+            if RepositoryService.can_share_cache(db, current_user.id, repo_full_name):
+                github_client.share_repository_cache(repo_full_name)
+        results = await asyncio.gather(*(run(operation, github_client) for operation in operations))
+    return TracedJSONResponse({"results": results})
+
 
 if __name__ == "__main__":
     import uvicorn
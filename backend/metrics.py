@@ -0,0 +1,20 @@
+"""
+Process-local metrics exposed on /metrics.
+
+Modules register a collector (a zero-argument callable returning a dict) under
+a name; /metrics returns every collector's current snapshot.
+"""
+
+from typing import Any, Callable, Dict
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]):
+    """Register (or replace) the collector published under `name`"""
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Any]:
+    """Snapshot of every registered collector"""
+    return {name: collector() for name, collector in _collectors.items()}
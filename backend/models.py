@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -6,6 +6,17 @@ from typing import Optional
 
 Base = declarative_base()
 
+# Bump whenever the models change so create_tables() re-checks the schema on startup
+SCHEMA_VERSION = 9
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 class User(Base):
     __tablename__ = "users"
@@ -41,7 +52,33 @@ class Repository(Base):
     owner_username = Column(String(255), nullable=False)
     owner_avatar_url = Column(String(500))
     updated_at = Column(DateTime(timezone=True))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set in Python so a freshly inserted row needs no reload to be read back
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    # Last local change. Set in Python: func.now() has 1-second resolution on SQLite, too coarse for ETags
+    synced_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=datetime.utcnow
+    )
+    pull_requests_synced_at = Column(DateTime(timezone=True))  # start of the last complete PR sync
+    
+    __table_args__ = (
+        Index("ix_repositories_full_name", "full_name"),
+    )
+
+
+class RepositoryMember(Base):
+    """A user's access to a repository, as GitHub reported it on their last sync"""
+    __tablename__ = "repository_members"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    repository_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    permission = Column(String(20), nullable=False)  # admin, maintain, push, triage, pull
+    updated_at = Column(DateTime(timezone=True))  # permission granted or changed
+    synced_at = Column(DateTime(timezone=True))  # last sync that saw the access
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "repository_id", name="uq_repository_members_user_repository"),
+    )
 
 
 class PullRequest(Base):
@@ -61,7 +98,13 @@ class PullRequest(Base):
     head_ref = Column(String(255))
     created_at = Column(DateTime(timezone=True))
     updated_at = Column(DateTime(timezone=True))
-    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+    synced_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    
+    __table_args__ = (
+        # Joins comments (repo_full_name, pull_request_id) to their pull request
+        Index("ix_pull_requests_repo_number", "repo_full_name", "number"),
+        Index("ix_pull_requests_author_state", "author_username", "state"),
+    )
 
 
 class Comment(Base):
@@ -69,12 +112,95 @@ class Comment(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     github_id = Column(Integer, unique=True, index=True, nullable=False)
+    pull_request_id = Column(Integer, nullable=False)  # PR number within repo_full_name
+    repo_full_name = Column(String(255))
+    body = Column(Text, nullable=False)
+    author_username = Column(String(255), nullable=False)
+    author_avatar_url = Column(String(500))
+    html_url = Column(String(500))
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    synced_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_comments_repo_pull_request_created", "repo_full_name", "pull_request_id", "created_at"),
+    )
+
+
+class ArchivedPullRequest(Base):
+    """Closed pull requests moved out of pull_requests by the retention job"""
+    __tablename__ = "pull_requests_archive"
+    
+    # SQLite reuses the ids of deleted rows, so the id the row had in pull_requests
+    # is not unique here and the archive has a key of its own
+    archive_id = Column(Integer, primary_key=True)
+    id = Column(Integer, nullable=False, index=True)  # id the row had in pull_requests
+    github_id = Column(Integer, unique=True, index=True, nullable=False)
+    number = Column(Integer, nullable=False)
+    title = Column(String(500), nullable=False)
+    body = Column(Text)
+    state = Column(String(50), nullable=False)
+    html_url = Column(String(500))
+    repo_name = Column(String(255), nullable=False)
+    repo_full_name = Column(String(255), nullable=False)
+    author_username = Column(String(255), nullable=False, index=True)
+    author_avatar_url = Column(String(500))
+    head_ref = Column(String(255))
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    synced_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ArchivedComment(Base):
+    """Comments of archived pull requests"""
+    __tablename__ = "comments_archive"
+    
+    archive_id = Column(Integer, primary_key=True)
+    id = Column(Integer, nullable=False, index=True)  # id the row had in comments
+    github_id = Column(Integer, unique=True, index=True, nullable=False)
     pull_request_id = Column(Integer, nullable=False)
+    repo_full_name = Column(String(255))
     body = Column(Text, nullable=False)
     author_username = Column(String(255), nullable=False)
     author_avatar_url = Column(String(500))
     html_url = Column(String(500))
     created_at = Column(DateTime(timezone=True))
     updated_at = Column(DateTime(timezone=True))
-    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+    synced_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_comments_archive_repo_pull_request", "repo_full_name", "pull_request_id"),
+    )
+
 
+class CommentSyncState(Base):
+    """When a pull request's comments were last refreshed from GitHub"""
+    __tablename__ = "comment_sync_state"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    repo_full_name = Column(String(255), nullable=False)
+    pull_request_number = Column(Integer, nullable=False)
+    synced_at = Column(DateTime(timezone=True))  # last refresh, full or incremental
+    full_synced_at = Column(DateTime(timezone=True))  # last refresh that also dropped deleted comments
+    
+    __table_args__ = (UniqueConstraint("repo_full_name", "pull_request_number"),)
+
+
+class UserSummary(Base):
+    """Dashboard aggregates per user, maintained incrementally by the sync services"""
+    __tablename__ = "user_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String(255), unique=True, index=True, nullable=False)
+    repository_count = Column(Integer, default=0)
+    total_stars = Column(Integer, default=0)
+    total_forks = Column(Integer, default=0)
+    languages = Column(Text, default="{}")  # JSON {language: repository count}
+    pull_requests_by_state = Column(Text, default="{}")  # JSON {state: pull request count}
+    recent_repositories = Column(Text, default="[]")  # JSON list, most recently updated first
+    # Part of the /user/summary ETag, so set in Python like Repository.synced_at
+    updated_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), onupdate=datetime.utcnow
+    )
@@ -0,0 +1,241 @@
+"""
+Sync across every owner a user can access.
+
+The work is partitioned by owner: the user's own and collaborator
+repositories (/user/repos?affiliation=owner,collaborator) and each
+organization's (/orgs/{org}/repos). Repository list pages are fetched
+ORG_SYNC_PAGE_BATCH at a time until a short page, then the pull requests of
+every repository are synced with at most ORG_SYNC_CONCURRENCY repositories in
+flight, taken round-robin across owners so one large organization does not
+hold up the others. Pull requests come most recently updated first, so a
+repository synced before is only paged until the pull requests updated before
+its last complete sync (less ORG_SYNC_OVERLAP_SECONDS): usually one call.
+
+Every GitHub call draws from a RateBudget. Once the token is within
+SYNC_RATE_RESERVE requests of its limit the sync stops and reports the
+repositories it did not get to, leaving the rest of the window for
+interactive use.
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from github_client import GitHubClient, get_rate_limit
+from metrics import register_collector
+from models import User
+from services import PullRequestService, RepositoryService
+
+PAGE_SIZE = 100
+
+
+class RateBudgetExhausted(Exception):
+    def __init__(self, reset: float):
+        super().__init__("GitHub rate limit reserve reached")
+        self.reset = reset
+
+
+class RateBudget:
+    """Stops new calls once the token's remaining requests reach the reserve"""
+
+    def __init__(self, access_token: str, reserve: int):
+        self.access_token = access_token
+        self.reserve = reserve
+        self.in_flight = 0
+        self.calls = 0
+
+    @asynccontextmanager
+    async def spend(self):
+        rate_limit = get_rate_limit(self.access_token)
+        # Calls still in flight have not been subtracted from `remaining` yet
+        if rate_limit is not None and rate_limit.remaining - self.in_flight <= self.reserve:
+            raise RateBudgetExhausted(rate_limit.reset)
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+
+def updated_before(github_pr, cutoff: datetime) -> bool:
+    """Whether a pull request was last updated before a naive UTC time"""
+    if not github_pr.updated_at:
+        return False
+    return datetime.fromisoformat(github_pr.updated_at.replace("Z", "+00:00")).replace(tzinfo=None) < cutoff
+
+
+class OwnerSync:
+    def __init__(self, db: Session, user: User, github_client: GitHubClient):
+        self.db = db
+        self.user = user
+        self.github_client = github_client
+        self.budget = RateBudget(user.github_access_token, settings.sync_rate_reserve)
+        self.concurrency = settings.org_sync_concurrency
+        self.page_batch = settings.org_sync_page_batch
+
+    async def _call(self, fetch: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        async with self.budget.spend():
+            return await fetch(*args, **kwargs)
+
+    async def owners(self) -> List[str]:
+        """The user followed by every organization they belong to"""
+        owners = [self.user.username]
+        page = 1
+        while True:
+            orgs = await self._call(self.github_client.get_user_organizations, page=page, per_page=PAGE_SIZE)
+            owners += [org["login"] for org in orgs]
+            if len(orgs) < PAGE_SIZE:
+                return owners
+            page += 1
+
+    async def _fetch_pages(self, fetch_page: Callable[[int], Awaitable[list]]) -> list:
+        """All pages of a list, fetched `page_batch` pages at a time"""
+        items = []
+        first = 1
+        while True:
+            pages = await asyncio.gather(*(
+                self._call(fetch_page, page) for page in range(first, first + self.page_batch)
+            ))
+            for page_items in pages:
+                items += page_items
+                if len(page_items) < PAGE_SIZE:
+                    return items
+            first += self.page_batch
+
+    async def sync_owner_repositories(self, owner: str) -> List[str]:
+        """Upsert an owner's repositories and the user's memberships; return their full names"""
+        started = datetime.utcnow()
+        if owner == self.user.username:
+            github_repos = await self._fetch_pages(lambda page: self.github_client.get_user_repositories(
+                page=page, per_page=PAGE_SIZE, affiliation="owner,collaborator"
+            ))
+        else:
+            github_repos = await self._fetch_pages(lambda page: self.github_client.get_organization_repositories(
+                owner, page=page, per_page=PAGE_SIZE
+            ))
+        for start in range(0, len(github_repos), PAGE_SIZE):
+            RepositoryService.upsert_page_from_github(self.db, github_repos[start:start + PAGE_SIZE], self.user)
+        RepositoryService.prune_memberships(self.db, self.user, started, owner)
+        return [github_repo.full_name for github_repo in github_repos]
+
+    async def sync_repository_pull_requests(self, repo_full_name: str) -> int:
+        """Upsert the pull requests updated since the repository's last complete sync"""
+        started = datetime.utcnow()
+        synced_at = RepositoryService.get_pull_requests_synced_at(self.db, repo_full_name)
+        cutoff = None
+        if synced_at is not None:
+            cutoff = synced_at.replace(tzinfo=None) - timedelta(seconds=settings.org_sync_overlap_seconds)
+        synced = 0
+        page = 1
+        while True:
+            github_prs = await self._call(
+                self.github_client.get_pull_requests, repo_full_name, "all", page=page, per_page=PAGE_SIZE
+            )
+            fetched = len(github_prs)
+            if cutoff is not None:
+                github_prs = [github_pr for github_pr in github_prs if not updated_before(github_pr, cutoff)]
+            synced += len(PullRequestService.upsert_page_from_github(self.db, github_prs))
+            if fetched < PAGE_SIZE or len(github_prs) < fetched:
+                RepositoryService.set_pull_requests_synced_at(self.db, repo_full_name, started)
+                return synced
+            page += 1
+
+    async def run(self, owners: Optional[List[str]] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {
+            "owners": [], "repositories": 0, "pull_requests": 0,
+            "failed_repositories": 0, "skipped_repositories": 0, "rate_limited": False,
+        }
+        repositories_by_owner: List[List[str]] = []
+        try:
+            owners = owners or await self.owners()
+            result["owners"] = owners
+            for owner in owners:
+                repositories_by_owner.append(await self.sync_owner_repositories(owner))
+        except RateBudgetExhausted as e:
+            result["rate_limited"], result["rate_reset"] = True, e.reset
+        result["repositories"] = sum(len(names) for names in repositories_by_owner)
+
+        # Round-robin across owners
+        queue = [name for names in itertools.zip_longest(*repositories_by_owner) for name in names if name]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def sync_one(repo_full_name: str):
+            async with semaphore:
+                if result["rate_limited"]:
+                    result["skipped_repositories"] += 1
+                    return
+                try:
+                    synced = await self.sync_repository_pull_requests(repo_full_name)
+                except RateBudgetExhausted as e:
+                    result["rate_limited"], result["rate_reset"] = True, e.reset
+                    result["skipped_repositories"] += 1
+                except Exception as e:
+                    print(f"Pull request sync failed for {repo_full_name}: {e}")
+                    result["failed_repositories"] += 1
+                else:
+                    result["pull_requests"] += synced
+
+        await asyncio.gather(*(sync_one(name) for name in queue))
+        result["github_calls"] = self.budget.calls
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        stats.record(result)
+        return result
+
+
+class OwnerSyncStats:
+    def __init__(self):
+        self.runs = 0
+        self.repositories = 0
+        self.pull_requests = 0
+        self.rate_limited_runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def record(self, result: Dict[str, Any]):
+        self.runs += 1
+        self.repositories += result["repositories"]
+        self.pull_requests += result["pull_requests"]
+        self.rate_limited_runs += int(result["rate_limited"])
+        self.last_run = {key: value for key, value in result.items() if key != "owners"}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "repositories": self.repositories,
+            "pull_requests": self.pull_requests,
+            "rate_limited_runs": self.rate_limited_runs,
+            "last_run": self.last_run,
+        }
+
+
+async def sync_owners(db: Session, user: User, owners: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Sync the repositories and pull requests of `owners` (default: all the user can access)"""
+    async with GitHubClient(user.github_access_token) as github_client:
+        return await OwnerSync(db, user, github_client).run(owners)
+
+
+async def sync_owners_in_background(user_id: int, owners: Optional[List[str]] = None):
+    """sync_owners with its own session, for BackgroundTasks"""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            await sync_owners(db, user, owners)
+    except Exception as e:
+        print(f"Background owner sync failed for user {user_id}: {e}")
+    finally:
+        db.close()
+
+
+# Global owner sync statistics
+stats = OwnerSyncStats()
+register_collector("owner_sync", stats.snapshot)
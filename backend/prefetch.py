@@ -0,0 +1,233 @@
+"""
+Cache warm-up after a repository sync.
+
+Once sync_user_repositories has run (at login, POST /user/sync and
+POST /repositories/sync), a low-priority task fetches what the user is likely
+to open first in their PREFETCH_REPOSITORIES most recently updated
+repositories: the root contents listing, the README and the open pull
+requests. The responses land in the GitHub response cache the interactive
+endpoints read, under the user's token scope. Repositories are warmed one
+call at a time, so a run never holds more than one connection.
+
+A run stops after PREFETCH_MAX_REQUESTS GitHub calls or PREFETCH_MAX_BYTES
+of file content, and never takes the token below PREFETCH_RATE_FLOOR
+remaining requests. When the user's own requests come in and the calls the
+run may still make would take the token below that floor, the run is
+cancelled so the rest of the window goes to interactive traffic.
+
+Every key a run fetched is remembered (for an hour, the cache's ETag
+retention) until the user first reads it: a hit, counted as fresh when it
+was served without a GitHub call and as revalidated when it still needed a
+304. Hit rates are reported per kind (contents, readme, pulls) under
+"prefetch" in /metrics.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from github_client import GitHubClient, background_reads, interactive_read_listeners, rate_limits, token_scope
+from metrics import register_collector
+from models import Repository, RepositoryMember, User
+from org_sync import RateBudget, RateBudgetExhausted
+
+KINDS = ("contents", "readme", "pulls")
+
+
+class PrefetchBudgetReached(Exception):
+    pass
+
+
+class PrefetchRun:
+    def __init__(self, scope: str, access_token: str, repositories: List[str]):
+        self.scope = scope
+        self.access_token = access_token
+        self.repositories = repositories
+        self.budget = RateBudget(access_token, settings.prefetch_rate_floor)
+        self.requests = 0
+        self.bytes = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def requests_left(self) -> int:
+        return max(0, settings.prefetch_max_requests - self.requests)
+
+
+class Prefetcher:
+    # How long a warmed key waits for its first interactive read, and how many are tracked
+    TRACK_SECONDS = 3600
+    MAX_TRACKED = 10000
+
+    def __init__(self):
+        self.enabled = settings.prefetch_enabled
+        self.runs: Dict[str, PrefetchRun] = {}
+        # Cache key -> (kind, warmed at), oldest first
+        self.warmed: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.outcomes = {
+            "completed": 0, "budget_reached": 0, "rate_floor": 0, "cancelled": 0, "failed_calls": 0
+        }
+        self.requests = 0
+        self.bytes = 0
+        self.warmed_by_kind = {kind: 0 for kind in KINDS}
+        self.fresh_hits = {kind: 0 for kind in KINDS}
+        self.revalidated_hits = {kind: 0 for kind in KINDS}
+        self.unused = {kind: 0 for kind in KINDS}
+
+    def schedule(self, db: Session, user: User) -> Optional[asyncio.Task]:
+        """Start warming the caches for a user's most recently updated repositories"""
+        if not self.enabled:
+            return None
+        scope = token_scope(user.github_access_token)
+        if scope in self.runs:
+            return self.runs[scope].task
+        recent = [full_name for full_name, in db.query(Repository.full_name).join(
+            RepositoryMember, RepositoryMember.repository_id == Repository.id
+        ).filter(RepositoryMember.user_id == user.id).order_by(
+            func.coalesce(Repository.updated_at, Repository.created_at).desc()
+        ).limit(settings.prefetch_repositories)]
+        if not recent:
+            return None
+        run = PrefetchRun(scope, user.github_access_token, recent)
+        run.task = asyncio.get_running_loop().create_task(self._run(run))
+        run.task.add_done_callback(lambda _: self.runs.pop(scope, None))
+        self.runs[scope] = run
+        return run.task
+
+    async def stop(self):
+        runs = list(self.runs.values())
+        for run in runs:
+            run.task.cancel()
+        await asyncio.gather(*(run.task for run in runs), return_exceptions=True)
+
+    async def _fetch(self, run: PrefetchRun, kind: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        if run.requests_left <= 0:
+            raise PrefetchBudgetReached()
+        keys: List[str] = []
+        async with run.budget.spend():
+            token = background_reads.set(keys)
+            try:
+                return await call()
+            finally:
+                background_reads.reset(token)
+                # Only keys actually fetched from GitHub count; fresh cache hits cost nothing
+                run.requests += len(keys)
+                self.requests += len(keys)
+                for key in keys:
+                    self._track(key, kind)
+
+    async def _warm_repository(self, run: PrefetchRun, github_client: GitHubClient, repo_full_name: str):
+        try:
+            contents = await self._fetch(run, "contents", lambda: github_client.get_repository_contents(repo_full_name))
+        except (PrefetchBudgetReached, RateBudgetExhausted):
+            raise
+        except Exception as e:
+            print(f"Prefetch of {repo_full_name} contents failed: {e}")
+            self.outcomes["failed_calls"] += 1
+            contents = []
+
+        listing = contents if isinstance(contents, list) else []
+        readme = next((
+            entry for entry in listing
+            if entry.get("type") == "file" and entry.get("name", "").lower().startswith("readme")
+        ), None)
+        if readme is not None and run.bytes + (readme.get("size") or 0) <= settings.prefetch_max_bytes:
+            try:
+                await self._fetch(run, "readme", lambda: github_client.get_file(repo_full_name, readme["path"]))
+                run.bytes += readme.get("size") or 0
+                self.bytes += readme.get("size") or 0
+            except (PrefetchBudgetReached, RateBudgetExhausted):
+                raise
+            except Exception as e:
+                print(f"Prefetch of {repo_full_name} README failed: {e}")
+                self.outcomes["failed_calls"] += 1
+
+        try:
+            await self._fetch(run, "pulls", lambda: github_client.get_pull_requests(repo_full_name, "open"))
+        except (PrefetchBudgetReached, RateBudgetExhausted):
+            raise
+        except Exception as e:
+            print(f"Prefetch of {repo_full_name} pull requests failed: {e}")
+            self.outcomes["failed_calls"] += 1
+
+    async def _run(self, run: PrefetchRun):
+        try:
+            async with GitHubClient(run.access_token) as github_client:
+                for repo_full_name in run.repositories:
+                    # Just synced, so the user's membership is current
+                    if settings.repository_cache_sharing:
+                        github_client.share_repository_cache(repo_full_name)
+                    await self._warm_repository(run, github_client, repo_full_name)
+            self.outcomes["completed"] += 1
+        except PrefetchBudgetReached:
+            self.outcomes["budget_reached"] += 1
+        except RateBudgetExhausted:
+            self.outcomes["rate_floor"] += 1
+        except asyncio.CancelledError:
+            self.outcomes["cancelled"] += 1
+            raise
+
+    def _track(self, key: str, kind: str):
+        self.warmed_by_kind[kind] += 1
+        self.warmed.pop(key, None)
+        self.warmed[key] = (kind, time.time())
+        self._expire()
+
+    def _expire(self):
+        cutoff = time.time() - self.TRACK_SECONDS
+        while self.warmed:
+            key, (kind, warmed_at) = next(iter(self.warmed.items()))
+            if warmed_at > cutoff and len(self.warmed) <= self.MAX_TRACKED:
+                break
+            del self.warmed[key]
+            self.unused[kind] += 1
+
+    def on_interactive_read(self, scope: str, key: str, fresh: bool):
+        """Count hits on warmed keys; cancel a run whose remaining calls the user now needs"""
+        tracked = self.warmed.pop(key, None)
+        if tracked is not None:
+            kind, _ = tracked
+            (self.fresh_hits if fresh else self.revalidated_hits)[kind] += 1
+
+        run = self.runs.get(scope)
+        if run is None or run.task.done():
+            return
+        rate_limit = rate_limits.get(scope)
+        if rate_limit is not None and rate_limit.reset > time.time() \
+                and rate_limit.remaining - run.requests_left <= settings.prefetch_rate_floor:
+            run.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire()
+        kinds = {}
+        for kind in KINDS:
+            hits = self.fresh_hits[kind] + self.revalidated_hits[kind]
+            kinds[kind] = {
+                "warmed": self.warmed_by_kind[kind],
+                "fresh_hits": self.fresh_hits[kind],
+                "revalidated_hits": self.revalidated_hits[kind],
+                "unused": self.unused[kind],
+                "hit_rate": round(hits / self.warmed_by_kind[kind], 4) if self.warmed_by_kind[kind] else 0.0,
+            }
+        warmed = sum(self.warmed_by_kind.values())
+        hits = sum(self.fresh_hits.values()) + sum(self.revalidated_hits.values())
+        return {
+            "enabled": self.enabled,
+            "running": len(self.runs),
+            **self.outcomes,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "pending": len(self.warmed),
+            "hit_rate": round(hits / warmed, 4) if warmed else 0.0,
+            "kinds": kinds,
+        }
+
+
+# Global prefetcher instance
+prefetcher = Prefetcher()
+interactive_read_listeners.append(prefetcher.on_interactive_read)
+register_collector("prefetch", prefetcher.stats)
@@ -0,0 +1,293 @@
+"""
+Timeouts, retries, hedging and circuit breaking for GitHub API calls.
+
+Every call is tagged with an endpoint class (the GitHubClient.CACHE_TTLS keys
+plus "files", "diff", "blobs" and "write"), which picks its policy:
+
+- each attempt gets the class's timeout budget
+- idempotent reads are retried on 5xx, timeouts and connection errors with
+  jittered exponential backoff
+- with GITHUB_HEDGING_ENABLED, a read still pending after the class's observed
+  p95 latency gets a duplicate request; whichever answers first wins
+- after `breaker_threshold` consecutive failures a class's breaker opens and
+  calls fail fast with CircuitOpenError for `breaker_cooldown` seconds, after
+  which one probe call is let through. GitHubClient serves cached data, where it
+  has some, while a breaker is open.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import settings
+from metrics import register_collector
+from tracing import tracer
+
+
+@dataclass
+class EndpointPolicy:
+    timeout: float  # seconds per attempt
+    retries: int = 2
+    idempotent: bool = True
+
+
+POLICIES: Dict[str, EndpointPolicy] = {
+    "user": EndpointPolicy(timeout=5.0),
+    "repos": EndpointPolicy(timeout=10.0),
+    "pulls": EndpointPolicy(timeout=10.0),
+    "comments": EndpointPolicy(timeout=5.0),
+    "contents": EndpointPolicy(timeout=5.0),
+    "search": EndpointPolicy(timeout=10.0, retries=1),
+    "files": EndpointPolicy(timeout=15.0),
+    "diff": EndpointPolicy(timeout=30.0, retries=1),
+    "blobs": EndpointPolicy(timeout=60.0, retries=1),
+    "write": EndpointPolicy(timeout=10.0, retries=0, idempotent=False),
+}
+DEFAULT_POLICY = EndpointPolicy(timeout=10.0)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"GitHub {endpoint} calls are failing; retrying in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class UpstreamError(Exception):
+    """A retryable failure: a 5xx response, a timeout or a connection error"""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def before_call(self, endpoint: str):
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(endpoint, remaining)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(endpoint, self.cooldown)
+            self._probe_in_flight = True
+
+    def release_probe(self):
+        """Let another probe through after one that ended without an outcome (e.g. cancelled)"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class EndpointStats:
+    WINDOW = 200
+    # No hedging until this many latencies have been observed
+    MIN_SAMPLES = 20
+
+    def __init__(self):
+        self.latencies: deque = deque(maxlen=self.WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class Upstream:
+    def __init__(self):
+        self.hedging = settings.github_hedging_enabled
+        self.backoff_base = settings.github_retry_backoff_seconds
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats: Dict[str, EndpointStats] = {}
+        self.rng = random.Random()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(
+                settings.github_breaker_threshold, settings.github_breaker_cooldown_seconds
+            )
+        return self.breakers[endpoint]
+
+    def endpoint_stats(self, endpoint: str) -> EndpointStats:
+        if endpoint not in self.stats:
+            self.stats[endpoint] = EndpointStats()
+        return self.stats[endpoint]
+
+    def is_open(self, endpoint: str) -> bool:
+        return self.breaker(endpoint).state == CircuitBreaker.OPEN
+
+    async def call(self, endpoint: str, send: Callable[[], Awaitable["httpx.Response"]]) -> "httpx.Response":
+        """Run `send` under the endpoint class's policy
+
+        Returns the last response (possibly a 5xx once retries are exhausted, for
+        the caller's raise_for_status) or raises the last timeout/connection error.
+        """
+        policy = POLICIES.get(endpoint, DEFAULT_POLICY)
+        breaker = self.breaker(endpoint)
+        stats = self.endpoint_stats(endpoint)
+        breaker.before_call(endpoint)
+
+        try:
+            with tracer.span(f"github.{endpoint}"):
+                return await self._attempts(send, policy, breaker, stats)
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+    async def _attempts(self, send, policy: EndpointPolicy, breaker: CircuitBreaker, stats: EndpointStats):
+        import httpx
+
+        attempts = policy.retries + 1 if policy.idempotent else 1
+        for attempt in range(attempts):
+            if attempt:
+                stats.retries += 1
+                delay = self.backoff_base * (2 ** (attempt - 1))
+                await asyncio.sleep(delay * self.rng.uniform(0.5, 1.5))
+            stats.calls += 1
+            started = time.perf_counter()
+            try:
+                if self.hedging and policy.idempotent:
+                    response = await self._hedged(send, policy, stats)
+                else:
+                    response = await asyncio.wait_for(send(), timeout=policy.timeout)
+            except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+                stats.timeouts += 1
+                error: Exception = e
+            except httpx.TransportError as e:
+                error = e
+            else:
+                if response.status_code < 500:
+                    stats.latencies.append(time.perf_counter() - started)
+                    breaker.record_success()
+                    return response
+                error = UpstreamError(f"GitHub returned {response.status_code}")
+                if attempt == attempts - 1:
+                    stats.failures += 1
+                    breaker.record_failure()
+                    return response
+                await response.aclose()  # release the connection of a streamed response
+            if attempt == attempts - 1:
+                stats.failures += 1
+                breaker.record_failure()
+                raise error
+
+    @asynccontextmanager
+    async def guard(self, endpoint: str):
+        """Breaker bookkeeping only, for calls that cannot be retried or hedged (streams)"""
+        import httpx
+
+        breaker = self.breaker(endpoint)
+        stats = self.endpoint_stats(endpoint)
+        breaker.before_call(endpoint)
+        stats.calls += 1
+        try:
+            with tracer.span(f"github.{endpoint}"):
+                yield
+        except (httpx.TransportError, asyncio.TimeoutError):
+            stats.failures += 1
+            breaker.record_failure()
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                stats.failures += 1
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release_probe()
+            raise
+        breaker.record_success()
+
+    async def _hedged(self, send, policy: EndpointPolicy, stats: EndpointStats):
+        """Send, and send again if there is no answer after the observed p95"""
+        deadline = time.perf_counter() + policy.timeout
+        primary = asyncio.ensure_future(send())
+        hedge_after = stats.quantile(0.95)
+        tasks = [primary]  # attempts still pending
+        sent, winner = [primary], None
+        try:
+            if hedge_after is not None and hedge_after < policy.timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    stats.hedges += 1
+                    tasks.append(asyncio.ensure_future(send()))
+                    sent.append(tasks[-1])
+            while tasks:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None or not tasks:
+                        if task is not primary:
+                            stats.hedge_wins += 1
+                        winner = task
+                        return task.result()
+            raise asyncio.TimeoutError()
+        finally:
+            for task in sent:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled() and task.exception() is None:
+                    # Both attempts finished in the same wait: release the loser's connection
+                    await task.result().aclose()
+
+    def snapshot(self) -> Dict[str, object]:
+        result = {}
+        for endpoint, stats in self.stats.items():
+            breaker = self.breaker(endpoint)
+            p50, p95 = stats.quantile(0.5), stats.quantile(0.95)
+            result[endpoint] = {
+                "breaker": breaker.state,
+                "breaker_opened": breaker.times_opened,
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "timeouts": stats.timeouts,
+                "retries": stats.retries,
+                "hedges": stats.hedges,
+                "hedge_wins": stats.hedge_wins,
+                "hedge_win_rate": round(stats.hedge_wins / stats.hedges, 3) if stats.hedges else 0.0,
+                "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+        return result
+
+
+# Global upstream policy instance
+upstream = Upstream()
+register_collector("github_upstream", upstream.snapshot)
@@ -0,0 +1,164 @@
+"""
+Retention and compaction of synced history.
+
+Closed pull requests not updated for RETENTION_CLOSED_PR_DAYS are moved, with
+their comments, to pull_requests_archive / comments_archive, which keeps the
+hot tables and their indexes small. Archived rows are still served on demand
+(`include_archived=true` on the list and comment endpoints) and count towards
+dashboard summaries. A PR that is synced again (e.g. reopened) moves back.
+
+After archiving, the database is compacted: ANALYZE (plus FTS5 optimize on
+SQLite), and VACUUM when RETENTION_VACUUM is set. VACUUM rewrites the whole
+SQLite file and blocks writers while it runs, so it is off by default.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import search
+from config import settings
+from metrics import register_collector
+from models import ArchivedComment, ArchivedPullRequest, Comment, CommentSyncState, PullRequest
+
+
+def _columns(model) -> List[str]:
+    return [column.key for column in model.__table__.columns if column.key not in ("archive_id", "archived_at")]
+
+
+def archive_closed_pull_requests(db: Session, older_than_days: int, batch_size: int = 500) -> Dict[str, int]:
+    """Move closed PRs older than the cutoff, and their comments, to the archive tables"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    pull_request_columns = _columns(ArchivedPullRequest)
+    comment_columns = _columns(ArchivedComment)
+    archived = {"pull_requests": 0, "comments": 0}
+    while True:
+        prs = db.query(PullRequest).filter(
+            PullRequest.state != "open", PullRequest.updated_at < cutoff
+        ).order_by(PullRequest.id).limit(batch_size).all()
+        if not prs:
+            break
+
+        numbers_by_repo: Dict[str, List[int]] = {}
+        for pr in prs:
+            numbers_by_repo.setdefault(pr.repo_full_name, []).append(pr.number)
+        comments = []
+        for repo_full_name, numbers in numbers_by_repo.items():
+            comments += db.query(Comment).filter(
+                Comment.repo_full_name == repo_full_name, Comment.pull_request_id.in_(numbers)
+            ).all()
+
+        now = datetime.utcnow()
+        db.bulk_insert_mappings(ArchivedPullRequest, [
+            {**{key: getattr(pr, key) for key in pull_request_columns}, "archived_at": now} for pr in prs
+        ])
+        db.bulk_insert_mappings(ArchivedComment, [
+            {**{key: getattr(comment, key) for key in comment_columns}, "archived_at": now} for comment in comments
+        ])
+        search.remove_pull_requests(db, [pr.id for pr in prs])
+        search.remove_comments(db, [comment.id for comment in comments])
+        for repo_full_name, numbers in numbers_by_repo.items():
+            db.query(CommentSyncState).filter(
+                CommentSyncState.repo_full_name == repo_full_name,
+                CommentSyncState.pull_request_number.in_(numbers)
+            ).delete(synchronize_session=False)
+        if comments:
+            db.query(Comment).filter(Comment.id.in_([c.id for c in comments])).delete(synchronize_session=False)
+        db.query(PullRequest).filter(PullRequest.id.in_([pr.id for pr in prs])).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+
+        archived["pull_requests"] += len(prs)
+        archived["comments"] += len(comments)
+    return archived
+
+
+def compact(engine, vacuum: bool = False):
+    """Refresh planner statistics and, optionally, reclaim free pages"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if engine.dialect.name == "sqlite":
+            for table in ("pull_request_fts", "comment_fts"):
+                connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('optimize')"))
+            if vacuum:
+                connection.execute(text("VACUUM"))
+            connection.execute(text("ANALYZE"))
+        elif engine.dialect.name == "postgresql":
+            command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+            for table in ("pull_requests", "comments", "pull_requests_archive", "comments_archive"):
+                connection.execute(text(f"{command} {table}"))
+
+
+class RetentionJob:
+    # Delay before the first run after startup
+    INITIAL_DELAY_SECONDS = 60
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.archived_pull_requests = 0
+        self.archived_comments = 0
+        self.last_run: Optional[float] = None
+        self.last_duration_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    def run_once(self) -> Dict[str, int]:
+        """Archive and compact once; blocking, so run it in an executor"""
+        from database import SessionLocal, engine
+
+        started = time.time()
+        db = SessionLocal()
+        try:
+            archived = archive_closed_pull_requests(
+                db, settings.retention_closed_pr_days, settings.retention_batch_size
+            )
+        finally:
+            db.close()
+        compact(engine, vacuum=settings.retention_vacuum)
+
+        self.runs += 1
+        self.archived_pull_requests += archived["pull_requests"]
+        self.archived_comments += archived["comments"]
+        self.last_run = started
+        self.last_duration_seconds = time.time() - started
+        self.last_error = None
+        return archived
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(self.INITIAL_DELAY_SECONDS)
+        while True:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.run_once)
+            except Exception as e:
+                print(f"Retention run failed: {e}")
+                self.last_error = str(e)
+            await asyncio.sleep(settings.retention_interval_hours * 3600)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self._task is not None,
+            "runs": self.runs,
+            "archived_pull_requests": self.archived_pull_requests,
+            "archived_comments": self.archived_comments,
+            "last_run": self.last_run,
+            "last_duration_seconds": round(self.last_duration_seconds, 3),
+            "last_error": self.last_error,
+        }
+
+
+# Global retention job instance
+retention_job = RetentionJob()
+register_collector("retention", retention_job.stats)
@@ -0,0 +1,267 @@
+"""
+Background sync scheduler.
+
+Refreshes every user's repositories and pull requests on a rolling basis so
+list endpoints stay fresh without sync work on the request path:
+
+- each user's interval shrinks with recent activity and with the fraction of
+  rows that changed on previous runs, between the configured min and max
+- due times are jittered so users synced together drift apart
+- a user is deferred until their rate window resets once their token is
+  within SYNC_RATE_RESERVE requests of its limit, checked before every page
+- at most SYNC_MAX_CONCURRENCY syncs run at once across all users
+
+Only enable it on one worker; every enabled worker runs its own queue.
+"""
+
+import asyncio
+import heapq
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import settings
+from metrics import register_collector
+
+
+class UserSchedule:
+    def __init__(self, user_id: int, due: float):
+        self.user_id = user_id
+        self.due = due
+        self.last_active: Optional[float] = None
+        self.last_run: Optional[float] = None
+        self.change_rate = 0.5  # EWMA of the fraction of synced rows that had changed
+        self.running = False
+
+
+class SyncScheduler:
+    # Weight of the latest run in the change-rate moving average
+    CHANGE_RATE_ALPHA = 0.3
+    # Recently active users are synced up to this many times more often than idle ones
+    ACTIVITY_HORIZON_HOURS = 24
+    # How often the user list is reloaded from the database
+    USER_REFRESH_SECONDS = 300
+    # Queue-lag samples kept for the metrics window
+    LAG_WINDOW = 500
+
+    def __init__(self):
+        self.min_interval = settings.sync_min_interval_seconds
+        self.max_interval = settings.sync_max_interval_seconds
+        self.jitter = settings.sync_jitter
+        self.rate_reserve = settings.sync_rate_reserve
+        self.max_concurrency = settings.sync_max_concurrency
+        self.rng = random.Random()
+        self.schedules: Dict[int, UserSchedule] = {}
+        self._heap: List[tuple] = []
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._running_tasks: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lags: List[float] = []
+        self.completed = 0
+        self.failed = 0
+        self.deferred = 0
+
+    # Scheduling policy
+
+    def interval_for(self, schedule: UserSchedule, now: float) -> float:
+        """Seconds until the next sync of a user, before jitter"""
+        if schedule.last_active is None:
+            activity_factor = 1.0
+        else:
+            idle_hours = max(now - schedule.last_active, 0) / 3600
+            activity_factor = min(1.0, (idle_hours + 1) / self.ACTIVITY_HORIZON_HOURS)
+        change_factor = 1.0 - 0.75 * schedule.change_rate
+        interval = self.max_interval * activity_factor * change_factor
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _push(self, schedule: UserSchedule, due: float):
+        schedule.due = due
+        heapq.heappush(self._heap, (due, schedule.user_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def record_activity(self, user_id: int):
+        """Note an interactive request; pulls the user's next sync forward if it is far off
+
+        Callable from any thread (sync dependencies run in the threadpool): the
+        schedule is updated on the scheduler's event loop.
+        """
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._record_activity, user_id, time.time())
+        except RuntimeError:
+            pass  # the loop has closed
+
+    def _record_activity(self, user_id: int, now: float):
+        schedule = self.schedules.get(user_id)
+        if schedule is None:
+            if self._task is None:
+                return
+            schedule = self.schedules[user_id] = UserSchedule(user_id, now)
+            self._push(schedule, now + self._jittered(self.min_interval))
+        schedule.last_active = now
+        if not schedule.running:
+            due = (schedule.last_run or now) + self._jittered(self.interval_for(schedule, now))
+            if due < schedule.due:
+                self._push(schedule, due)
+
+    # Main loop
+
+    def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._running_tasks):
+            task.cancel()
+        await asyncio.gather(self._task, *self._running_tasks, return_exceptions=True)
+        self._task = None
+        self._loop = None
+
+    def _load_users(self):
+        from database import SessionLocal
+        from models import User
+
+        db = SessionLocal()
+        try:
+            user_ids = [row.id for row in db.query(User.id).filter(User.github_access_token.isnot(None))]
+        finally:
+            db.close()
+        now = time.time()
+        for user_id in user_ids:
+            if user_id not in self.schedules:
+                # Spread the initial runs over the minimum interval
+                schedule = self.schedules[user_id] = UserSchedule(user_id, now)
+                self._push(schedule, now + self.rng.uniform(0, self.min_interval))
+
+    async def _run(self):
+        next_refresh = 0.0
+        while True:
+            now = time.time()
+            if now >= next_refresh:
+                self._load_users()
+                next_refresh = now + self.USER_REFRESH_SECONDS
+
+            while self._heap and self._heap[0][0] <= now:
+                due, user_id = heapq.heappop(self._heap)
+                schedule = self.schedules.get(user_id)
+                if schedule is None or schedule.due != due or schedule.running:
+                    continue  # superseded entry
+                await self._semaphore.acquire()
+                schedule.running = True
+                self._record_lag(time.time() - due)
+                task = asyncio.get_running_loop().create_task(self._sync(schedule))
+                self._running_tasks.add(task)
+                task.add_done_callback(self._running_tasks.discard)
+
+            timeout = min(self._heap[0][0] - time.time(), next_refresh - time.time()) if self._heap else 1.0
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sync(self, schedule: UserSchedule):
+        from database import SessionLocal
+        from models import User
+        from org_sync import RateBudget, RateBudgetExhausted
+        from services import PullRequestService, RepositoryService
+
+        db = SessionLocal()
+        next_due = None
+        try:
+            user = db.query(User).filter(User.id == schedule.user_id).first()
+            if user is None or not user.github_access_token:
+                self.schedules.pop(schedule.user_id, None)
+                return
+
+            started = time.time()
+            since = datetime.utcfromtimestamp(schedule.last_run) if schedule.last_run else None
+            budget = RateBudget(user.github_access_token, self.rate_reserve)
+            rows = []
+            for pages in (
+                RepositoryService.iter_sync_user_repositories(db, user),
+                PullRequestService.iter_sync_user_pull_requests(db, user),
+            ):
+                rows += await self._budgeted_pages(budget, pages)
+            if since is not None and rows:
+                changed = sum(
+                    1 for row in rows
+                    if row.updated_at is not None and row.updated_at.replace(tzinfo=None) > since
+                )
+                schedule.change_rate += self.CHANGE_RATE_ALPHA * (changed / len(rows) - schedule.change_rate)
+            schedule.last_run = started
+            self.completed += 1
+        except RateBudgetExhausted as e:
+            # Leave the remaining budget to the user's interactive traffic
+            self.deferred += 1
+            next_due = e.reset + self._jittered(60)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Scheduled sync failed for user {schedule.user_id}: {e}")
+            self.failed += 1
+        finally:
+            db.close()
+            schedule.running = False
+            self._semaphore.release()
+            if schedule.user_id in self.schedules:
+                now = time.time()
+                self._push(schedule, next_due or now + self._jittered(self.interval_for(schedule, now)))
+
+    @staticmethod
+    async def _budgeted_pages(budget, pages) -> list:
+        """Rows of every page of a sync iterator, each page fetched under the rate budget"""
+        rows = []
+        try:
+            while True:
+                async with budget.spend():
+                    try:
+                        page = await pages.__anext__()
+                    except StopAsyncIteration:
+                        return rows
+                rows += page
+        finally:
+            await pages.aclose()
+
+    # Metrics
+
+    def _record_lag(self, lag: float):
+        self._lags.append(max(lag, 0.0))
+        if len(self._lags) > self.LAG_WINDOW:
+            del self._lags[:len(self._lags) - self.LAG_WINDOW]
+
+    def stats(self) -> Dict[str, object]:
+        now = time.time()
+        lags = sorted(self._lags)
+        overdue = [s for s in self.schedules.values() if not s.running and s.due <= now]
+        return {
+            "enabled": self._task is not None,
+            "users": len(self.schedules),
+            "running": sum(1 for s in self.schedules.values() if s.running),
+            "overdue": len(overdue),
+            "oldest_overdue_seconds": round(max((now - s.due for s in overdue), default=0.0), 3),
+            "queue_lag_p50_seconds": round(lags[len(lags) // 2], 3) if lags else 0.0,
+            "queue_lag_p95_seconds": round(lags[int(len(lags) * 0.95)], 3) if lags else 0.0,
+            "queue_lag_max_seconds": round(lags[-1], 3) if lags else 0.0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "deferred_for_rate_limit": self.deferred,
+        }
+
+
+# Global scheduler instance
+scheduler = SyncScheduler()
+register_collector("sync_scheduler", scheduler.stats)
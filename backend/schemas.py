@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -50,6 +50,7 @@ class RepositoryCreate(RepositoryBase):
 class RepositoryResponse(RepositoryBase):
     id: int
     created_at: datetime
+    permission: Optional[str] = None  # The current user's: admin, maintain, push, triage or pull
     
     class Config:
         orm_mode = True
@@ -83,9 +84,14 @@ class PullRequestResponse(PullRequestBase):
         orm_mode = True
 
 
+class PullRequestSearchResult(PullRequestResponse):
+    score: float
+
+
 class CommentBase(BaseModel):
     github_id: int
     pull_request_id: int
+    repo_full_name: Optional[str] = None
     body: str
     author_username: str
     author_avatar_url: Optional[str] = None
@@ -106,6 +112,25 @@ class CommentResponse(CommentBase):
         orm_mode = True
 
 
+class RecentRepository(BaseModel):
+    name: str
+    full_name: str
+    language: Optional[str] = None
+    stargazers_count: int = 0
+    updated_at: Optional[datetime] = None
+
+
+class UserSummaryResponse(BaseModel):
+    username: str
+    repository_count: int = 0
+    total_stars: int = 0
+    total_forks: int = 0
+    languages: Dict[str, int] = {}
+    pull_requests_by_state: Dict[str, int] = {}
+    recent_repositories: List[RecentRepository] = []
+    updated_at: Optional[datetime] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -132,6 +157,7 @@ class GitHubRepository(BaseModel):
     private: bool
     updated_at: str
     owner: dict
+    permissions: Optional[dict] = None  # The token owner's access, on authenticated listings
 
 
 class GitHubPullRequest(BaseModel):
@@ -161,3 +187,18 @@ class GitHubComment(BaseModel):
 class CommentCreateRequest(BaseModel):
     body: str
 
+
+
+
+class BatchOperation(BaseModel):
+    id: Optional[str] = None  # Echoed back so clients can match results
+    type: str  # contents | file | pull_requests | comments
+    repo_name: str
+    owner: Optional[str] = None  # Defaults to the current user
+    path: str = ""
+    state: str = "open"
+    pr_number: Optional[int] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchOperation]
@@ -0,0 +1,211 @@
+"""
+Full-text search over synced pull requests and their comments.
+
+SQLite uses two FTS5 tables keyed by rowid (pull_request_fts over title and
+body, comment_fts over comment bodies) ranked with bm25. PostgreSQL uses
+tsvector side tables with GIN indexes ranked with ts_rank. Other dialects fall
+back to a LIKE scan. The service-layer upserts keep the index current;
+ensure_schema() creates it and backfills it from existing rows.
+
+Comment matches count towards their pull request, at half the weight of a
+title/body match.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Title matches weigh more than body matches
+TITLE_WEIGHT = 10.0
+COMMENT_WEIGHT = 0.5
+
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pull_request_fts USING fts5(title, body, tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comment_fts USING fts5(body, tokenize='porter unicode61')",
+]
+
+_POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS pull_request_search ("
+    " pull_request_id INTEGER PRIMARY KEY REFERENCES pull_requests(id) ON DELETE CASCADE,"
+    " document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_pull_request_search_document ON pull_request_search USING GIN (document)",
+    "CREATE TABLE IF NOT EXISTS comment_search ("
+    " comment_id INTEGER PRIMARY KEY REFERENCES comments(id) ON DELETE CASCADE,"
+    " document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_comment_search_document ON comment_search USING GIN (document)",
+]
+
+# (search table, statement filling it from the base table)
+_SQLITE_BACKFILL = [
+    ("pull_request_fts",
+     "INSERT INTO pull_request_fts(rowid, title, body) SELECT id, title, coalesce(body, '') FROM pull_requests"),
+    ("comment_fts", "INSERT INTO comment_fts(rowid, body) SELECT id, body FROM comments"),
+]
+
+_POSTGRES_BACKFILL = [
+    ("pull_request_search",
+     "INSERT INTO pull_request_search(pull_request_id, document) "
+     "SELECT id, setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+     "to_tsvector('english', coalesce(body, '')) FROM pull_requests"),
+    ("comment_search",
+     "INSERT INTO comment_search(comment_id, document) SELECT id, to_tsvector('english', body) FROM comments"),
+]
+
+_PG_PULL_REQUEST_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(:title, '')), 'A') || "
+    "to_tsvector('english', coalesce(:body, ''))"
+)
+
+
+def dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def query_terms(query: str) -> List[str]:
+    """Words of a user query; everything else (operators, quotes) is dropped"""
+    return re.findall(r"\w+", query.lower())
+
+
+def ensure_schema(engine):
+    """Create the search tables if needed and backfill each one that is empty"""
+    name = engine.dialect.name
+    if name not in ("sqlite", "postgresql"):
+        return
+    with engine.begin() as connection:
+        for statement in (_SQLITE_DDL if name == "sqlite" else _POSTGRES_DDL):
+            connection.execute(text(statement))
+        for table, backfill in (_SQLITE_BACKFILL if name == "sqlite" else _POSTGRES_BACKFILL):
+            if connection.execute(text(f"SELECT count(*) FROM {table}")).scalar() == 0:
+                connection.execute(text(backfill))
+
+
+def index_pull_request(db: Session, pr):
+    """Add or refresh a pull request's entry; committed with the caller's transaction"""
+    name = dialect(db)
+    params = {"id": pr.id, "title": pr.title or "", "body": pr.body or ""}
+    if name == "sqlite":
+        db.execute(text("DELETE FROM pull_request_fts WHERE rowid = :id"), params)
+        db.execute(text("INSERT INTO pull_request_fts(rowid, title, body) VALUES (:id, :title, :body)"), params)
+    elif name == "postgresql":
+        db.execute(text(
+            f"INSERT INTO pull_request_search(pull_request_id, document) VALUES (:id, {_PG_PULL_REQUEST_DOCUMENT}) "
+            "ON CONFLICT (pull_request_id) DO UPDATE SET document = EXCLUDED.document"
+        ), params)
+
+
+def index_comment(db: Session, comment):
+    name = dialect(db)
+    params = {"id": comment.id, "body": comment.body or ""}
+    if name == "sqlite":
+        db.execute(text("DELETE FROM comment_fts WHERE rowid = :id"), params)
+        db.execute(text("INSERT INTO comment_fts(rowid, body) VALUES (:id, :body)"), params)
+    elif name == "postgresql":
+        db.execute(text(
+            "INSERT INTO comment_search(comment_id, document) VALUES (:id, to_tsvector('english', :body)) "
+            "ON CONFLICT (comment_id) DO UPDATE SET document = EXCLUDED.document"
+        ), params)
+
+
+def remove_pull_requests(db: Session, pull_request_ids: List[int]):
+    """Drop index entries of pull requests leaving the table (PostgreSQL cascades on its own)"""
+    if pull_request_ids and dialect(db) == "sqlite":
+        db.execute(
+            text(f"DELETE FROM pull_request_fts WHERE rowid IN ({', '.join(str(int(i)) for i in pull_request_ids)})")
+        )
+
+
+def remove_comments(db: Session, comment_ids: List[int]):
+    """Drop index entries of deleted comments (PostgreSQL cascades on its own)"""
+    if comment_ids and dialect(db) == "sqlite":
+        db.execute(
+            text(f"DELETE FROM comment_fts WHERE rowid IN ({', '.join(str(int(i)) for i in comment_ids)})")
+        )
+
+
+def _match_sql(name: str) -> Tuple[str, str]:
+    """(pull request match, comment match) subqueries yielding (pr_id, score), higher is better"""
+    if name == "sqlite":
+        return (
+            f"SELECT rowid AS pr_id, -bm25(pull_request_fts, {TITLE_WEIGHT}, 1.0) AS score "
+            "FROM pull_request_fts WHERE pull_request_fts MATCH :match",
+            f"SELECT p.id AS pr_id, -bm25(comment_fts) * {COMMENT_WEIGHT} AS score "
+            "FROM comment_fts JOIN comments c ON c.id = comment_fts.rowid "
+            "JOIN pull_requests p ON p.repo_full_name = c.repo_full_name AND p.number = c.pull_request_id "
+            "WHERE comment_fts MATCH :match",
+        )
+    if name == "postgresql":
+        return (
+            "SELECT pull_request_id AS pr_id, ts_rank(document, to_tsquery('english', :match)) AS score "
+            "FROM pull_request_search WHERE document @@ to_tsquery('english', :match)",
+            f"SELECT p.id AS pr_id, ts_rank(s.document, to_tsquery('english', :match)) * {COMMENT_WEIGHT} AS score "
+            "FROM comment_search s JOIN comments c ON c.id = s.comment_id "
+            "JOIN pull_requests p ON p.repo_full_name = c.repo_full_name AND p.number = c.pull_request_id "
+            "WHERE s.document @@ to_tsquery('english', :match)",
+        )
+    return (
+        "SELECT id AS pr_id, 1.0 AS score FROM pull_requests WHERE lower(title) LIKE :match OR lower(body) LIKE :match",
+        f"SELECT p.id AS pr_id, {COMMENT_WEIGHT} AS score FROM comments c "
+        "JOIN pull_requests p ON p.repo_full_name = c.repo_full_name AND p.number = c.pull_request_id "
+        "WHERE lower(c.body) LIKE :match",
+    )
+
+
+def _match_expression(name: str, terms: List[str]) -> str:
+    """All terms must match; the last one as a prefix, for search-as-you-type"""
+    if name == "sqlite":
+        return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+    if name == "postgresql":
+        return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+    return f"%{' '.join(terms)}%"
+
+
+def search_pull_requests(
+    db: Session,
+    username: str,
+    query: str,
+    state: Optional[str] = None,
+    repo_full_name: Optional[str] = None,
+    page: int = 1,
+    per_page: int = 30,
+) -> Tuple[List[Tuple[int, float]], int]:
+    """Ranked page of (pull request id, score) over the PRs a user authored, owns or is a member of the repository of
+
+    Returns the page and the total number of matches.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], 0
+    name = dialect(db)
+    pull_request_match, comment_match = _match_sql(name)
+    filters = [
+        "(p.author_username = :username OR p.repo_full_name LIKE :owned OR p.repo_full_name IN ("
+        "SELECT r.full_name FROM repositories r JOIN repository_members m ON m.repository_id = r.id "
+        "JOIN users u ON u.id = m.user_id WHERE u.username = :username))"
+    ]
+    params = {
+        "match": _match_expression(name, terms),
+        "username": username,
+        "owned": f"{username}/%",
+        "limit": per_page,
+        "offset": (page - 1) * per_page,
+    }
+    if state:
+        filters.append("p.state = :state")
+        params["state"] = state
+    if repo_full_name:
+        filters.append("p.repo_full_name = :repo_full_name")
+        params["repo_full_name"] = repo_full_name
+
+    ranked = (
+        f"WITH matches AS ({pull_request_match} UNION ALL {comment_match}), "
+        "ranked AS (SELECT pr_id, sum(score) AS score FROM matches GROUP BY pr_id) "
+    )
+    joined = f"FROM ranked JOIN pull_requests p ON p.id = ranked.pr_id WHERE {' AND '.join(filters)}"
+    total = db.execute(text(f"{ranked} SELECT count(*) {joined}"), params).scalar()
+    rows = db.execute(text(
+        f"{ranked} SELECT p.id, ranked.score {joined} "
+        "ORDER BY ranked.score DESC, p.updated_at DESC LIMIT :limit OFFSET :offset"
+    ), params)
+    return [(row[0], float(row[1])) for row in rows], total
@@ -1,15 +1,29 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
-from datetime import datetime
-from models import User, Repository, PullRequest, Comment
+from sqlalchemy import and_, func, insert, literal, or_, select
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import json
+from starlette.concurrency import run_in_threadpool
+from blobs import blob_store
+from cache import cache
+from config import settings
+from database import SessionLocal
+from models import (
+    User, Repository, RepositoryMember, PullRequest, Comment, CommentSyncState, UserSummary,
+    ArchivedPullRequest, ArchivedComment
+)
 from schemas import (
     UserCreate, RepositoryCreate, PullRequestCreate, CommentCreate,
     GitHubRepository, GitHubPullRequest, GitHubComment
 )
 from github_client import GitHubClient
+from auth import invalidate_user
+from events import bus
+from tracing import trace_methods
+import search
 
 
+@trace_methods
 class UserService:
     @staticmethod
     def get_user_by_github_id(db: Session, github_id: int) -> Optional[User]:
@@ -28,11 +42,13 @@ class UserService:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        invalidate_user(db_user.username)
         return db_user
     
     @staticmethod
     def update_user(db: Session, user: User, user_data: dict) -> User:
         """Update user information"""
+        previous_username = user.username
         for field, value in user_data.items():
             if hasattr(user, field):
                 setattr(user, field, value)
@@ -40,6 +56,8 @@ class UserService:
         user.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(user)
+        invalidate_user(previous_username)
+        invalidate_user(user.username)
         return user
     
     @staticmethod
@@ -72,19 +90,206 @@ class UserService:
         return user
 
 
+# Columns served by the list endpoints, in RepositoryResponse / PullRequestResponse field order
+REPOSITORY_LIST_COLUMNS = (
+    Repository.id, Repository.github_id, Repository.name, Repository.full_name,
+    Repository.description, Repository.html_url, Repository.language,
+    Repository.stargazers_count, Repository.forks_count, Repository.private,
+    Repository.owner_username, Repository.owner_avatar_url, Repository.updated_at,
+    Repository.created_at,
+)
+
+PULL_REQUEST_LIST_COLUMNS = (
+    PullRequest.id, PullRequest.github_id, PullRequest.number, PullRequest.title,
+    PullRequest.body, PullRequest.state, PullRequest.html_url, PullRequest.repo_name,
+    PullRequest.repo_full_name, PullRequest.author_username, PullRequest.author_avatar_url,
+    PullRequest.head_ref, PullRequest.created_at, PullRequest.updated_at, PullRequest.synced_at,
+)
+
+COMMENT_LIST_COLUMNS = (
+    Comment.id, Comment.github_id, Comment.pull_request_id, Comment.repo_full_name, Comment.body,
+    Comment.author_username, Comment.author_avatar_url, Comment.html_url, Comment.created_at,
+    Comment.updated_at, Comment.synced_at,
+)
+
+# The same columns read from the archive tables (see retention.py)
+ARCHIVED_PULL_REQUEST_LIST_COLUMNS = tuple(getattr(ArchivedPullRequest, c.key) for c in PULL_REQUEST_LIST_COLUMNS)
+ARCHIVED_COMMENT_LIST_COLUMNS = tuple(getattr(ArchivedComment, c.key) for c in COMMENT_LIST_COLUMNS)
+
+# GitHub page size used by the sync methods
+SYNC_PAGE_SIZE = 100
+
+
+def to_row(obj, columns) -> dict:
+    """Plain dict of an ORM object, shaped like the list endpoint rows"""
+    return {column.key: getattr(obj, column.key) for column in columns}
+
+
+# Strongest first, as in GitHub's `permissions` object
+PERMISSION_LEVELS = ("admin", "maintain", "push", "triage", "pull")
+
+
+def permission_level(permissions: Optional[dict], default: str = "pull") -> str:
+    """Strongest level granted by a GitHub `permissions` object"""
+    for level in PERMISSION_LEVELS:
+        if permissions and permissions.get(level):
+            return level
+    return default
+
+
+def backfill_repository_members(engine):
+    """Give users admin membership of the repositories they own, once, when the table is new"""
+    with engine.begin() as connection:
+        if connection.execute(select(func.count(RepositoryMember.id))).scalar():
+            return
+        now = datetime.utcnow()
+        connection.execute(insert(RepositoryMember).from_select(
+            ["repository_id", "user_id", "permission", "updated_at", "synced_at"],
+            select(Repository.id, User.id, literal("admin"), literal(now), literal(now)).join(
+                User, User.username == Repository.owner_username
+            )
+        ))
+
+
+def member_repository_names(user_id, owner: Optional[str] = None):
+    """Subquery of the full names of the repositories (of `owner`) a user is a member of"""
+    query = select(Repository.full_name).join(
+        RepositoryMember, RepositoryMember.repository_id == Repository.id
+    ).where(RepositoryMember.user_id == user_id)
+    return query.where(Repository.owner_username == owner) if owner else query
+
+
+def visible_pull_requests(model, user_id, username):
+    """Pull requests a user sees: the ones they authored and those in their member repositories"""
+    return or_(model.author_username == username, model.repo_full_name.in_(member_repository_names(user_id)))
+
+
+def has_changes(obj, data: dict) -> bool:
+    """Whether applying data to obj would change any stored value (timezones ignored)"""
+    for field, value in data.items():
+        current = getattr(obj, field, None)
+        if isinstance(current, datetime) and isinstance(value, datetime):
+            if current.replace(tzinfo=None) != value.replace(tzinfo=None):
+                return True
+        elif current != value:
+            return True
+    return False
+
+
+@trace_methods
 class RepositoryService:
     @staticmethod
     def get_repositories_by_user(db: Session, user_id: int) -> List[Repository]:
-        """Get repositories for a user"""
-        return db.query(Repository).filter(
-            Repository.owner_username == db.query(User.username).filter(User.id == user_id).scalar_subquery()
-        ).all()
+        """Get the repositories a user is a member of (own, collaborator and organization)"""
+        return db.query(Repository).join(
+            RepositoryMember, RepositoryMember.repository_id == Repository.id
+        ).filter(RepositoryMember.user_id == user_id).all()
+    
+    @staticmethod
+    def get_repository_rows_by_user(db: Session, user_id: int) -> List[dict]:
+        """Get a user's repositories, with their permission, as plain dicts skipping ORM hydration"""
+        rows = db.query(*REPOSITORY_LIST_COLUMNS, RepositoryMember.permission).join(
+            RepositoryMember, RepositoryMember.repository_id == Repository.id
+        ).filter(RepositoryMember.user_id == user_id).all()
+        return [row._asdict() for row in rows]
+    
+    @staticmethod
+    def get_repository_list_fingerprint(db: Session, user_id: int) -> tuple:
+        """Cheap (count, last change) summary of a user's repository list, for ETags"""
+        return tuple(db.query(
+            func.count(Repository.id), func.max(Repository.synced_at), func.max(Repository.updated_at),
+            func.max(RepositoryMember.updated_at)
+        ).join(
+            RepositoryMember, RepositoryMember.repository_id == Repository.id
+        ).filter(RepositoryMember.user_id == user_id).one())
+    
+    @staticmethod
+    def get_membership(db: Session, user_id: int, repo_full_name: str) -> Optional[RepositoryMember]:
+        """The user's membership of a repository, if a sync has seen it"""
+        return db.query(RepositoryMember).join(
+            Repository, Repository.id == RepositoryMember.repository_id
+        ).filter(RepositoryMember.user_id == user_id, Repository.full_name == repo_full_name).first()
+    
+    @staticmethod
+    def can_share_cache(db: Session, user_id: int, repo_full_name: str) -> bool:
+        """Whether the user may use the GitHub response cache shared by a repository's members
+        
+        Public repositories always; private ones while a sync within
+        REPOSITORY_MEMBERSHIP_MAX_AGE_SECONDS confirmed the user's access.
+        """
+        if not settings.repository_cache_sharing:
+            return False
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.repository_membership_max_age_seconds)
+        return db.query(Repository.id).outerjoin(RepositoryMember, and_(
+            RepositoryMember.repository_id == Repository.id,
+            RepositoryMember.user_id == user_id,
+            RepositoryMember.synced_at >= cutoff
+        )).filter(
+            Repository.full_name == repo_full_name,
+            or_(Repository.private.is_(False), RepositoryMember.id.isnot(None))
+        ).first() is not None
+    
+    @staticmethod
+    def refresh_memberships(db: Session, user: User, github_repos: List[GitHubRepository], repos: List[Repository]):
+        """Record the user's access to a page of upserted repositories; the caller commits"""
+        now = datetime.utcnow()
+        existing = {
+            member.repository_id: member for member in db.query(RepositoryMember).filter(
+                RepositoryMember.user_id == user.id,
+                RepositoryMember.repository_id.in_([repo.id for repo in repos])
+            )
+        }
+        for github_repo, repo in zip(github_repos, repos):
+            # Listings cached before permissions were kept lack them
+            default = "admin" if github_repo.owner["login"] == user.username else "pull"
+            permission = permission_level(github_repo.permissions, default)
+            member = existing.get(repo.id)
+            if member is None:
+                member = RepositoryMember(repository_id=repo.id, user_id=user.id, permission=permission, updated_at=now)
+                db.add(member)
+                existing[repo.id] = member
+            elif member.permission != permission:
+                member.permission = permission
+                member.updated_at = now
+            member.synced_at = now
+    
+    @staticmethod
+    def prune_memberships(db: Session, user: User, synced_before: datetime, owner: Optional[str] = None) -> int:
+        """Drop the memberships a complete sync started at `synced_before` did not see
+        
+        With `owner`, only memberships of that owner's repositories are considered.
+        """
+        query = db.query(RepositoryMember).filter(
+            RepositoryMember.user_id == user.id,
+            or_(RepositoryMember.synced_at < synced_before, RepositoryMember.synced_at.is_(None))
+        )
+        if owner is not None:
+            query = query.filter(RepositoryMember.repository_id.in_(
+                db.query(Repository.id).filter(Repository.owner_username == owner)
+            ))
+        removed = query.delete(synchronize_session=False)
+        db.commit()
+        return removed
     
     @staticmethod
     def get_repository_by_github_id(db: Session, github_id: int) -> Optional[Repository]:
         """Get repository by GitHub ID"""
         return db.query(Repository).filter(Repository.github_id == github_id).first()
     
+    @staticmethod
+    def get_pull_requests_synced_at(db: Session, full_name: str) -> Optional[datetime]:
+        """When the last complete sync of a repository's pull requests started"""
+        return db.query(Repository.pull_requests_synced_at).filter(Repository.full_name == full_name).scalar()
+    
+    @staticmethod
+    def set_pull_requests_synced_at(db: Session, full_name: str, synced_at: datetime):
+        """Record a complete pull request sync without counting it as a change to the repository"""
+        db.query(Repository).filter(Repository.full_name == full_name).update(
+            {Repository.pull_requests_synced_at: synced_at, Repository.synced_at: Repository.synced_at},
+            synchronize_session=False,
+        )
+        db.commit()
+    
     @staticmethod
     def create_repository(db: Session, repo_data: RepositoryCreate) -> Repository:
         """Create new repository"""
@@ -108,39 +313,105 @@ class RepositoryService:
     @staticmethod
     async def sync_user_repositories(db: Session, user: User) -> List[Repository]:
         """Sync user's repositories from GitHub"""
+        synced_repos = []
+        async for page in RepositoryService.iter_sync_user_repositories(db, user):
+            synced_repos.extend(page)
+        return synced_repos
+    
+    @staticmethod
+    async def iter_sync_user_repositories(
+        db: Session, user: User, columns=None
+    ) -> AsyncIterator[List[Repository]]:
+        """Sync user's repositories page by page, yielding each page once it is upserted
+        
+        With `columns`, pages are `to_row` dicts taken before the commit expires the rows.
+        """
         github_client = GitHubClient(user.github_access_token)
-        github_repos = await github_client.get_user_repositories()
+        started = datetime.utcnow()
+        page = 1
+        while True:
+            github_repos = await github_client.get_user_repositories(page=page, per_page=SYNC_PAGE_SIZE)
+            yield RepositoryService.upsert_page_from_github(db, github_repos, user, columns)
+            if len(github_repos) < SYNC_PAGE_SIZE:
+                break
+            page += 1
+        # The listing covers every repository the user can access, so anything unseen was lost
+        RepositoryService.prune_memberships(db, user, started)
+    
+    @staticmethod
+    def repository_data(github_repo: GitHubRepository) -> dict:
+        """Column values of the local copy of a GitHub repository"""
+        return {
+            "github_id": github_repo.id,
+            "name": github_repo.name,
+            "full_name": github_repo.full_name,
+            "description": github_repo.description,
+            "html_url": github_repo.html_url,
+            "language": github_repo.language,
+            "stargazers_count": github_repo.stargazers_count,
+            "forks_count": github_repo.forks_count,
+            "private": github_repo.private,
+            "owner_username": github_repo.owner["login"],
+            "owner_avatar_url": github_repo.owner.get("avatar_url"),
+            "updated_at": datetime.fromisoformat(github_repo.updated_at.replace('Z', '+00:00')) if github_repo.updated_at else None
+        }
+    
+    @staticmethod
+    def upsert_from_github(db: Session, github_repo: GitHubRepository) -> Repository:
+        """Create or update the local copy of a GitHub repository"""
+        repo = RepositoryService.get_repository_by_github_id(db, github_repo.id)
+        before = SummaryService.repository_snapshot(repo)
+        repo_data = RepositoryService.repository_data(github_repo)
         
-        synced_repos = []
+        if repo:
+            repo = RepositoryService.update_repository(db, repo, repo_data)
+        else:
+            repo = RepositoryService.create_repository(db, RepositoryCreate(**repo_data))
         
-        for github_repo in github_repos:
-            repo = RepositoryService.get_repository_by_github_id(db, github_repo.id)
-            
-            repo_data = {
-                "github_id": github_repo.id,
-                "name": github_repo.name,
-                "full_name": github_repo.full_name,
-                "description": github_repo.description,
-                "html_url": github_repo.html_url,
-                "language": github_repo.language,
-                "stargazers_count": github_repo.stargazers_count,
-                "forks_count": github_repo.forks_count,
-                "private": github_repo.private,
-                "owner_username": github_repo.owner["login"],
-                "owner_avatar_url": github_repo.owner.get("avatar_url"),
-                "updated_at": datetime.fromisoformat(github_repo.updated_at.replace('Z', '+00:00')) if github_repo.updated_at else None
-            }
-            
-            if repo:
-                repo = RepositoryService.update_repository(db, repo, repo_data)
-            else:
-                repo = RepositoryService.create_repository(db, RepositoryCreate(**repo_data))
-            
-            synced_repos.append(repo)
+        SummaryService.apply_repository_change(db, before, repo)
+        return repo
+    
+    @staticmethod
+    def upsert_page_from_github(
+        db: Session, github_repos: List[GitHubRepository], user: Optional[User] = None, columns=None
+    ) -> List[Repository]:
+        """upsert_from_github for a whole page: one lookup query and one commit
         
-        return synced_repos
+        Repository rows are shared by everyone who can see them; with `user`, that
+        user's memberships are refreshed too. Changes are folded into the owners'
+        summaries once per page. With `columns`, `to_row` dicts are returned instead of the expired objects.
+        """
+        if not github_repos:
+            return []
+        existing = {
+            repo.github_id: repo for repo in db.query(Repository).filter(
+                Repository.github_id.in_([github_repo.id for github_repo in github_repos])
+            )
+        }
+        repos, changes = [], []
+        for github_repo in github_repos:
+            repo_data = RepositoryService.repository_data(github_repo)
+            repo = existing.get(github_repo.id)
+            if repo is None:
+                repo = Repository(**repo_data)
+                db.add(repo)
+                changes.append((None, SummaryService.repository_snapshot(repo)))
+            elif has_changes(repo, repo_data):
+                before = SummaryService.repository_snapshot(repo)
+                for field, value in repo_data.items():
+                    setattr(repo, field, value)
+                changes.append((before, SummaryService.repository_snapshot(repo)))
+            repos.append(repo)
+        db.flush()
+        if user is not None:
+            RepositoryService.refresh_memberships(db, user, github_repos, repos)
+        rows = [to_row(repo, columns) for repo in repos] if columns is not None else repos
+        db.commit()
+        SummaryService.apply_repository_changes(db, changes)
+        return rows
 
 
+@trace_methods
 class PullRequestService:
     @staticmethod
     def get_pull_requests_by_user(db: Session, user_id: int, state: str = "open") -> List[PullRequest]:
@@ -151,10 +422,75 @@ class PullRequestService:
         
         return db.query(PullRequest).filter(
             and_(
-                PullRequest.author_username == user.username,
+                visible_pull_requests(PullRequest, user.id, user.username),
+                PullRequest.state == state
+            )
+        ).order_by(PullRequest.updated_at.desc()).all()
+    
+    @staticmethod
+    def get_pull_request_rows_by_user(
+        db: Session, user_id: int, state: str = "open", include_archived: bool = False
+    ) -> List[dict]:
+        """Get pull requests for a user as plain dicts, skipping ORM hydration
+        
+        Those the user authored and those in repositories they are a member of.
+        With include_archived, closed PRs moved out by the retention job are included.
+        """
+        username = db.query(User.username).filter(User.id == user_id).scalar_subquery()
+        rows = db.query(*PULL_REQUEST_LIST_COLUMNS).filter(
+            and_(
+                visible_pull_requests(PullRequest, user_id, username),
                 PullRequest.state == state
             )
         ).order_by(PullRequest.updated_at.desc()).all()
+        rows = [row._asdict() for row in rows]
+        if include_archived and state != "open":
+            archived = db.query(*ARCHIVED_PULL_REQUEST_LIST_COLUMNS).filter(
+                and_(visible_pull_requests(ArchivedPullRequest, user_id, username), ArchivedPullRequest.state == state)
+            ).order_by(ArchivedPullRequest.updated_at.desc()).all()
+            # Archived PRs are older than every hot closed PR, so they go last
+            rows += [row._asdict() for row in archived]
+        return rows
+    
+    @staticmethod
+    def get_pull_request_list_fingerprint(
+        db: Session, user_id: int, state: str = "open", include_archived: bool = False
+    ) -> tuple:
+        """Cheap (count, last sync) summary of a user's pull request list, for ETags"""
+        username = db.query(User.username).filter(User.id == user_id).scalar_subquery()
+        fingerprint = tuple(db.query(func.count(PullRequest.id), func.max(PullRequest.synced_at)).filter(
+            and_(
+                visible_pull_requests(PullRequest, user_id, username),
+                PullRequest.state == state
+            )
+        ).one())
+        if include_archived and state != "open":
+            fingerprint += tuple(db.query(
+                func.count(ArchivedPullRequest.id), func.max(ArchivedPullRequest.archived_at)
+            ).filter(
+                and_(visible_pull_requests(ArchivedPullRequest, user_id, username), ArchivedPullRequest.state == state)
+            ).one())
+        return fingerprint
+    
+    @staticmethod
+    def search_pull_requests(
+        db: Session,
+        username: str,
+        query: str,
+        state: Optional[str] = None,
+        repo_full_name: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 30
+    ) -> Tuple[List[dict], int]:
+        """Full-text search over a user's synced pull requests and their comments, best match first"""
+        ranked, total = search.search_pull_requests(db, username, query, state, repo_full_name, page, per_page)
+        if not ranked:
+            return [], total
+        rows = {
+            row.id: row._asdict()
+            for row in db.query(*PULL_REQUEST_LIST_COLUMNS).filter(PullRequest.id.in_([pr_id for pr_id, _ in ranked]))
+        }
+        return [{**rows[pr_id], "score": round(score, 4)} for pr_id, score in ranked if pr_id in rows], total
     
     @staticmethod
     def get_pull_request_by_github_id(db: Session, github_id: int) -> Optional[PullRequest]:
@@ -173,46 +509,179 @@ class PullRequestService:
     @staticmethod
     async def sync_user_pull_requests(db: Session, user: User) -> List[PullRequest]:
         """Sync user's pull requests from GitHub"""
+        synced_prs = []
+        async for page in PullRequestService.iter_sync_user_pull_requests(db, user):
+            synced_prs.extend(page)
+        return synced_prs
+    
+    @staticmethod
+    async def iter_sync_user_pull_requests(
+        db: Session, user: User, columns=None
+    ) -> AsyncIterator[List[PullRequest]]:
+        """Sync user's pull requests page by page, yielding each page once it is upserted
+        
+        With `columns`, pages are `to_row` dicts taken before the commit expires the rows.
+        """
         github_client = GitHubClient(user.github_access_token)
-        github_prs = await github_client.get_user_pull_requests()
+        page = 1
+        while True:
+            github_prs = await github_client.get_user_pull_requests(page=page, per_page=SYNC_PAGE_SIZE)
+            yield PullRequestService.upsert_page_from_github(db, github_prs, columns)
+            if len(github_prs) < SYNC_PAGE_SIZE:
+                break
+            page += 1
+    
+    @staticmethod
+    def pull_request_data(github_pr: GitHubPullRequest) -> dict:
+        """Column values of the local copy of a GitHub pull request"""
+        return {
+            "github_id": github_pr.id,
+            "number": github_pr.number,
+            "title": github_pr.title,
+            "body": github_pr.body,
+            "state": github_pr.state,
+            "html_url": github_pr.html_url,
+            "repo_name": github_pr.base["repo"]["name"],
+            "repo_full_name": github_pr.base["repo"]["full_name"],
+            "author_username": github_pr.user["login"],
+            "author_avatar_url": github_pr.user.get("avatar_url"),
+            "head_ref": github_pr.head["ref"],
+            "created_at": datetime.fromisoformat(github_pr.created_at.replace('Z', '+00:00')) if github_pr.created_at else None,
+            "updated_at": datetime.fromisoformat(github_pr.updated_at.replace('Z', '+00:00')) if github_pr.updated_at else None
+        }
+    
+    @staticmethod
+    def get_archived_versions(db: Session, github_ids: List[int]) -> Dict[int, Tuple[Optional[datetime], str]]:
+        """(updated_at, state) of the archived copies of pull requests, by GitHub ID"""
+        return {
+            github_id: (updated_at, state)
+            for github_id, updated_at, state in db.query(
+                ArchivedPullRequest.github_id, ArchivedPullRequest.updated_at, ArchivedPullRequest.state
+            ).filter(ArchivedPullRequest.github_id.in_(github_ids))
+        }
+    
+    @staticmethod
+    def unchanged_since_archived(archived: Dict[int, Tuple[Optional[datetime], str]], pr_data: dict) -> bool:
+        """Whether a PR missing from the hot table is archived and has not been updated since"""
+        if pr_data["github_id"] not in archived:
+            return False
+        archived_at, updated_at = archived[pr_data["github_id"]][0], pr_data["updated_at"]
+        if archived_at is None or updated_at is None:
+            return archived_at is updated_at
+        return archived_at.replace(tzinfo=None) == updated_at.replace(tzinfo=None)
+    
+    @staticmethod
+    def upsert_from_github(db: Session, github_pr: GitHubPullRequest) -> Optional[PullRequest]:
+        """Create or update the local copy of a GitHub pull request
         
-        synced_prs = []
+        Returns None for a PR that stays archived because it has not changed since.
+        """
+        pr = PullRequestService.get_pull_request_by_github_id(db, github_pr.id)
+        pr_data = PullRequestService.pull_request_data(github_pr)
+        archived = {} if pr else PullRequestService.get_archived_versions(db, [github_pr.id])
+        if PullRequestService.unchanged_since_archived(archived, pr_data):
+            return None
+        # A PR coming back from the archive is still counted in the summary under its archived state
+        before_state = pr.state if pr else archived.get(github_pr.id, (None, None))[1]
         
+        if pr:
+            changed = has_changes(pr, pr_data)
+            for field, value in pr_data.items():
+                if hasattr(pr, field):
+                    setattr(pr, field, value)
+            pr.synced_at = datetime.utcnow()
+            if changed:
+                search.index_pull_request(db, pr)
+            db.commit()
+            db.refresh(pr)
+            if changed:
+                PullRequestService.publish_change(pr, "pull_request.updated")
+        else:
+            pr = PullRequestService.create_pull_request(db, PullRequestCreate(**pr_data))
+            search.index_pull_request(db, pr)
+            # A PR synced again after being archived (e.g. reopened) lives in the hot table only
+            db.query(ArchivedPullRequest).filter(ArchivedPullRequest.github_id == pr.github_id).delete()
+            db.commit()
+            PullRequestService.publish_change(pr, "pull_request.created")
+        
+        SummaryService.apply_pull_request_change(db, before_state, pr)
+        return pr
+    
+    @staticmethod
+    def upsert_page_from_github(
+        db: Session, github_prs: List[GitHubPullRequest], columns=None
+    ) -> List[PullRequest]:
+        """upsert_from_github for a whole page: one lookup query and one commit
+        
+        PRs that stay archived because they have not changed since are left out.
+        With `columns`, `to_row` dicts are returned instead of the expired objects.
+        """
+        if not github_prs:
+            return []
+        github_ids = [github_pr.id for github_pr in github_prs]
+        existing = {
+            pr.github_id: pr for pr in db.query(PullRequest).filter(PullRequest.github_id.in_(github_ids))
+        }
+        archived = PullRequestService.get_archived_versions(
+            db, [github_id for github_id in github_ids if github_id not in existing]
+        )
+        now = datetime.utcnow()
+        prs, changes, created, updated = [], [], [], []
         for github_pr in github_prs:
-            pr = PullRequestService.get_pull_request_by_github_id(db, github_pr.id)
-            
-            pr_data = {
-                "github_id": github_pr.id,
-                "number": github_pr.number,
-                "title": github_pr.title,
-                "body": github_pr.body,
-                "state": github_pr.state,
-                "html_url": github_pr.html_url,
-                "repo_name": github_pr.base["repo"]["name"],
-                "repo_full_name": github_pr.base["repo"]["full_name"],
-                "author_username": github_pr.user["login"],
-                "author_avatar_url": github_pr.user.get("avatar_url"),
-                "head_ref": github_pr.head["ref"],
-                "created_at": datetime.fromisoformat(github_pr.created_at.replace('Z', '+00:00')) if github_pr.created_at else None,
-                "updated_at": datetime.fromisoformat(github_pr.updated_at.replace('Z', '+00:00')) if github_pr.updated_at else None
-            }
-            
-            if pr:
-                for field, value in pr_data.items():
-                    if hasattr(pr, field):
-                        setattr(pr, field, value)
-                pr.synced_at = datetime.utcnow()
-                db.commit()
-                db.refresh(pr)
+            pr_data = PullRequestService.pull_request_data(github_pr)
+            pr = existing.get(github_pr.id)
+            if pr is None and PullRequestService.unchanged_since_archived(archived, pr_data):
+                continue
+            if pr is None:
+                pr = PullRequest(**pr_data)
+                db.add(pr)
+                # Still counted in the summary under its archived state, if it comes back from the archive
+                changes.append((pr.author_username, archived.get(github_pr.id, (None, None))[1], pr.state))
+                created.append(pr)
             else:
-                pr = PullRequestService.create_pull_request(db, PullRequestCreate(**pr_data))
-            
-            synced_prs.append(pr)
+                changes.append((pr_data["author_username"], pr.state, pr_data["state"]))
+                if has_changes(pr, pr_data):
+                    for field, value in pr_data.items():
+                        setattr(pr, field, value)
+                    updated.append(pr)
+                pr.synced_at = now
+            prs.append(pr)
         
-        return synced_prs
+        db.flush()
+        for pr in created + updated:
+            search.index_pull_request(db, pr)
+        if created:
+            db.query(ArchivedPullRequest).filter(
+                ArchivedPullRequest.github_id.in_([pr.github_id for pr in created])
+            ).delete(synchronize_session=False)
+        # Built before the commit expires the rows, so nothing is reloaded to publish them
+        notifications = [
+            (audience, event_type, to_row(pr, PULL_REQUEST_LIST_COLUMNS))
+            for event_type, group in (("pull_request.created", created), ("pull_request.updated", updated))
+            for pr in group
+            for audience in [{pr.author_username, pr.repo_full_name.split("/")[0]}]
+            if bus.has_subscribers(audience)
+        ]
+        rows = [to_row(pr, columns) for pr in prs] if columns is not None else prs
+        db.commit()
+        for audience, event_type, row in notifications:
+            bus.publish(audience, event_type, row)
+        SummaryService.apply_pull_request_changes(db, changes)
+        return rows
+    
+    @staticmethod
+    def publish_change(pr: PullRequest, event_type: str):
+        """Notify the PR author and repository owner of a pull request change"""
+        audience = {pr.author_username, pr.repo_full_name.split("/")[0]}
+        if bus.has_subscribers(audience):
+            bus.publish(audience, event_type, to_row(pr, PULL_REQUEST_LIST_COLUMNS))
 
 
+@trace_methods
 class CommentService:
+    # (repo_full_name, pr_number) pairs with a background refresh in flight
+    _refreshing: set = set()
+    
     @staticmethod
     def get_comments_by_pull_request(db: Session, pr_github_id: int) -> List[Comment]:
         """Get comments for a pull request"""
@@ -220,6 +689,42 @@ class CommentService:
             Comment.pull_request_id == pr_github_id
         ).order_by(Comment.created_at.desc()).all()
     
+    @staticmethod
+    def get_comment_rows(
+        db: Session, repo_full_name: str, pr_number: int, page: int = 1, per_page: int = 30, archived: bool = False
+    ) -> Tuple[List[dict], int]:
+        """One page of a pull request's stored (or archived) comments, newest first, plus the total count"""
+        model, columns = (ArchivedComment, ARCHIVED_COMMENT_LIST_COLUMNS) if archived else (Comment, COMMENT_LIST_COLUMNS)
+        query = db.query(*columns).filter(
+            and_(model.repo_full_name == repo_full_name, model.pull_request_id == pr_number)
+        )
+        total = query.count()
+        rows = query.order_by(model.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        return [row._asdict() for row in rows], total
+    
+    @staticmethod
+    def is_archived(db: Session, repo_full_name: str, pr_number: int) -> bool:
+        """Whether the retention job moved this pull request to the archive"""
+        return db.query(ArchivedPullRequest.id).filter(
+            and_(ArchivedPullRequest.repo_full_name == repo_full_name, ArchivedPullRequest.number == pr_number)
+        ).first() is not None
+    
+    @staticmethod
+    def get_sync_state(db: Session, repo_full_name: str, pr_number: int) -> Optional[CommentSyncState]:
+        return db.query(CommentSyncState).filter(
+            and_(
+                CommentSyncState.repo_full_name == repo_full_name,
+                CommentSyncState.pull_request_number == pr_number
+            )
+        ).first()
+    
+    @staticmethod
+    def is_fresh(sync_state: Optional[CommentSyncState]) -> bool:
+        if sync_state is None or sync_state.synced_at is None:
+            return False
+        age = datetime.utcnow() - sync_state.synced_at.replace(tzinfo=None)
+        return age < timedelta(seconds=settings.comments_fresh_seconds)
+    
     @staticmethod
     def create_comment(db: Session, comment_data: CommentCreate) -> Comment:
         """Create new comment"""
@@ -229,6 +734,64 @@ class CommentService:
         db.refresh(db_comment)
         return db_comment
     
+    @staticmethod
+    def upsert_from_github(
+        db: Session, github_comment: GitHubComment, repo_full_name: str, pr_number: int, usernames: List[str]
+    ) -> Comment:
+        """Create or update the local copy of a GitHub comment"""
+        existing_comment = db.query(Comment).filter(
+            Comment.github_id == github_comment.id
+        ).first()
+        
+        comment_data = {
+            "github_id": github_comment.id,
+            "pull_request_id": pr_number,
+            "repo_full_name": repo_full_name,
+            "body": github_comment.body,
+            "author_username": github_comment.user["login"],
+            "author_avatar_url": github_comment.user.get("avatar_url"),
+            "html_url": github_comment.html_url,
+            "created_at": datetime.fromisoformat(github_comment.created_at.replace('Z', '+00:00')) if github_comment.created_at else None,
+            "updated_at": datetime.fromisoformat(github_comment.updated_at.replace('Z', '+00:00')) if github_comment.updated_at else None
+        }
+        
+        if existing_comment:
+            changed = has_changes(existing_comment, comment_data)
+            for field, value in comment_data.items():
+                if hasattr(existing_comment, field):
+                    setattr(existing_comment, field, value)
+            existing_comment.synced_at = datetime.utcnow()
+            if changed:
+                search.index_comment(db, existing_comment)
+            db.commit()
+            db.refresh(existing_comment)
+            if changed:
+                CommentService.publish_change(existing_comment, repo_full_name, usernames, "comment.updated")
+            return existing_comment
+        
+        new_comment = CommentService.create_comment(db, CommentCreate(**comment_data))
+        search.index_comment(db, new_comment)
+        db.query(ArchivedComment).filter(ArchivedComment.github_id == new_comment.github_id).delete()
+        db.commit()
+        CommentService.publish_change(new_comment, repo_full_name, usernames, "comment.created")
+        return new_comment
+    
+    @staticmethod
+    def record_created(
+        db: Session, github_comment: GitHubComment, repo_full_name: str, pr_number: int, user: User
+    ) -> Optional[Comment]:
+        """Store a comment the user just posted, so reading it back needs no GitHub call
+        
+        GitHub already has the comment, so a failure here is logged rather than
+        raised; the next sync picks the comment up.
+        """
+        try:
+            return CommentService.upsert_from_github(db, github_comment, repo_full_name, pr_number, [user.username])
+        except Exception as e:
+            db.rollback()
+            print(f"Storing new comment {github_comment.id} on {repo_full_name}#{pr_number} failed: {e}")
+            return None
+    
     @staticmethod
     async def sync_pull_request_comments(
         db: Session, 
@@ -236,40 +799,438 @@ class CommentService:
         repo_full_name: str, 
         pr_number: int
     ) -> List[Comment]:
-        """Sync comments for a pull request"""
+        """Sync comments for a pull request
+        
+        Fetches only comments updated since the last refresh, except every
+        COMMENTS_FULL_REFRESH_SECONDS when all pages are fetched and comments
+        deleted on GitHub are removed.
+        """
         github_client = GitHubClient(user.github_access_token)
-        github_comments = await github_client.get_pull_request_comments(repo_full_name, pr_number)
+        sync_state = CommentService.get_sync_state(db, repo_full_name, pr_number)
+        started = datetime.utcnow()
+        full = (
+            sync_state is None or sync_state.full_synced_at is None
+            or started - sync_state.full_synced_at.replace(tzinfo=None)
+            > timedelta(seconds=settings.comments_full_refresh_seconds)
+        )
+        # Overlap the previous refresh a little to allow for clock skew
+        since = None if full else (sync_state.synced_at.replace(tzinfo=None) - timedelta(seconds=60)).strftime("%Y-%m-%dT%H:%M:%SZ")
         
         synced_comments = []
+        async for page in github_client.iter_pull_request_comments(repo_full_name, pr_number, since=since):
+            synced_comments.extend(
+                CommentService.upsert_from_github(db, github_comment, repo_full_name, pr_number, [user.username])
+                for github_comment in page
+            )
         
-        for github_comment in github_comments:
-            # Check if comment already exists
-            existing_comment = db.query(Comment).filter(
-                Comment.github_id == github_comment.id
-            ).first()
-            
-            comment_data = {
-                "github_id": github_comment.id,
-                "pull_request_id": pr_number,  # Using PR number as identifier
-                "body": github_comment.body,
-                "author_username": github_comment.user["login"],
-                "author_avatar_url": github_comment.user.get("avatar_url"),
-                "html_url": github_comment.html_url,
-                "created_at": datetime.fromisoformat(github_comment.created_at.replace('Z', '+00:00')) if github_comment.created_at else None,
-                "updated_at": datetime.fromisoformat(github_comment.updated_at.replace('Z', '+00:00')) if github_comment.updated_at else None
-            }
-            
-            if existing_comment:
-                for field, value in comment_data.items():
-                    if hasattr(existing_comment, field):
-                        setattr(existing_comment, field, value)
-                existing_comment.synced_at = datetime.utcnow()
-                db.commit()
-                db.refresh(existing_comment)
-                synced_comments.append(existing_comment)
+        if full:
+            deleted = db.query(Comment.id).filter(
+                and_(
+                    Comment.repo_full_name == repo_full_name,
+                    Comment.pull_request_id == pr_number,
+                    Comment.github_id.notin_([comment.github_id for comment in synced_comments])
+                )
+            )
+            deleted_ids = [row.id for row in deleted]
+            if deleted_ids:
+                search.remove_comments(db, deleted_ids)
+                db.query(Comment).filter(Comment.id.in_(deleted_ids)).delete(synchronize_session=False)
+        if sync_state is None:
+            sync_state = CommentSyncState(repo_full_name=repo_full_name, pull_request_number=pr_number)
+            db.add(sync_state)
+        sync_state.synced_at = started
+        if full:
+            sync_state.full_synced_at = started
+        db.commit()
+        return synced_comments
+    
+    @staticmethod
+    async def refresh_in_background(user_id: int, repo_full_name: str, pr_number: int):
+        """Refresh a pull request's comments with a session of its own; one refresh per PR at a time"""
+        key = (repo_full_name, pr_number)
+        if key in CommentService._refreshing:
+            return
+        CommentService._refreshing.add(key)
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+            if user is not None:
+                await CommentService.sync_pull_request_comments(db, user, repo_full_name, pr_number)
+        except Exception as e:
+            print(f"Background comment refresh failed for {repo_full_name}#{pr_number}: {e}")
+        finally:
+            db.close()
+            CommentService._refreshing.discard(key)
+    
+    @staticmethod
+    def publish_change(comment: Comment, repo_full_name: str, usernames: List[str], event_type: str):
+        """Notify users (and the repository owner) of a comment change"""
+        audience = set(usernames) | {repo_full_name.split("/")[0]}
+        if bus.has_subscribers(audience):
+            bus.publish(audience, event_type, {
+                "repo_full_name": repo_full_name,
+                **{column.name: getattr(comment, column.name) for column in Comment.__table__.columns},
+            })
+
+
+
+@trace_methods
+class SummaryService:
+    # Number of repositories kept in UserSummary.recent_repositories
+    RECENT_REPOSITORIES = 5
+    
+    @staticmethod
+    def get_summary(db: Session, username: str) -> UserSummary:
+        """Get the dashboard summary of a user, building it from base tables the first time"""
+        summary = db.query(UserSummary).filter(UserSummary.username == username).first()
+        if summary is None:
+            summary = SummaryService.recompute_summary(db, username)
+        return summary
+    
+    @staticmethod
+    def summary_to_dict(summary: UserSummary) -> dict:
+        return {
+            "username": summary.username,
+            "repository_count": summary.repository_count or 0,
+            "total_stars": summary.total_stars or 0,
+            "total_forks": summary.total_forks or 0,
+            "languages": json.loads(summary.languages or "{}"),
+            "pull_requests_by_state": json.loads(summary.pull_requests_by_state or "{}"),
+            "recent_repositories": json.loads(summary.recent_repositories or "[]"),
+            "updated_at": summary.updated_at,
+        }
+    
+    @staticmethod
+    def compute_summary(db: Session, username: str) -> dict:
+        """Aggregate a user's summary from the repositories and pull_requests tables"""
+        repo_count, stars, forks = db.query(
+            func.count(Repository.id),
+            func.coalesce(func.sum(Repository.stargazers_count), 0),
+            func.coalesce(func.sum(Repository.forks_count), 0)
+        ).filter(Repository.owner_username == username).one()
+        languages = dict(
+            db.query(Repository.language, func.count(Repository.id))
+            .filter(Repository.owner_username == username, Repository.language.isnot(None))
+            .group_by(Repository.language).all()
+        )
+        states = dict(
+            db.query(PullRequest.state, func.count(PullRequest.id))
+            .filter(PullRequest.author_username == username)
+            .group_by(PullRequest.state).all()
+        )
+        # Archived pull requests still count towards the summary
+        for state, count in (
+            db.query(ArchivedPullRequest.state, func.count(ArchivedPullRequest.id))
+            .filter(ArchivedPullRequest.author_username == username)
+            .group_by(ArchivedPullRequest.state).all()
+        ):
+            states[state] = states.get(state, 0) + count
+        recent = db.query(Repository).filter(
+            Repository.owner_username == username
+        ).order_by(Repository.updated_at.desc()).limit(SummaryService.RECENT_REPOSITORIES).all()
+        return {
+            "username": username,
+            "repository_count": repo_count,
+            "total_stars": stars,
+            "total_forks": forks,
+            "languages": languages,
+            "pull_requests_by_state": states,
+            "recent_repositories": [SummaryService._recent_entry(repo) for repo in recent],
+        }
+    
+    @staticmethod
+    def recompute_summary(db: Session, username: str) -> UserSummary:
+        """Rebuild a user's summary row from base tables"""
+        data = SummaryService.compute_summary(db, username)
+        summary = db.query(UserSummary).filter(UserSummary.username == username).first()
+        if summary is None:
+            summary = UserSummary(username=username)
+            db.add(summary)
+        summary.repository_count = data["repository_count"]
+        summary.total_stars = data["total_stars"]
+        summary.total_forks = data["total_forks"]
+        summary.languages = json.dumps(data["languages"])
+        summary.pull_requests_by_state = json.dumps(data["pull_requests_by_state"])
+        summary.recent_repositories = json.dumps(data["recent_repositories"])
+        db.commit()
+        db.refresh(summary)
+        return summary
+    
+    @staticmethod
+    def verify_summary(db: Session, username: str) -> List[str]:
+        """Compare the stored summary with one recomputed from base tables, returning mismatched fields"""
+        stored = SummaryService.summary_to_dict(SummaryService.get_summary(db, username))
+        expected = json.loads(json.dumps(SummaryService.compute_summary(db, username)))
+        return [field for field, value in expected.items() if stored[field] != value]
+    
+    @staticmethod
+    def _recent_entry(repo: Repository) -> dict:
+        return {
+            "name": repo.name,
+            "full_name": repo.full_name,
+            "language": repo.language,
+            "stargazers_count": repo.stargazers_count or 0,
+            "updated_at": repo.updated_at.replace(tzinfo=None).isoformat() if repo.updated_at else None,
+        }
+    
+    @staticmethod
+    def repository_snapshot(repo: Optional[Repository]) -> Optional[dict]:
+        """Fields of a repository the summary depends on, taken before an update"""
+        if repo is None:
+            return None
+        return {
+            "owner_username": repo.owner_username,
+            "stargazers_count": repo.stargazers_count or 0,
+            "forks_count": repo.forks_count or 0,
+            "language": repo.language,
+            "entry": SummaryService._recent_entry(repo),
+        }
+    
+    @staticmethod
+    def apply_repository_change(db: Session, before: Optional[dict], repo: Repository):
+        """Fold one repository upsert into its owner's summary"""
+        SummaryService.apply_repository_changes(db, [(before, SummaryService.repository_snapshot(repo))])
+    
+    @staticmethod
+    def apply_repository_changes(db: Session, changes: List[Tuple[Optional[dict], dict]]):
+        """Fold a page of repository upserts, as (snapshot before, snapshot after), into the summaries"""
+        deltas, rebuild = {}, set()
+        for before, after in changes:
+            if before == after:
+                continue
+            if before is not None and before["owner_username"] != after["owner_username"]:
+                # Ownership moved; both summaries are rebuilt
+                rebuild |= {before["owner_username"], after["owner_username"]}
+                continue
+            delta = deltas.setdefault(
+                after["owner_username"],
+                {"repository_count": 0, "total_stars": 0, "total_forks": 0, "languages": {}, "recent": []}
+            )
+            if before is None:
+                delta["repository_count"] += 1
             else:
-                new_comment = CommentService.create_comment(db, CommentCreate(**comment_data))
-                synced_comments.append(new_comment)
+                delta["total_stars"] -= before["stargazers_count"]
+                delta["total_forks"] -= before["forks_count"]
+                if before["language"]:
+                    delta["languages"][before["language"]] = delta["languages"].get(before["language"], 0) - 1
+            delta["total_stars"] += after["stargazers_count"]
+            delta["total_forks"] += after["forks_count"]
+            if after["language"]:
+                delta["languages"][after["language"]] = delta["languages"].get(after["language"], 0) + 1
+            delta["recent"].append(after["entry"])
         
-        return synced_comments
+        for username, delta in deltas.items():
+            if username in rebuild:
+                continue
+            summary = db.query(UserSummary).filter(UserSummary.username == username).first()
+            if summary is None:
+                # First sync for this owner: build from base tables, which already hold the rows
+                rebuild.add(username)
+                continue
+            summary.repository_count = (summary.repository_count or 0) + delta["repository_count"]
+            summary.total_stars = (summary.total_stars or 0) + delta["total_stars"]
+            summary.total_forks = (summary.total_forks or 0) + delta["total_forks"]
+            languages = json.loads(summary.languages or "{}")
+            for language, count in delta["languages"].items():
+                languages[language] = languages.get(language, 0) + count
+            summary.languages = json.dumps({k: v for k, v in languages.items() if v > 0})
+            
+            changed = {entry["full_name"] for entry in delta["recent"]}
+            recent = [r for r in json.loads(summary.recent_repositories or "[]") if r["full_name"] not in changed]
+            recent += delta["recent"]
+            recent.sort(key=lambda r: r["updated_at"] or "", reverse=True)
+            summary.recent_repositories = json.dumps(recent[:SummaryService.RECENT_REPOSITORIES])
+        db.commit()
+        for username in rebuild:
+            SummaryService.recompute_summary(db, username)
+    
+    @staticmethod
+    def apply_pull_request_changes(db: Session, changes: List[Tuple[str, Optional[str], str]]):
+        """Fold a page of pull request upserts, as (author, state before, state after), into the summaries"""
+        deltas = {}
+        for author_username, before_state, state in changes:
+            if before_state == state:
+                continue
+            delta = deltas.setdefault(author_username, {})
+            if before_state is not None:
+                delta[before_state] = delta.get(before_state, 0) - 1
+            delta[state] = delta.get(state, 0) + 1
+        for username, delta in deltas.items():
+            summary = db.query(UserSummary).filter(UserSummary.username == username).first()
+            if summary is None:
+                SummaryService.recompute_summary(db, username)
+                continue
+            states = json.loads(summary.pull_requests_by_state or "{}")
+            for state, count in delta.items():
+                states[state] = states.get(state, 0) + count
+            summary.pull_requests_by_state = json.dumps({k: v for k, v in states.items() if v > 0})
+        db.commit()
+    
+    @staticmethod
+    def apply_pull_request_change(db: Session, before_state: Optional[str], pr: PullRequest):
+        """Fold one pull request upsert into its author's summary"""
+        if before_state == pr.state:
+            return
+        summary = db.query(UserSummary).filter(UserSummary.username == pr.author_username).first()
+        if summary is None:
+            SummaryService.recompute_summary(db, pr.author_username)
+            return
+        states = json.loads(summary.pull_requests_by_state or "{}")
+        if before_state is not None:
+            states[before_state] = states.get(before_state, 0) - 1
+        states[pr.state] = states.get(pr.state, 0) + 1
+        summary.pull_requests_by_state = json.dumps({k: v for k, v in states.items() if v > 0})
+        db.commit()
+
 
+@trace_methods
+class DiffService:
+    """Pull request files and diffs, cached by commit SHAs
+    
+    A diff between two fixed commits never changes, so cached listings are only
+    evicted by size or DIFF_CACHE_TTL. Access is still checked per request: the
+    SHAs come from a pull request lookup made with the caller's token.
+    """
+    
+    @staticmethod
+    def cache_key(repo_full_name: str, base_sha: str, head_sha: str, kind: str) -> str:
+        return f"diff:{repo_full_name}:{base_sha}..{head_sha}:{kind}"
+    
+    @staticmethod
+    async def get_shas(github_client: GitHubClient, repo_full_name: str, pr_number: int) -> tuple:
+        """(base SHA, head SHA) of a pull request"""
+        pr = await github_client.get_pull_request(repo_full_name, pr_number)
+        return pr["base"]["sha"], pr["head"]["sha"]
+    
+    @staticmethod
+    def file_summary(github_file: dict) -> dict:
+        """A changed file without its patch, which is served separately"""
+        summary = {key: value for key, value in github_file.items() if key != "patch"}
+        summary["patch_size"] = len(github_file.get("patch") or "")
+        return summary
+    
+    @staticmethod
+    def get_cached_files(repo_full_name: str, base_sha: str, head_sha: str) -> Optional[dict]:
+        """Cached {"files": [...], "patches": {filename: patch} or None} for a commit pair"""
+        return cache.get(DiffService.cache_key(repo_full_name, base_sha, head_sha, "files"))
+    
+    @staticmethod
+    async def iter_files(
+        github_client: GitHubClient, repo_full_name: str, pr_number: int, base_sha: str, head_sha: str,
+        patches: Optional[dict] = None
+    ) -> AsyncIterator[List[dict]]:
+        """Yield file summaries page by page from GitHub, caching the listing once complete
+        
+        Patches are cached with the listing while they total under DIFF_CACHE_MAX_BYTES;
+        past that, it is cached with "patches": None. Every patch is also collected
+        into `patches` when given.
+        """
+        files, cached_patches, size = [], {}, 0
+        async for page in github_client.iter_pull_request_files(repo_full_name, pr_number):
+            summaries = [DiffService.file_summary(github_file) for github_file in page]
+            for github_file in page:
+                patch = github_file.get("patch")
+                if patch is None:
+                    continue
+                if patches is not None:
+                    patches[github_file["filename"]] = patch
+                size += len(patch)
+                if size > settings.diff_cache_max_bytes:
+                    cached_patches = None
+                elif cached_patches is not None:
+                    cached_patches[github_file["filename"]] = patch
+            files.extend(summaries)
+            yield summaries
+        cache.set(
+            DiffService.cache_key(repo_full_name, base_sha, head_sha, "files"),
+            {"files": files, "patches": cached_patches},
+            ttl=settings.diff_cache_ttl
+        )
+    
+    @staticmethod
+    async def get_patch(
+        github_client: GitHubClient, repo_full_name: str, pr_number: int, base_sha: str, head_sha: str, path: str
+    ) -> Optional[str]:
+        """Patch of one changed file, None if it has none
+        
+        Read from the cached listing when it kept its patches, otherwise from GitHub's.
+        """
+        cached = DiffService.get_cached_files(repo_full_name, base_sha, head_sha)
+        if cached is not None and cached["patches"] is not None:
+            return cached["patches"].get(path)
+        patches = {}
+        async for _ in DiffService.iter_files(
+            github_client, repo_full_name, pr_number, base_sha, head_sha, patches=patches
+        ):
+            pass
+        return patches.get(path)
+    
+    @staticmethod
+    def get_cached_diff(repo_full_name: str, base_sha: str, head_sha: str) -> Optional[bytes]:
+        return cache.get(DiffService.cache_key(repo_full_name, base_sha, head_sha, "raw"))
+    
+    @staticmethod
+    async def iter_diff(
+        github_client: GitHubClient, repo_full_name: str, pr_number: int, base_sha: str, head_sha: str
+    ) -> AsyncIterator[bytes]:
+        """Stream the raw diff from GitHub, caching it when it is under DIFF_CACHE_MAX_BYTES"""
+        chunks, size = [], 0
+        async for chunk in github_client.stream_pull_request_diff(repo_full_name, pr_number):
+            size += len(chunk)
+            if size <= settings.diff_cache_max_bytes:
+                chunks.append(chunk)
+            yield chunk
+        if size <= settings.diff_cache_max_bytes:
+            cache.set(
+                DiffService.cache_key(repo_full_name, base_sha, head_sha, "raw"),
+                b"".join(chunks),
+                ttl=settings.diff_cache_ttl
+            )
+
+
+@trace_methods
+class FileService:
+    """Repository files read by line range
+    
+    Ranged reads, and whole reads of files too large for the contents API,
+    go through the blob store: each blob's bytes and line-offset index are
+    kept on disk by SHA, so a range costs two index lookups and one seek.
+    """
+    
+    @staticmethod
+    def count_lines(content: str) -> int:
+        return content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+    
+    @staticmethod
+    async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:
+        yield data
+    
+    @staticmethod
+    async def read_lines(
+        github_client: GitHubClient, repo_full_name: str, file: dict,
+        start_line: Optional[int] = None, end_line: Optional[int] = None
+    ) -> dict:
+        """Lines start_line..end_line (1-based, inclusive) of a file from GitHubClient.get_file
+        
+        start_line defaults to the first line and end_line to the last; at most
+        FILE_MAX_RANGE_LINES lines are returned, and end_line in the result is
+        the last line actually included.
+        """
+        sha = file["sha"]
+        if file["truncated"]:
+            fetch = lambda: github_client.stream_blob(repo_full_name, sha)
+        else:
+            fetch = lambda: FileService._single_chunk(file["content"].encode())
+        async with blob_store.pinned(sha, fetch):
+            total_lines, size = await run_in_threadpool(blob_store.describe, sha)
+            start = start_line or 1
+            end = min(end_line or total_lines, total_lines, start + settings.file_max_range_lines - 1)
+            data = await run_in_threadpool(blob_store.read_lines, sha, start, end) if start <= end else b""
+        content = data.decode("utf-8", errors="replace")
+        return {
+            "content": content,
+            "start_line": start,
+            "end_line": max(end, start - 1),
+            "total_lines": total_lines,
+            "size": size,
+        }
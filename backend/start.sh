@@ -1,24 +1,33 @@
 #!/bin/bash
 # Start script for Render deployment
 
-# Upgrade pip first
-pip install --upgrade pip
+REQUIREMENTS_HASH=$(cat requirements-simple.txt requirements.txt | sha256sum | cut -d' ' -f1)
 
-# Try multiple requirements files in order of preference
-echo "🔧 Installing dependencies..."
-
-if pip install -r requirements-simple.txt; then
-    echo "✅ Installed with requirements-simple.txt"
-elif pip install -r requirements.txt; then
-    echo "✅ Installed with requirements.txt"
+if [ -f .deps-installed ] && [ "$(cat .deps-installed)" = "$REQUIREMENTS_HASH" ]; then
+    echo "✅ Dependencies unchanged, skipping install"
 else
-    echo "❌ Failed to install dependencies"
-    exit 1
+    # Upgrade pip first
+    pip install --upgrade pip
+
+    # Try multiple requirements files in order of preference
+    echo "🔧 Installing dependencies..."
+
+    if pip install -r requirements-simple.txt; then
+        echo "✅ Installed with requirements-simple.txt"
+    elif pip install -r requirements.txt; then
+        echo "✅ Installed with requirements.txt"
+    else
+        echo "❌ Failed to install dependencies"
+        exit 1
+    fi
+    echo "$REQUIREMENTS_HASH" > .deps-installed
 fi
 
-# Create tables if they don't exist
-echo "🗄️ Creating database tables..."
-python -c "from database import create_tables; create_tables(); print('✅ Database tables ready')"
+# Create tables if they don't exist (in fast startup mode the app's startup event does this)
+if [ "$FAST_STARTUP" != "true" ]; then
+    echo "🗄️ Creating database tables..."
+    python -c "from database import create_tables; create_tables(); print('✅ Database tables ready')"
+fi
 
 # Start the application
 echo "🚀 Starting FastAPI server..."
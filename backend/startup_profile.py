@@ -0,0 +1,102 @@
+"""
+Startup-time profile of the backend.
+
+Imports the app in a fresh interpreter with `-X importtime` and reports where
+cold-start time goes, per module and per top-level package, plus how long the
+startup event takes. The report is a plain dict so tests can assert on it,
+e.g. that `httpx` is not imported before the first request:
+
+    report = import_time_report()
+    assert "httpx" not in report["modules"]
+
+    python startup_profile.py --top 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Imports after this stderr marker happened during or after the startup event
+_MARKER = "-- startup --"
+
+# Times the startup event in the child process, after the import has been traced
+_STARTUP_SNIPPET = """
+import asyncio, json, sys, time
+import {module} as target
+sys.stderr.write("{marker}\\n")
+
+async def startup():
+    start = time.perf_counter()
+    await target.app.router.startup()
+    return int((time.perf_counter() - start) * 1e6)
+
+sys.stdout.write(json.dumps({{"startup_us": asyncio.run(startup())}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """Parse `-X importtime` output into {module: {self_us, cumulative_us, depth}}"""
+    modules = {}
+    for line in stderr.split(_MARKER)[0].splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = {
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": depth,
+        }
+    return modules
+
+
+def import_time_report(module: str = "main", env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter and break down the import and startup time"""
+    child_env = {**os.environ, **(env or {})}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _STARTUP_SNIPPET.format(module=module, marker=_MARKER)],
+        cwd=BACKEND_DIR, env=child_env, capture_output=True, text=True, check=True,
+    )
+    modules = parse_importtime(result.stderr)
+    packages: Dict[str, int] = {}
+    for name, timing in modules.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + timing["self_us"]
+
+    startup = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "import_us": modules.get(module, {}).get("cumulative_us", 0),
+        "startup_us": startup["startup_us"],
+        "modules": modules,
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile backend cold start")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--fast", action="store_true", help="Profile with FAST_STARTUP=true")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    report = import_time_report(args.module, {"FAST_STARTUP": "true"} if args.fast else None)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import {args.module}: {report['import_us'] / 1000:.1f} ms, "
+          f"startup event: {report['startup_us'] / 1000:.1f} ms\n")
+    print(f"{'package':<32} {'self ms':>10}")
+    for package, self_us in list(report["packages"].items())[:args.top]:
+        print(f"{package:<32} {self_us / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Shared fixtures. Settings are read from the environment when config is first
+imported, so a throwaway SQLite database is configured here, before any
+backend module is.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'test.db')}"
+os.environ["FILE_BLOB_CACHE_DIR"] = os.path.join(_tmp.name, "blobs")
+os.environ.setdefault("GITHUB_CLIENT_ID", "test")
+os.environ.setdefault("GITHUB_CLIENT_SECRET", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def db():
+    """A session on freshly emptied tables"""
+    from database import SessionLocal, create_tables, engine
+    from models import Base
+
+    create_tables()
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+        connection.exec_driver_sql("DELETE FROM pull_request_fts")
+        connection.exec_driver_sql("DELETE FROM comment_fts")
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def fake_github_server():
+    """The fake GitHub API on a free port, for the whole test session"""
+    import socket
+
+    from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    config = FakeGitHubConfig(users=20, repos_per_user=3, orgs=1, repos_per_org=5, prs_per_repo=3, comments_per_pr=2)
+    with FakeGitHubServer(config, port=port) as server:
+        yield server
+
+
+@pytest.fixture
+def fake_github(fake_github_server, db, monkeypatch):
+    """Backend settings pointed at the fake GitHub API"""
+    from config import settings
+
+    monkeypatch.setattr(settings, "github_api_url", fake_github_server.url)
+    monkeypatch.setattr(settings, "github_oauth_url", fake_github_server.url)
+    return fake_github_server
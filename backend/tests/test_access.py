@@ -0,0 +1,21 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from loadtest.fake_github import token_for
+from main import ensure_repository_access
+from models import RepositoryMember, User
+
+
+def test_access_check_does_not_record_membership(db, fake_github):
+    user = User(github_id=1000, username="user0", github_access_token=token_for("user0"))
+    db.add(user)
+    db.commit()
+
+    asyncio.run(ensure_repository_access(user, db, "user1/repo-0"))
+    assert db.query(RepositoryMember).count() == 0
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(ensure_repository_access(user, db, "user1/missing"))
+    assert error.value.status_code == 404
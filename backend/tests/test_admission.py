@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from admission import AdmissionController, Pool
+from config import settings
+from loadtest.fake_github import code_for
+
+
+def forwarded_scope(forwarded_for: bytes) -> dict:
+    return {"type": "http", "headers": [(b"x-forwarded-for", forwarded_for)], "client": ("10.0.0.1", 443)}
+
+
+def test_anonymous_requests_are_keyed_by_forwarded_client(monkeypatch):
+    # The proxy appends the address it saw; anything before it came from the client
+    assert AdmissionController.user_key(forwarded_scope(b"203.0.113.7")) == "addr:203.0.113.7"
+    assert AdmissionController.user_key(forwarded_scope(b"1.2.3.4, 203.0.113.7")) == "addr:203.0.113.7"
+    assert AdmissionController.user_key({"type": "http", "headers": [], "client": ("10.0.0.1", 443)}) == "addr:10.0.0.1"
+
+    monkeypatch.setattr(settings, "admission_trusted_proxy_hops", 2)
+    assert AdmissionController.user_key(forwarded_scope(b"1.2.3.4, 203.0.113.7, 10.0.0.2")) == "addr:203.0.113.7"
+    monkeypatch.setattr(settings, "admission_trusted_proxy_hops", 0)
+    assert AdmissionController.user_key(forwarded_scope(b"203.0.113.7")) == "addr:10.0.0.1"
+
+
+def test_waiter_at_its_own_limit_does_not_block_other_users():
+    pool = Pool("expensive", limit=4, per_user_limit=1, queue_size=16, queue_timeout=5)
+
+    async def run():
+        await pool.acquire("user:a")
+        queued = asyncio.ensure_future(pool.acquire("user:a"))
+        await asyncio.sleep(0)
+        assert len(pool.waiters) == 1
+        waited = await asyncio.wait_for(pool.acquire("user:b"), timeout=1)
+        pool.release("user:a", 0.0)
+        await queued
+        return waited
+
+    assert asyncio.run(run()) == 0.0
+    assert pool.active_by_user == {"user:a": 1, "user:b": 1}
+
+
+def test_concurrent_logins_from_one_address_are_admitted(fake_github, monkeypatch):
+    from main import app
+    from prefetch import prefetcher
+
+    async def login_all():
+        async with httpx.AsyncClient(app=app, base_url="http://github-zen", timeout=60) as client:
+            return await asyncio.gather(*(
+                client.post("/auth/github", json={"code": code_for(f"user{index}")}) for index in range(10)
+            ))
+
+    monkeypatch.setattr(prefetcher, "enabled", False)
+    statuses = [response.status_code for response in asyncio.run(login_all())]
+    assert statuses == [200] * 10
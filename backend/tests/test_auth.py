@@ -0,0 +1,21 @@
+from fastapi.security import HTTPAuthorizationCredentials
+
+from auth import create_access_token, get_current_user, user_cache_key
+from cache import cache
+from models import User
+
+
+def test_cached_user_leaves_out_access_token(db):
+    db.add(User(github_id=1, username="user0", email="user0@example.com", github_access_token="gho_secret"))
+    db.commit()
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": "user0"}))
+    cache.delete(user_cache_key("user0"))
+
+    assert get_current_user(credentials, db).github_access_token == "gho_secret"
+    assert cache.get(user_cache_key("user0")).keys() == {"id", "username"}
+
+    # A cache hit loads the token, and any other column, from the database when read
+    db.expunge_all()
+    user = get_current_user(credentials, db)
+    assert user.github_access_token == "gho_secret"
+    assert user.email == "user0@example.com"
@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from config import settings
+from loadtest.fake_github import token_for
+from main import app
+from models import User
+
+
+def test_batch_runs_each_operation_with_its_own_status(db, fake_github):
+    db.add(User(github_id=1000, username="user0", github_access_token=token_for("user0")))
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user0'})}"}
+    operations = [
+        {"id": "root", "type": "contents", "repo_name": "repo-0"},
+        {"id": "readme", "type": "file", "repo_name": "repo-0", "path": "README.md"},
+        {"id": "pulls", "type": "pull_requests", "repo_name": "repo-0", "state": "all"},
+        {"id": "missing", "type": "contents", "repo_name": "no-such-repo"},
+        {"id": "bad", "type": "comments", "repo_name": "repo-0"},
+    ]
+    with TestClient(app) as client:
+        results = client.post("/batch", json={"requests": operations}, headers=headers).json()["results"]
+        too_many = client.post(
+            "/batch", json={"requests": operations[:1] * (settings.batch_max_operations + 1)}, headers=headers
+        )
+
+    by_id = {result["id"]: result for result in results}
+    assert [result["id"] for result in results] == [operation["id"] for operation in operations]
+    assert "README.md" in [entry["name"] for entry in by_id["root"]["data"]]
+    assert by_id["readme"]["status"] == 200 and by_id["readme"]["data"]["content"]
+    assert by_id["pulls"]["status"] == 200 and by_id["pulls"]["data"]
+    assert by_id["missing"]["status"] == 404
+    assert by_id["bad"]["status"] == 400
+    assert too_many.status_code == 400
@@ -0,0 +1,31 @@
+import asyncio
+
+from blobs import BlobStore
+
+
+def chunks(*parts: bytes):
+    async def fetch():
+        for part in parts:
+            yield part
+    return fetch
+
+
+def test_pinned_blob_is_not_evicted(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=64)
+
+    async def read_while_others_are_stored():
+        async with store.pinned("a", chunks(b"one\n", b"two\nthree\n")):
+            store.put("b", b"x" * 40 + b"\n")
+            store.put("c", b"y" * 40 + b"\n")
+            assert store.contains("a")
+            return store.describe("a"), store.read_lines("a", 2, 3)
+
+    (total_lines, size), lines = asyncio.run(read_while_others_are_stored())
+    assert (total_lines, size) == (3, 14)
+    assert lines == b"two\nthree\n"
+    assert not store.contains("b")
+
+    # Unpinned, it is evicted like any other blob
+    store.put("d", b"z" * 40 + b"\n")
+    assert not store.contains("a")
+    assert store.stats()["pinned"] == 0
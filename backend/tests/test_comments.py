@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from loadtest.fake_github import token_for
+from main import app
+from models import User
+from services import CommentService
+
+COMMENTS_URL = "/pull-requests/1/comments?repo_name=repo-0"
+
+
+@pytest.fixture
+def client(db, fake_github):
+    db.add(User(github_id=1000, username="user0", github_access_token=token_for("user0")))
+    db.commit()
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {create_access_token({'sub': 'user0'})}"
+        yield client
+
+
+@pytest.fixture
+def syncs(monkeypatch):
+    calls = []
+    sync_pull_request_comments = CommentService.sync_pull_request_comments
+
+    async def recording_sync(db, user, repo_full_name, pr_number):
+        calls.append((repo_full_name, pr_number))
+        return await sync_pull_request_comments(db, user, repo_full_name, pr_number)
+
+    monkeypatch.setattr(CommentService, "sync_pull_request_comments", recording_sync)
+    return calls
+
+
+def test_comments_are_served_locally_and_refreshed_when_stale(db, client, syncs):
+    first = client.get(COMMENTS_URL)
+    assert first.status_code == 200 and len(first.json()) == 2
+    assert syncs == [("user0/repo-0", 1)]
+
+    # Fresh: answered from the table without touching GitHub
+    assert client.get(COMMENTS_URL).json() == first.json()
+    assert len(syncs) == 1
+
+    # Stale: still answered from the table, then refreshed in the background
+    sync_state = CommentService.get_sync_state(db, "user0/repo-0", 1)
+    sync_state.synced_at = datetime.utcnow() - timedelta(days=1)
+    db.commit()
+    assert client.get(COMMENTS_URL).json() == first.json()
+    assert len(syncs) == 2
+    db.expire_all()
+    assert CommentService.is_fresh(CommentService.get_sync_state(db, "user0/repo-0", 1))
+
+
+def test_created_comment_is_read_back_without_a_sync(client, syncs):
+    client.get(COMMENTS_URL)
+    response = client.post(COMMENTS_URL, json={"body": "Written through"})
+    assert response.status_code == 200
+
+    comments = client.get(COMMENTS_URL).json()
+    assert len(syncs) == 1
+    assert comments[0]["body"] == "Written through"
+    assert comments[0]["github_id"] == response.json()["comment"]["id"]
@@ -0,0 +1,42 @@
+from schemas import GitHubRepository
+from services import RepositoryService
+from models import User
+
+
+def github_repository(stars: int) -> GitHubRepository:
+    return GitHubRepository(
+        id=1, name="repo", full_name="user0/repo", html_url="https://github.com/user0/repo",
+        stargazers_count=stars, forks_count=0, private=False, updated_at="2024-01-01T00:00:00Z",
+        owner={"login": "user0"}, permissions={"admin": True},
+    )
+
+
+def test_repository_list_fingerprint_changes_within_a_second(db):
+    user = User(github_id=1000, username="user0")
+    db.add(user)
+    db.commit()
+    fingerprints = []
+    for stars in range(3):
+        RepositoryService.upsert_page_from_github(db, [github_repository(stars)], user)
+        fingerprints.append(RepositoryService.get_repository_list_fingerprint(db, user.id))
+    assert len(set(fingerprints)) == 3
+
+
+def test_summary_etag_changes_within_a_second(db):
+    from fastapi.testclient import TestClient
+
+    from auth import create_access_token
+    from main import app
+
+    user = User(github_id=1000, username="user0")
+    db.add(user)
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user0'})}"}
+    etags = []
+    with TestClient(app) as client:
+        for stars in range(3):
+            RepositoryService.upsert_from_github(db, github_repository(stars))
+            response = client.get("/user/summary", headers=headers)
+            assert response.json()["total_stars"] == stars
+            etags.append(response.headers["etag"])
+    assert len(set(etags)) == 3
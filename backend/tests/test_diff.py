@@ -0,0 +1,37 @@
+import asyncio
+
+from config import settings
+from github_client import GitHubClient
+from loadtest.fake_github import token_for
+from services import DiffService
+
+
+def list_files(github_client):
+    async def run():
+        files = []
+        async for page in DiffService.iter_files(github_client, "user0/repo-0", 1, "base", "head"):
+            files += page
+        return files
+    return asyncio.run(run())
+
+
+def get_patch(github_client, path):
+    return asyncio.run(DiffService.get_patch(github_client, "user0/repo-0", 1, "base", "head", path))
+
+
+def test_file_listing_cache_drops_patches_over_cap(db, fake_github, monkeypatch):
+    github_client = GitHubClient(token_for("user0"))
+    monkeypatch.setattr(settings, "diff_cache_max_bytes", 10)
+    files = list_files(github_client)
+    path = files[0]["filename"]
+
+    cached = DiffService.get_cached_files("user0/repo-0", "base", "head")
+    assert cached["files"] == files
+    assert cached["patches"] is None
+    assert get_patch(github_client, path)
+
+    monkeypatch.setattr(settings, "diff_cache_max_bytes", 10 ** 7)
+    list_files(github_client)
+    cached = DiffService.get_cached_files("user0/repo-0", "base", "head")
+    assert cached["patches"][path] == get_patch(github_client, path)
+    assert "missing.txt" not in cached["patches"] and get_patch(github_client, "missing.txt") is None
@@ -0,0 +1,44 @@
+import asyncio
+
+from events import EventBus, bus
+from schemas import GitHubPullRequest
+from services import PullRequestService
+
+
+def test_pull_request_upsert_is_pushed_to_author_and_owner(db):
+    github_pr = GitHubPullRequest(
+        id=1, number=1, title="Change", state="open", html_url="https://github.com/user1/repo/pull/1",
+        created_at="2024-01-01T00:00:00Z", updated_at="2024-01-01T00:00:00Z", user={"login": "user0"},
+        base={"repo": {"name": "repo", "full_name": "user1/repo"}}, head={"ref": "feature"},
+    )
+
+    async def upsert_while_subscribed(db):
+        subscriptions = [bus.subscribe(username) for username in ("user0", "user1", "user2")]
+        try:
+            # Published from the threadpool, as the sync endpoints do
+            await asyncio.to_thread(PullRequestService.upsert_page_from_github, db, [github_pr])
+            await asyncio.sleep(0)
+            return [subscription.queue.qsize() for subscription in subscriptions], subscriptions[0].queue.get_nowait()
+        finally:
+            for subscription in subscriptions:
+                bus.unsubscribe(subscription)
+
+    sizes, (_, event_type, data) = asyncio.run(upsert_while_subscribed(db))
+    assert sizes == [1, 1, 0]
+    assert event_type == "pull_request.created"
+    assert data["github_id"] == 1 and data["title"] == "Change"
+
+
+def test_slow_subscriber_drops_oldest_events_and_is_told_to_resync():
+    event_bus = EventBus(max_buffer=2)
+
+    async def publish_past_the_buffer():
+        subscription = event_bus.subscribe("user0")
+        for number in range(5):
+            event_bus.publish(["user0"], "comment.created", {"number": number})
+        return subscription
+
+    subscription = asyncio.run(publish_past_the_buffer())
+    assert subscription.needs_resync
+    assert [subscription.queue.get_nowait()[2]["number"] for _ in range(2)] == [3, 4]
+    assert event_bus.stats()["dropped"] == 3
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import orjson
+
+import export
+from database import SessionLocal
+from models import Comment, PullRequest, Repository, RepositoryMember, User
+
+NOW = datetime(2024, 1, 1)
+
+
+def export_rows(table: str, user: User, owner: str = None) -> list:
+    names = export.resolve_columns(table, "ndjson")
+    chunks = export.stream_export(SessionLocal, table, "ndjson", names, user.id, user.username, owner)
+    return [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+def test_organization_export_is_limited_to_member_repositories(db):
+    alice = User(github_id=1, username="alice", github_access_token="a")
+    bob = User(github_id=2, username="bob", github_access_token="b")
+    db.add_all([alice, bob])
+    db.flush()
+    for github_id, name, private in ((10, "shared", False), (11, "secret", True)):
+        repo = Repository(
+            github_id=github_id, name=name, full_name=f"org/{name}", private=private,
+            owner_username="org", created_at=NOW, updated_at=NOW,
+        )
+        db.add(repo)
+        db.flush()
+        members = (alice, bob) if name == "shared" else (bob,)
+        db.add_all(RepositoryMember(repository_id=repo.id, user_id=user.id, permission="push") for user in members)
+        db.add(PullRequest(
+            github_id=github_id, number=1, title=name, state="open", repo_name=name,
+            repo_full_name=f"org/{name}", author_username="bob", created_at=NOW, updated_at=NOW,
+        ))
+        db.add(Comment(
+            github_id=github_id, pull_request_id=1, repo_full_name=f"org/{name}", body=name,
+            author_username="bob", created_at=NOW, updated_at=NOW,
+        ))
+    db.commit()
+
+    for table, key in (("repositories", "full_name"), ("pull_requests", "repo_full_name"), ("comments", "repo_full_name")):
+        assert [row[key] for row in export_rows(table, alice, "org")] == ["org/shared"]
+        assert sorted(row[key] for row in export_rows(table, bob, "org")) == ["org/secret", "org/shared"]
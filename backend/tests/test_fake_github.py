@@ -0,0 +1,10 @@
+import pytest
+
+from loadtest.fake_github import FakeGitHubConfig, FakeGitHubServer
+
+
+def test_start_raises_when_the_port_is_taken(fake_github_server):
+    port = int(fake_github_server.url.rsplit(":", 1)[1])
+    server = FakeGitHubServer(FakeGitHubConfig(users=1), port=port)
+    with pytest.raises(RuntimeError):
+        server.start(timeout=5)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import random
+import time
+
+import pytest
+
+from github_client import iter_json_array
+
+ITEMS = [
+    {"id": 1, "title": "Fix \"quoted\" [brackets], {braces}", "labels": [{"name": "bug"}], "body": None},
+    "a string with \\ and \u00e9 and ]",
+    [1, [2, [3]], {"x": "}"}],
+    12.5e3,
+    True,
+    None,
+    {"title": "café ☃", "empty": {}, "list": []},
+]
+
+
+def split(data: bytes, sizes):
+    async def chunks():
+        start = 0
+        for size in sizes:
+            yield data[start:start + size]
+            start += size
+        yield data[start:]
+    return chunks()
+
+
+def parse(chunks):
+    async def run():
+        return [item async for item in iter_json_array(chunks)]
+    return asyncio.run(run())
+
+
+def test_elements_split_anywhere():
+    data = json.dumps(ITEMS, indent=1).encode()
+    expected = json.loads(data)
+    for size in (1, 2, 3, 7, len(data)):
+        assert parse(split(data, [size] * (len(data) // size))) == expected
+    rng = random.Random(1)
+    for _ in range(50):
+        assert parse(split(data, [rng.randint(1, 40) for _ in range(len(data))])) == expected
+    assert parse(split(b" [ ] ", [])) == []
+
+
+def test_malformed_arrays():
+    for data in (b'{"a": 1}', b"[1, 2", b'[{"a": 1}'):
+        with pytest.raises(ValueError):
+            parse(split(data, [1] * len(data)))
+
+
+def test_large_element_in_small_chunks_is_linear():
+    element = {"patch": "+ line\n" * 200_000}
+    data = json.dumps([element]).encode()
+    started = time.perf_counter()
+    assert parse(split(data, [1024] * (len(data) // 1024))) == [element]
+    assert time.perf_counter() - started < 2
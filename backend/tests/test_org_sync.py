@@ -0,0 +1,59 @@
+import asyncio
+
+from loadtest.fake_github import token_for
+from models import ArchivedPullRequest, PullRequest, Repository, User
+import org_sync
+from org_sync import OwnerSync
+from retention import archive_closed_pull_requests
+from services import PullRequestService
+
+
+def sync_org(db, user):
+    from github_client import GitHubClient
+
+    async def run():
+        async with GitHubClient(user.github_access_token) as github_client:
+            return await OwnerSync(db, user, github_client).run(["org0"])
+
+    return asyncio.run(run())
+
+
+def test_resync_fetches_only_updates_and_keeps_archive(db, fake_github, monkeypatch):
+    monkeypatch.setattr(org_sync, "PAGE_SIZE", 2)
+    user = User(github_id=1000, username="user0", github_access_token=token_for("user0"))
+    db.add(user)
+    db.commit()
+
+    first = sync_org(db, user)
+    assert first["repositories"] == 5
+    assert first["pull_requests"] == 15
+    assert first["github_calls"] == 4 + 5 * 2  # a batch of repository list pages, then two PR pages per repository
+
+    # The fake PRs were last updated long ago: the closed ones are archived
+    archived = archive_closed_pull_requests(db, 30)["pull_requests"]
+    assert archived == 5
+
+    user = db.query(User).filter(User.username == "user0").one()
+    second = sync_org(db, user)
+    assert second["github_calls"] == 4 + 5  # paging stops at the first page older than the last sync
+    assert second["pull_requests"] == 0
+    assert db.query(ArchivedPullRequest).count() == archived
+    assert db.query(PullRequest).filter(PullRequest.state == "closed").count() == 0
+
+    # A full resync leaves unchanged archived PRs in the archive
+    db.query(Repository).update({Repository.pull_requests_synced_at: None})
+    db.commit()
+    full = sync_org(db, user)
+    assert full["pull_requests"] == 10
+    assert db.query(ArchivedPullRequest).count() == archived
+    assert db.query(PullRequest).filter(PullRequest.state == "closed").count() == 0
+
+    # The org's PRs are listed for a member whoever authored them
+    rows = PullRequestService.get_pull_request_rows_by_user(db, user.id, "open")
+    assert len(rows) == 10
+    assert {row["author_username"] for row in rows} != {"user0"}
+    archived_rows = PullRequestService.get_pull_request_rows_by_user(db, user.id, "closed", include_archived=True)
+    assert len(archived_rows) == 5
+    _, total = PullRequestService.search_pull_requests(db, "user0", "change", state="open")
+    assert total == 10
+
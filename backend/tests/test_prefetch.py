@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from config import settings
+from database import engine
+from models import User
+from prefetch import Prefetcher
+from schemas import GitHubRepository
+from services import RepositoryService
+
+
+def github_repository(github_id: int) -> GitHubRepository:
+    return GitHubRepository(
+        id=github_id, name=f"repo-{github_id}", full_name=f"user0/repo-{github_id}",
+        html_url=f"https://github.com/user0/repo-{github_id}", stargazers_count=0, forks_count=0,
+        private=False, updated_at=(datetime(2024, 1, 1) + timedelta(hours=github_id % 7)).isoformat() + "Z",
+        owner={"login": "user0"}, permissions={"admin": True},
+    )
+
+
+def test_schedule_picks_most_recent_repositories_in_one_query(db, monkeypatch):
+    monkeypatch.setattr(settings, "prefetch_repositories", 3)
+    user = User(github_id=1000, username="user0", github_access_token="token-user0")
+    db.add(user)
+    db.commit()
+    RepositoryService.upsert_page_from_github(db, [github_repository(n) for n in range(1, 7)], user)
+    db.refresh(user)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def schedule() -> list:
+        prefetcher = Prefetcher()
+        prefetcher.enabled = True
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            task = prefetcher.schedule(db, user)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        repositories = prefetcher.runs[next(iter(prefetcher.runs))].repositories
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return repositories
+
+    assert asyncio.run(schedule()) == ["user0/repo-6", "user0/repo-5", "user0/repo-4"]
+    assert len(statements) == 1
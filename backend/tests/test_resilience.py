@@ -0,0 +1,37 @@
+import asyncio
+
+from resilience import EndpointPolicy, EndpointStats, Upstream
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_hedge_loser_is_closed_when_both_finish_together():
+    stats = EndpointStats()
+    stats.latencies.extend([0.01] * EndpointStats.MIN_SAMPLES)
+    answered = asyncio.Event()
+    responses = []
+
+    async def send():
+        response = FakeResponse()
+        responses.append(response)
+        if len(responses) == 2:
+            answered.set()  # both attempts answer in the same loop iteration
+        await answered.wait()
+        return response
+
+    async def run():
+        return await Upstream()._hedged(send, EndpointPolicy(timeout=1.0), stats)
+
+    winner = asyncio.run(run())
+    assert stats.hedges == 1
+    assert len(responses) == 2
+    assert [response.closed for response in responses if response is not winner] == [True]
+    assert not winner.closed
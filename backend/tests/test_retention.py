@@ -0,0 +1,64 @@
+import json
+from datetime import datetime, timedelta
+
+from models import ArchivedPullRequest, PullRequest
+from retention import archive_closed_pull_requests
+from schemas import GitHubPullRequest
+from services import PullRequestService, SummaryService
+
+OLD = datetime.utcnow() - timedelta(days=400)
+
+
+def closed_pull_request(github_id: int) -> PullRequest:
+    return PullRequest(
+        github_id=github_id, number=github_id, title=f"Change {github_id}", state="closed",
+        repo_name="repo", repo_full_name="user0/repo", author_username="user0",
+        created_at=OLD, updated_at=OLD,
+    )
+
+
+def test_archive_after_id_is_reused(db):
+    db.add_all([closed_pull_request(1), closed_pull_request(2)])
+    db.commit()
+    assert archive_closed_pull_requests(db, 30)["pull_requests"] == 2
+
+    # SQLite hands out the ids of deleted rows again
+    db.add(closed_pull_request(3))
+    db.commit()
+    reused_id = db.query(PullRequest.id).filter(PullRequest.github_id == 3).scalar()
+    assert reused_id in {id for id, in db.query(ArchivedPullRequest.id)}
+
+    assert archive_closed_pull_requests(db, 30)["pull_requests"] == 1
+    archived = db.query(ArchivedPullRequest).order_by(ArchivedPullRequest.github_id).all()
+    assert [pr.github_id for pr in archived] == [1, 2, 3]
+    assert archived[2].id == reused_id
+    assert db.query(PullRequest).count() == 0
+
+
+def github_pull_request(github_id: int, state: str, updated_at: datetime) -> GitHubPullRequest:
+    repo = {"name": "repo", "full_name": "user0/repo"}
+    return GitHubPullRequest(
+        id=github_id, number=github_id, title=f"Change {github_id}", state=state,
+        html_url=f"https://github.com/user0/repo/pull/{github_id}",
+        created_at=OLD.isoformat() + "Z", updated_at=updated_at.isoformat() + "Z",
+        user={"login": "user0"}, base={"repo": repo}, head={"ref": f"feature/{github_id}"},
+    )
+
+
+def test_pull_request_leaving_archive_keeps_summary(db):
+    db.add_all([closed_pull_request(1), closed_pull_request(2)])
+    db.commit()
+    SummaryService.recompute_summary(db, "user0")
+    assert archive_closed_pull_requests(db, 30)["pull_requests"] == 2
+
+    # Unchanged archived PRs stay archived
+    assert PullRequestService.upsert_page_from_github(db, [github_pull_request(1, "closed", OLD)]) == []
+    assert PullRequestService.upsert_from_github(db, github_pull_request(2, "closed", OLD)) is None
+
+    # Reopened ones move back, through either upsert path
+    reopened = datetime.utcnow()
+    PullRequestService.upsert_page_from_github(db, [github_pull_request(1, "open", reopened)])
+    PullRequestService.upsert_from_github(db, github_pull_request(2, "open", reopened))
+    assert db.query(ArchivedPullRequest).count() == 0
+    assert SummaryService.verify_summary(db, "user0") == []
+    assert json.loads(SummaryService.get_summary(db, "user0").pull_requests_by_state) == {"open": 2}
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+import org_sync
+from github_client import RateLimit
+from loadtest.fake_github import token_for
+from models import PullRequest, Repository, User
+from scheduler import SyncScheduler, UserSchedule
+
+
+def test_sync_stops_between_pages_at_rate_reserve(db, fake_github, monkeypatch):
+    user = User(github_id=1000, username="user0", github_access_token=token_for("user0"))
+    db.add(user)
+    db.commit()
+    scheduler = SyncScheduler()
+    reset = time.time() + 600
+    # One request above the reserve: the first page is fetched, then the budget is spent
+    remaining = iter([scheduler.rate_reserve + 1])
+    monkeypatch.setattr(
+        org_sync, "get_rate_limit",
+        lambda token: RateLimit(5000, next(remaining, scheduler.rate_reserve), reset),
+    )
+    schedule = UserSchedule(user.id, due=time.time())
+    scheduler.schedules[user.id] = schedule
+
+    async def run():
+        scheduler._semaphore = asyncio.Semaphore(1)
+        await scheduler._semaphore.acquire()
+        schedule.running = True
+        await scheduler._sync(schedule)
+
+    asyncio.run(run())
+    assert scheduler.deferred == 1
+    assert scheduler.completed == 0
+    assert schedule.due >= reset
+    assert db.query(Repository).count() > 0
+    assert db.query(PullRequest).count() == 0
+
+
+def test_activity_from_a_worker_thread_is_recorded_on_the_loop(monkeypatch):
+    scheduler = SyncScheduler()
+    monkeypatch.setattr(scheduler, "_load_users", lambda: None)
+    threads = []
+    record = scheduler._record_activity
+
+    def record_on(*args):
+        threads.append(threading.get_ident())
+        record(*args)
+
+    monkeypatch.setattr(scheduler, "_record_activity", record_on)
+
+    async def run():
+        scheduler.start()
+        try:
+            await asyncio.to_thread(scheduler.record_activity, 42)
+            await asyncio.sleep(0)
+            return scheduler.schedules.get(42), list(scheduler._heap)
+        finally:
+            await scheduler.stop()
+
+    schedule, heap = asyncio.run(run())
+    assert threads == [threading.get_ident()]  # asyncio.run's loop runs on this thread
+    assert schedule is not None and schedule.last_active is not None
+    assert heap == [(schedule.due, 42)]
+    scheduler.record_activity(42)  # stopped: ignored
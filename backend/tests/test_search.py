@@ -0,0 +1,54 @@
+import search
+from database import engine
+from schemas import GitHubComment, GitHubPullRequest
+from services import CommentService, PullRequestService
+
+
+def github_pull_request(github_id: int, title: str, body: str = "", author: str = "user0") -> GitHubPullRequest:
+    repo = {"name": "repo", "full_name": f"{author}/repo"}
+    return GitHubPullRequest(
+        id=github_id, number=github_id, title=title, body=body, state="open",
+        html_url=f"https://github.com/{author}/repo/pull/{github_id}",
+        created_at="2024-01-01T00:00:00Z", updated_at="2024-01-01T00:00:00Z",
+        user={"login": author}, base={"repo": repo}, head={"ref": f"feature/{github_id}"},
+    )
+
+
+def add_comment(db, github_id: int, pr_number: int, body: str):
+    github_comment = GitHubComment(
+        id=github_id, body=body, html_url=f"https://github.com/user0/repo/pull/{pr_number}#issuecomment-{github_id}",
+        created_at="2024-01-01T00:00:00Z", updated_at="2024-01-01T00:00:00Z", user={"login": "user0"},
+    )
+    CommentService.upsert_from_github(db, github_comment, "user0/repo", pr_number, ["user0"])
+
+
+def test_search_ranks_title_over_body_and_comments_and_hides_other_users(db):
+    PullRequestService.upsert_page_from_github(db, [
+        github_pull_request(1, "Fix caching", "Unrelated"),
+        github_pull_request(2, "Refactor", "Move the caching layer"),
+        github_pull_request(3, "Docs"),
+        github_pull_request(4, "Caching for someone else", author="user1"),
+        # bm25 needs the term to be rare in the corpus to score it above zero
+        *(github_pull_request(github_id, f"Update {github_id}") for github_id in range(5, 15)),
+    ])
+    add_comment(db, 30, 3, "This needs caching too")
+    for github_id in range(31, 41):
+        add_comment(db, github_id, github_id - 26, "Looks good")
+
+    results, total = PullRequestService.search_pull_requests(db, "user0", "caching")
+    assert total == 3
+    assert [result["number"] for result in results] == [1, 2, 3]
+    assert results[0]["score"] > results[1]["score"] > results[2]["score"] > 0
+    assert PullRequestService.search_pull_requests(db, "user0", "***") == ([], 0)
+
+
+def test_ensure_schema_backfills_each_empty_index(db):
+    PullRequestService.upsert_page_from_github(db, [github_pull_request(1, "Fix caching")])
+    add_comment(db, 10, 1, "Looks good")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM pull_request_fts")
+
+    # comment_fts still holds its row, so only pull_request_fts is rebuilt
+    search.ensure_schema(engine)
+    assert [result["number"] for result in PullRequestService.search_pull_requests(db, "user0", "caching")[0]] == [1]
+    assert PullRequestService.search_pull_requests(db, "user0", "good")[1] == 1
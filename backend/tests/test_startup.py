@@ -0,0 +1,8 @@
+from startup_profile import import_time_report
+
+
+def test_cold_start_skips_optional_and_client_imports():
+    report = import_time_report()
+    assert "main" in report["modules"]
+    for module in ("httpx", "pyarrow"):
+        assert module not in report["modules"]
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from schemas import GitHubPullRequest, GitHubRepository
+from services import PullRequestService, RepositoryService, SummaryService
+
+START = datetime(2024, 1, 1)
+
+
+def github_repository(github_id: int, stars: int = 0, language: str = "Python") -> GitHubRepository:
+    return GitHubRepository(
+        id=github_id, name=f"repo-{github_id}", full_name=f"user0/repo-{github_id}",
+        html_url=f"https://github.com/user0/repo-{github_id}", language=language,
+        stargazers_count=stars, forks_count=github_id, private=False,
+        updated_at=(START + timedelta(hours=github_id)).isoformat() + "Z", owner={"login": "user0"},
+    )
+
+
+def github_pull_request(github_id: int, state: str, hours: int = 0) -> GitHubPullRequest:
+    repo = {"name": "repo-1", "full_name": "user0/repo-1"}
+    return GitHubPullRequest(
+        id=github_id, number=github_id, title=f"Change {github_id}", state=state,
+        html_url=f"https://github.com/user0/repo-1/pull/{github_id}",
+        created_at=START.isoformat() + "Z", updated_at=(START + timedelta(hours=hours)).isoformat() + "Z",
+        user={"login": "user0"}, base={"repo": repo}, head={"ref": f"feature/{github_id}"},
+    )
+
+
+def test_summary_matches_base_tables_after_syncs(db):
+    # Repositories: created one at a time and a page at a time, then changed
+    RepositoryService.upsert_from_github(db, github_repository(1, stars=3))
+    RepositoryService.upsert_page_from_github(db, [github_repository(2), github_repository(3, language="Go")])
+    assert SummaryService.verify_summary(db, "user0") == []
+    RepositoryService.upsert_from_github(db, github_repository(1, stars=10, language="Rust"))
+    RepositoryService.upsert_page_from_github(db, [github_repository(2, stars=5), github_repository(4)])
+    assert SummaryService.verify_summary(db, "user0") == []
+
+    # Pull requests: opened, closed, merged and reopened through both upsert paths
+    PullRequestService.upsert_page_from_github(db, [github_pull_request(n, "open") for n in range(1, 5)])
+    PullRequestService.upsert_from_github(db, github_pull_request(5, "open"))
+    assert SummaryService.verify_summary(db, "user0") == []
+    PullRequestService.upsert_page_from_github(db, [github_pull_request(1, "closed", 1), github_pull_request(2, "closed", 1)])
+    PullRequestService.upsert_from_github(db, github_pull_request(3, "closed", 1))
+    PullRequestService.upsert_from_github(db, github_pull_request(1, "open", 2))
+    PullRequestService.upsert_page_from_github(db, [github_pull_request(2, "open", 2), github_pull_request(6, "closed")])
+    assert SummaryService.verify_summary(db, "user0") == []
+
+    summary = SummaryService.summary_to_dict(SummaryService.get_summary(db, "user0"))
+    assert summary["pull_requests_by_state"] == {"open": 4, "closed": 2}
+    assert summary["total_stars"] == 15
+
+
+def test_repository_page_folds_deltas_without_rebuilding(db, monkeypatch):
+    RepositoryService.upsert_page_from_github(db, [github_repository(1), github_repository(2)])
+    rebuilt = []
+    recompute_summary = SummaryService.recompute_summary
+
+    def recording_recompute(db, username):
+        rebuilt.append(username)
+        return recompute_summary(db, username)
+
+    monkeypatch.setattr(SummaryService, "recompute_summary", recording_recompute)
+    RepositoryService.upsert_page_from_github(
+        db, [github_repository(1, stars=7, language="Go"), github_repository(3), github_repository(4, stars=2)]
+    )
+    assert rebuilt == []
+    assert SummaryService.verify_summary(db, "user0") == []
@@ -0,0 +1,44 @@
+import re
+
+import orjson
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from auth import create_access_token
+from database import engine
+from loadtest.fake_github import token_for
+from main import app
+from models import User
+
+# The SELECT an expired row issues when one of its attributes is read
+RELOAD = re.compile(r"FROM (repositories|pull_requests)\s+WHERE \1\.id = \?")
+
+
+def stream(path: str) -> tuple:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user0'})}"}
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with TestClient(app) as client:
+            response = client.post(path, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return [orjson.loads(line) for line in response.content.splitlines()], statements
+
+
+def test_streamed_rows_are_not_reloaded_one_by_one(db, fake_github):
+    db.add(User(github_id=1000, username="user0", github_access_token=token_for("user0")))
+    db.commit()
+    for path, item_event in (
+        ("/repositories/sync/stream", "repository"),
+        ("/pull-requests/sync/stream", "pull_request"),
+    ):
+        events, statements = stream(path)
+        rows = [e["data"] for e in events if e["event"] == item_event]
+        assert rows and events[-1] == {"event": "done", "synced": len(rows)}
+        assert all(row["id"] is not None for row in rows)
+        assert not [statement for statement in statements if RELOAD.search(statement)]
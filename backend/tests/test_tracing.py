@@ -0,0 +1,37 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from main import app
+from models import User
+from tracing import tracer
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def test_sampled_request_is_traced_under_the_callers_span(db, monkeypatch, tmp_path):
+    db.add(User(github_id=1000, username="user0"))
+    db.commit()
+    export_path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    monkeypatch.setattr(tracer, "export_path", str(export_path))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user0'})}"}
+    with TestClient(app) as client:
+        traced = client.get(
+            "/repositories", headers={**headers, "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+        untraced = client.get(
+            "/repositories", headers={**headers, "traceparent": f"00-{'1' * 32}-{PARENT_ID}-00"}
+        )
+        trace = client.get(f"/debug/traces/{TRACE_ID}").json()
+
+    assert traced.headers["x-trace-id"] == TRACE_ID
+    assert "x-trace-id" not in untraced.headers
+    root, *children = trace["spans"]
+    assert root["parent_id"] == PARENT_ID and root["attributes"]["status"] == 200
+    span_ids = {span["span_id"] for span in trace["spans"]}
+    assert children and all(span["parent_id"] in span_ids for span in children)
+    assert any(span["name"].startswith("db") for span in children)
+    assert [json.loads(line)["trace_id"] for line in export_path.read_text().splitlines()] == [TRACE_ID]
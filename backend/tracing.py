@@ -0,0 +1,318 @@
+"""
+Lightweight request tracing.
+
+A sampled request gets a root span from TracingMiddleware; auth, service
+methods, GitHub calls, SQL statements and response rendering add child spans
+while it runs. Unsampled requests only pay for a context variable lookup at
+each instrumented point.
+
+Sampling follows an incoming W3C `traceparent` header when there is one
+(so a caller can force a trace with the sampled flag), otherwise
+TRACE_SAMPLE_RATE. Outgoing GitHub requests carry a `traceparent` for the
+current span. Finished traces go to an in-memory ring buffer, served on
+/debug/traces, and are appended as JSON lines to TRACE_EXPORT_PATH when set.
+"""
+
+import functools
+import inspect
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from metrics import register_collector
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# Longest SQL statement kept on a span
+MAX_STATEMENT_LENGTH = 300
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "started", "duration", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.started - self.trace.root.started) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """The spans of one sampled request"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root: Optional[Span] = None
+
+    def add(self, span: Span) -> bool:
+        if len(self.spans) >= settings.trace_max_spans:
+            self.dropped += 1
+            return False
+        self.spans.append(span)
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "status": self.root.attributes.get("status"),
+            "error": self.root.error,
+            "dropped_spans": self.dropped,
+            "spans": [span.as_dict() for span in self.spans],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C traceparent header"""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header value for the current span, if the request is sampled"""
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+class Tracer:
+    def __init__(self):
+        self.sample_rate = settings.trace_sample_rate
+        self.export_path = settings.trace_export_path
+        self.traces: Deque[Dict[str, Any]] = deque(maxlen=settings.trace_buffer_size)
+        self._export_lock = threading.Lock()
+        self.requests = 0
+        self.sampled = 0
+        self.exported = 0
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None) -> Optional[Span]:
+        """Root span of a new trace, or None when the request is not sampled"""
+        self.requests += 1
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = "%032x" % random.getrandbits(128), None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+        self.sampled += 1
+        trace = Trace(trace_id)
+        trace.root = Span(trace, name, parent_id, {})
+        trace.add(trace.root)
+        return trace.root
+
+    def finish_trace(self, root: Span):
+        root.finish()
+        record = root.trace.as_dict()
+        self.traces.append(record)
+        if self.export_path:
+            with self._export_lock, open(self.export_path, "a") as export_file:
+                export_file.write(json.dumps(record, default=str) + "\n")
+            self.exported += 1
+
+    def start_span(self, name: str, **attributes) -> Optional[Span]:
+        """Child of the current span, without making it current (for leaf spans)"""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        return span if parent.trace.add(span) else None
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Run a block as a child span of the current one; a no-op outside sampled requests"""
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finish()
+            _current_span.reset(token)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator running a function (sync or async) inside a span"""
+        def decorator(function):
+            span_name = name or function.__qualname__
+
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    if _current_span.get() is None:
+                        return await function(*args, **kwargs)
+                    with self.span(span_name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return function(*args, **kwargs)
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        """Summaries of the latest buffered traces, newest first"""
+        result = []
+        for record in reversed(self.traces):
+            if record["duration_ms"] < min_duration_ms:
+                continue
+            result.append({key: value for key, value in record.items() if key != "spans"})
+            result[-1]["span_count"] = len(record["spans"])
+            if len(result) >= limit:
+                break
+        return result
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for record in self.traces:
+            if record["trace_id"] == trace_id:
+                return record
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "requests": self.requests,
+            "sampled": self.sampled,
+            "buffered": len(self.traces),
+            "exported": self.exported,
+        }
+
+
+def trace_methods(cls):
+    """Class decorator tracing every public static method as `Class.method`"""
+    for attribute, value in list(vars(cls).items()):
+        if attribute.startswith("_") or not isinstance(value, staticmethod):
+            continue
+        function = value.__func__
+        if inspect.isasyncgenfunction(function) or inspect.isgeneratorfunction(function):
+            continue  # a span would only cover creating the generator
+        setattr(cls, attribute, staticmethod(tracer.traced(f"{cls.__name__}.{attribute}")(function)))
+    return cls
+
+
+def instrument_engine(engine):
+    """Record each SQL statement run during a sampled request as a db span"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span("db.execute", statement=statement[:MAX_STATEMENT_LENGTH])
+        if span is not None:
+            conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().finish()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            span = spans.pop()
+            span.error = f"{type(exception_context.original_exception).__name__}"
+            span.finish()
+
+
+class TracedJSONResponse(ORJSONResponse):
+    """ORJSONResponse whose rendering shows up as a `serialize` span"""
+
+    def render(self, content: Any) -> bytes:
+        if _current_span.get() is None:
+            return super().render(content)
+        with tracer.span("serialize"):
+            return super().render(content)
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        root = tracer.start_trace(
+            f"{scope['method']} {scope['path']}", Headers(scope=scope).get("traceparent")
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        root.attributes["path"] = scope["path"]
+
+        async def send_traced(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["status"] = message["status"]
+                MutableHeaders(scope=message)["X-Trace-Id"] = root.trace.trace_id
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            endpoint = scope.get("endpoint")
+            if endpoint is not None:
+                # Group traces by handler rather than by concrete path
+                root.name = f"{scope['method']} {endpoint.__name__}"
+            tracer.finish_trace(root)
+
+
+# Global tracer instance
+tracer = Tracer()
+register_collector("tracing", tracer.stats)
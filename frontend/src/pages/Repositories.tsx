@@ -188,7 +188,7 @@ export const Repositories: React.FC = () => {
               animate={{ opacity: 1, y: 0 }}
               transition={{ delay: index * 0.05 }}
             >
-              <Card className="h-full hover:shadow-card transition-smooth group gradient-card backdrop-blur-sm border-border/50 cursor-pointer" onClick={() => navigate(`/repositories/${repo.name}`)}>
+              <Card className="h-full hover:shadow-card transition-smooth group gradient-card backdrop-blur-sm border-border/50 cursor-pointer" onClick={() => navigate(`/repositories/${encodeURIComponent(repo.full_name)}`)}>
                 <CardHeader>
                   <div className="flex items-start justify-between">
                     <CardTitle className="flex items-center gap-2 group-hover:text-primary transition-smooth">
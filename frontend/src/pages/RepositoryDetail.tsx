@@ -75,10 +75,11 @@ export const RepositoryDetail: React.FC = () => {
   const [isSearching, setIsSearching] = useState(false);
   const [currentPath, setCurrentPath] = useState<string[]>([]);
 
-  // Find repository from the list
+  // Find repository from the list; the route carries "owner/repo" since the list also
+  // has organization and collaborator repositories
   useEffect(() => {
     if (repositories.length > 0 && repoName) {
-      const foundRepo = repositories.find(repo => repo.name === repoName);
+      const foundRepo = repositories.find(repo => repo.full_name === repoName || repo.name === repoName);
       if (foundRepo) {
         setRepository(foundRepo as any);
         loadRepositoryFiles(repoName);
@@ -171,7 +172,7 @@ export const RepositoryDetail: React.FC = () => {
   // Handle search query changes
   useEffect(() => {
     if (searchQuery && repository) {
-      debouncedSearch(searchQuery, repository.name);
+      debouncedSearch(searchQuery, repository.full_name);
     } else {
       setSearchResults([]);
       setIsSearching(false);
@@ -481,7 +482,7 @@ export const RepositoryDetail: React.FC = () => {
                           if (file.type === 'file') {
                             setSelectedFile(file);
                             if (repository) {
-                              loadFileContent(repository.name, file.path);
+                              loadFileContent(repository.full_name, file.path);
                             }
                           } else {
                             toggleFolder(file.path);
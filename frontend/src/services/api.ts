@@ -43,6 +43,10 @@ class ApiService {
           window.location.href = '/';
           throw new Error('Authentication required');
         }
+        if (response.status === 429) {
+          // Shed by the server's admission control; safe to retry after the hint
+          throw new Error(`Server busy, retry in ${response.headers.get('Retry-After') ?? '1'}s`);
+        }
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
@@ -54,6 +58,14 @@ class ApiService {
     }
   }
 
+  // Repository arguments are "repo" for the user's own repositories or "owner/repo" for
+  // organization and other users' repositories, sent as the `owner` query parameter
+  private repoUrl(repoName: string, url: (name: string) => string): string {
+    const [owner, name] = repoName.includes('/') ? repoName.split('/', 2) : [null, repoName];
+    const path = url(name);
+    return owner ? `${path}${path.includes('?') ? '&' : '?'}owner=${encodeURIComponent(owner)}` : path;
+  }
+
   setToken(token: string) {
     this.token = token;
     localStorage.setItem('access_token', token);
@@ -102,21 +114,142 @@ class ApiService {
   }
 
   // Pull Requests
-  async getPullRequests(state: string = 'open'): Promise<ApiResponse<any[]>> {
-    return this.request(`/pull-requests?state=${state}`);
+  async getPullRequests(state: string = 'open', includeArchived: boolean = false): Promise<ApiResponse<any[]>> {
+    return this.request(`/pull-requests?state=${state}${includeArchived ? '&include_archived=true' : ''}`);
   }
 
   async syncPullRequests(): Promise<ApiResponse<{ message: string }>> {
     return this.request('/pull-requests/sync', { method: 'POST' });
   }
 
+  // Organizations
+  getOrganizations(): Promise<ApiResponse<Array<{ login: string }>>> {
+    return this.request('/organizations');
+  }
+
+  // Sync repositories and pull requests of the user and their organizations (or only `owners`)
+  syncOrganizations(owners: string[] = [], background: boolean = false): Promise<ApiResponse<any>> {
+    const params = new URLSearchParams();
+    if (owners.length) params.set('owners', owners.join(','));
+    if (background) params.set('background', 'true');
+    return this.request(`/organizations/sync?${params}`, { method: 'POST' });
+  }
+
+  // Full-text search over synced pull requests and their comments, best match first
+  searchPullRequests(
+    query: string,
+    options: { state?: string; repo?: string; page?: number; perPage?: number } = {}
+  ): Promise<ApiResponse<any[]>> {
+    const params = new URLSearchParams({ q: query });
+    if (options.state) params.set('state', options.state);
+    if (options.repo) params.set('repo', options.repo);
+    if (options.page) params.set('page', String(options.page));
+    if (options.perPage) params.set('per_page', String(options.perPage));
+    return this.request(`/search/pull-requests?${params}`);
+  }
+
+  // Streaming sync: onEvent receives each NDJSON event ({ event: 'repository' | 'pull_request' |
+  // 'progress' | 'done' | 'error', ... }) as soon as its page has been synced
+  async streamSync(
+    kind: 'repositories' | 'pull-requests',
+    onEvent: (event: { event: string; [key: string]: any }) => void
+  ): Promise<ApiResponse<{ synced: number }>> {
+    try {
+      const response = await fetch(`${this.baseURL}/${kind}/sync/stream?format=ndjson`, {
+        method: 'POST',
+        headers: this.token ? { Authorization: `Bearer ${this.token}` } : {},
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let synced = 0;
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() ?? '';
+        for (const line of lines) {
+          if (!line) continue;
+          const event = JSON.parse(line);
+          if (event.event === 'done' || event.event === 'progress') synced = event.synced;
+          if (event.event === 'error') throw new Error(event.detail);
+          onEvent(event);
+        }
+      }
+      return { data: { synced } };
+    } catch (error) {
+      console.error('Streaming sync failed:', error);
+      return { error: error instanceof Error ? error.message : 'Unknown error' };
+    }
+  }
+
+  // Bulk export of synced rows as an NDJSON (default), Arrow IPC stream or Parquet file; `columns` limits
+  // the export to those columns and `owner` exports an organization's rows instead of the user's
+  async exportData(
+    table: 'repositories' | 'pull_requests' | 'comments',
+    options: { format?: 'arrow' | 'parquet' | 'ndjson'; columns?: string[]; owner?: string; includeArchived?: boolean } = {}
+  ): Promise<ApiResponse<Blob>> {
+    const params = new URLSearchParams({ format: options.format ?? 'ndjson' });
+    if (options.columns?.length) params.set('columns', options.columns.join(','));
+    if (options.owner) params.set('owner', options.owner);
+    if (options.includeArchived) params.set('include_archived', 'true');
+    try {
+      const response = await fetch(`${this.baseURL}/export/${table}?${params}`, {
+        headers: this.token ? { Authorization: `Bearer ${this.token}` } : {},
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return { data: await response.blob() };
+    } catch (error) {
+      console.error('Export failed:', error);
+      return { error: error instanceof Error ? error.message : 'Unknown error' };
+    }
+  }
+
   async getRepositoryPullRequests(repoName: string, state: string = 'open'): Promise<ApiResponse<any[]>> {
-    return this.request(`/repositories/${repoName}/pull-requests?state=${state}`);
+    return this.request(this.repoUrl(repoName, (name) => `/repositories/${name}/pull-requests?state=${state}`));
+  }
+
+  // Pull request files: the listing has no patches; fetch them per file on expand
+  getPullRequestFiles(repoName: string, prNumber: number): Promise<ApiResponse<any[]>> {
+    return this.request(this.repoUrl(repoName, (name) => `/repositories/${name}/pull-requests/${prNumber}/files`));
+  }
+
+  getPullRequestFilePatch(
+    repoName: string,
+    prNumber: number,
+    path: string
+  ): Promise<ApiResponse<{ filename: string; patch: string }>> {
+    return this.request(
+      this.repoUrl(
+        repoName,
+        (name) => `/repositories/${name}/pull-requests/${prNumber}/files/patch?path=${encodeURIComponent(path)}`
+      )
+    );
+  }
+
+  getPullRequestDiffUrl(repoName: string, prNumber: number): string {
+    return `${this.baseURL}${this.repoUrl(repoName, (name) => `/repositories/${name}/pull-requests/${prNumber}/diff`)}`;
   }
 
   // Comments
-  async getPullRequestComments(repoName: string, prNumber: number): Promise<ApiResponse<any[]>> {
-    return this.request(`/pull-requests/${prNumber}/comments?repo_name=${repoName}`);
+  async getPullRequestComments(
+    repoName: string,
+    prNumber: number,
+    includeArchived: boolean = false
+  ): Promise<ApiResponse<any[]>> {
+    return this.request(
+      this.repoUrl(
+        repoName,
+        (name) => `/pull-requests/${prNumber}/comments?repo_name=${name}${includeArchived ? '&include_archived=true' : ''}`
+      )
+    );
   }
 
   async createPullRequestComment(
@@ -124,7 +257,7 @@ class ApiService {
     prNumber: number,
     body: string
   ): Promise<ApiResponse<any>> {
-    return this.request(`/pull-requests/${prNumber}/comments?repo_name=${repoName}`, {
+    return this.request(this.repoUrl(repoName, (name) => `/pull-requests/${prNumber}/comments?repo_name=${name}`), {
       method: 'POST',
       body: JSON.stringify({ body }),
     });
@@ -132,15 +265,51 @@ class ApiService {
 
   // Repository file operations
   getRepositoryContents(repoName: string, path: string = ''): Promise<ApiResponse<any[]>> {
-    return this.request(`/repositories/${repoName}/contents?path=${encodeURIComponent(path)}`);
+    return this.request(
+      this.repoUrl(repoName, (name) => `/repositories/${name}/contents?path=${encodeURIComponent(path)}`)
+    );
   }
 
-  getFileContent(repoName: string, path: string): Promise<ApiResponse<{ content: string; path: string }>> {
-    return this.request(`/repositories/${repoName}/file?path=${encodeURIComponent(path)}`);
+  // With startLine/endLine (1-based, inclusive) only that slice comes back; totalLines and size
+  // describe the whole file either way, so large files can be paged through
+  getFileContent(
+    repoName: string,
+    path: string,
+    range?: { startLine?: number; endLine?: number }
+  ): Promise<ApiResponse<{
+    content: string;
+    path: string;
+    total_lines: number;
+    size: number;
+    start_line?: number;
+    end_line?: number;
+  }>> {
+    const params = new URLSearchParams({ path });
+    if (range?.startLine) params.append('start_line', range.startLine.toString());
+    if (range?.endLine) params.append('end_line', range.endLine.toString());
+    return this.request(this.repoUrl(repoName, (name) => `/repositories/${name}/file?${params.toString()}`));
   }
 
   searchRepositoryFiles(repoName: string, query: string): Promise<ApiResponse<any[]>> {
-    return this.request(`/repositories/${repoName}/search?query=${encodeURIComponent(query)}`);
+    return this.request(
+      this.repoUrl(repoName, (name) => `/repositories/${name}/search?query=${encodeURIComponent(query)}`)
+    );
+  }
+
+  // Batch: several contents/file/pull_requests/comments reads in one request; each result has
+  // its own status, and data or error
+  batch(
+    requests: Array<{
+      id?: string;
+      type: 'contents' | 'file' | 'pull_requests' | 'comments';
+      repo_name: string;
+      owner?: string;
+      path?: string;
+      state?: string;
+      pr_number?: number;
+    }>
+  ): Promise<ApiResponse<{ results: Array<{ id?: string; status: number; data?: any; error?: string }> }>> {
+    return this.request('/batch', { method: 'POST', body: JSON.stringify({ requests }) });
   }
 
 }
@@ -2,9 +2,14 @@
 
 echo "🚀 Starting GitHub Zen Backend..."
 
-# Install dependencies
-echo "📦 Installing dependencies..."
-pip install -r backend/requirements.txt
+# Install dependencies, unless they are unchanged since the last successful install
+REQUIREMENTS_HASH=$(sha256sum backend/requirements.txt | cut -d' ' -f1)
+if [ -f .deps-installed ] && [ "$(cat .deps-installed)" = "$REQUIREMENTS_HASH" ]; then
+    echo "📦 Dependencies unchanged, skipping install"
+else
+    echo "📦 Installing dependencies..."
+    pip install -r backend/requirements.txt && echo "$REQUIREMENTS_HASH" > .deps-installed
+fi
 
 # Start the FastAPI application
 echo "🔥 Starting FastAPI server..."